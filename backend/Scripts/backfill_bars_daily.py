@@ -1,14 +1,70 @@
 # Scripts/backfill_bars_daily.py
+"""
+Backfill bars_daily from Polygon's grouped-daily endpoint, one call per NYSE
+trading session (app/services/trading_calendar.py).
+
+Runs as a pipeline: BACKFILL_FETCHERS tasks pull days from Polygon and hand
+the built payloads through a bounded queue (BACKFILL_QUEUE days) to
+BACKFILL_WRITERS tasks that upsert them in worker threads, so network and DB
+time overlap. The queue bound keeps at most that many parsed days in memory.
+
+Env (optional):
+  BACKFILL_FETCHERS   concurrent grouped-day fetches (default 4; the
+                      POLYGON_MAX_CONCURRENCY / rate limit still apply)
+  BACKFILL_WRITERS    concurrent day upserts, one DB connection each (default 2)
+  BACKFILL_QUEUE      fetched days waiting for a writer (default 8)
+  BACKFILL_LOAD       "copy" (default): each writer COPYs up to BACKFILL_BATCH_DAYS
+                      queued days into the unlogged bars_daily_staging table and
+                      merges them with one INSERT ... SELECT ... ON CONFLICT;
+                      "executemany": one UPSERT_SQL executemany per day.
+                      A failed COPY batch is retried day by day via executemany,
+                      which bisects bad rows out into bars_daily_rejects
+                      (migration 008). Non-psycopg drivers always use it.
+  BACKFILL_BATCH_DAYS days merged per COPY transaction (default 5)
+  BACKFILL_EMPTY_RETRIES  empty grouped responses before a session is logged
+                      "no_data" and not retried (default 3)
+
+Every finished day is checkpointed in bars_daily_ingest_log (migration 006).
+A run skips days logged as ok / partial / no_data and retries the rest, so an
+interrupted run just picks up where it stopped; `--incremental` starts after
+the last completed day, or at the first logged day still to retry if that is
+earlier (failed days only, not "empty" ones; the nightly job); `--force`
+refetches everything.
+Days after the last settled session are loaded but never marked done. Only
+calendar sessions are planned, so an empty grouped response is logged as
+"empty" and retried (data not published yet, a blank body), not taken for a
+holiday; after BACKFILL_EMPTY_RETRIES empty responses in a row (plan history
+limits) the day becomes "no_data" and is left alone.
+At the end of a run the "bars" cache tag is invalidated (REDIS_URL), so
+cached /markets/bars responses pick up the new rows.
+
+`--workers N` splits the days into N contiguous shards, each run by its own
+process (own DB engine, own Polygon client, 1/N of the Polygon rate and
+concurrency budget) so JSON decoding and payload building use N cores.
+Progress from all shards is folded into one status line, followed by a
+per-shard report.
+"""
 import os
+import json
 import math
+import time
+import argparse
 import asyncio
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import date, timedelta
-from typing import List, Dict, Any, Optional
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 from sqlalchemy import create_engine, text
+from sqlalchemy.exc import DataError, DBAPIError, IntegrityError
 from dotenv import load_dotenv
 
+from app.services import bar_columns, bars_daily, trading_calendar
+from app.services.cache import invalidate
+from app.services.polygon_client import PolygonUnavailable, polygon_session
 from app.services.polygon_grouped import fetch_grouped_daily  # your grouped endpoint wrapper
 
 load_dotenv()
@@ -16,7 +72,6 @@ load_dotenv()
 DATABASE_URL = os.getenv("DATABASE_URL")
 
 BIGINT_MIN = -9223372036854775808
-BIGINT_MAX =  9223372036854775807
 
 ENGINE = None
 
@@ -47,60 +102,94 @@ ON CONFLICT (date, ticker) DO UPDATE SET
 """)
 
 
-def is_finite_number(x) -> bool:
-    try:
-        return x is not None and isinstance(x, (int, float)) and math.isfinite(float(x))
-    except Exception:
-        return False
+# One row per attempted day; see migrations 006 and 013. The
+# BACKFILL_EMPTY_RETRIES-th empty response in a row turns "empty" into the
+# terminal "no_data".
+LOG_DAY_SQL = text("""
+INSERT INTO bars_daily_ingest_log (date, row_count, status, detail, fetched_at, empty_count)
+VALUES (
+  :date, :row_count,
+  CASE WHEN :status = 'empty' AND 1 >= CAST(:max_empty AS integer) THEN 'no_data' ELSE :status END,
+  :detail, now(),
+  CASE WHEN :status = 'empty' THEN 1 ELSE 0 END
+)
+ON CONFLICT (date) DO UPDATE SET
+  row_count   = EXCLUDED.row_count,
+  status      = CASE
+                  WHEN EXCLUDED.status = 'empty'
+                   AND bars_daily_ingest_log.empty_count + 1 >= CAST(:max_empty AS integer)
+                  THEN 'no_data'
+                  ELSE EXCLUDED.status
+                END,
+  empty_count = CASE WHEN EXCLUDED.status = 'empty' THEN bars_daily_ingest_log.empty_count + 1 ELSE 0 END,
+  detail      = EXCLUDED.detail,
+  fetched_at  = EXCLUDED.fetched_at;
+""")
 
+# Days that never need fetching again ("partial" = bad rows went to
+# bars_daily_rejects, "no_data" = empty BACKFILL_EMPTY_RETRIES times)
+DONE_STATUSES = ("ok", "partial", "no_data")
 
-def safe_float(x) -> Optional[float]:
-    return float(x) if is_finite_number(x) else None
+# Not done, but not a reason for --incremental to rewind either
+WAITING_STATUSES = ("empty",)
 
+SELECT_DONE_SQL = text("""
+SELECT date FROM bars_daily_ingest_log
+WHERE status = ANY(:statuses) AND date BETWEEN :start AND :end
+""")
+
+INSERT_REJECTS_SQL = text("""
+INSERT INTO bars_daily_rejects (date, ticker, row_data, error)
+VALUES (:date, :ticker, CAST(:row_data AS jsonb), :error)
+""")
+
+SELECT_LAST_DONE_SQL = text("""
+SELECT MAX(date) FROM bars_daily_ingest_log WHERE status = ANY(:statuses)
+""")
+
+SELECT_FIRST_RETRY_SQL = text("""
+SELECT MIN(date) FROM bars_daily_ingest_log WHERE NOT (status = ANY(:statuses))
+""")
 
-def safe_bigint(x) -> Optional[int]:
-    """
-    Returns an int within BIGINT range or None.
-    Handles float NaN/inf, strings, etc.
-    """
-    try:
-        if x is None:
-            return None
-
-        if isinstance(x, float):
-            if math.isnan(x) or math.isinf(x):
-                return None
-
-        # Convert strings like "123" if needed
-        if isinstance(x, str):
-            x = x.strip()
-            if x == "":
-                return None
-            # If it’s something non-numeric, bail
-            x = float(x)
-
-        # Convert to int
-        v = int(x)
-
-        # BIGINT range check
-        if v < BIGINT_MIN or v > BIGINT_MAX:
-            return None
-
-        return v
-    except Exception:
-        return None
 
+# bars_daily column <- grouped-daily field
+FLOAT_FIELDS = (("open", "o"), ("high", "h"), ("low", "l"), ("close", "c"), ("vwap", "vw"))
+INT_FIELDS = (("volume", "v"), ("trades", "n"))
 
-def daterange(start: date, end: date):
-    cur = start
-    while cur <= end:
-        yield cur
-        cur += timedelta(days=1)
+# largest float64 below 2**63; anything at or above it does not fit a BIGINT
+_BIGINT_MAX_F = float(np.nextafter(np.float64(2.0 ** 63), 0))
 
 
-def chunked(lst, n: int):
-    for i in range(0, len(lst), n):
-        yield lst[i:i + n]
+def float_column(col: Optional[pd.Series], n: int) -> List[Optional[float]]:
+    """Numeric column -> floats, with None for missing / non-numeric / NaN / inf."""
+    if col is None:
+        return [None] * n
+    v = pd.to_numeric(col, errors="coerce").to_numpy(dtype=np.float64)
+    out = v.astype(object)
+    out[~np.isfinite(v)] = None
+    return out.tolist()
+
+
+def bigint_column(col: Optional[pd.Series], n: int) -> List[Optional[int]]:
+    """Numeric column -> ints truncated toward zero, None where missing or outside BIGINT."""
+    if col is None:
+        return [None] * n
+    num = pd.to_numeric(col, errors="coerce")
+    if num.dtype.kind == "i":
+        return num.to_numpy(dtype=np.int64).tolist()
+
+    v = num.to_numpy(dtype=np.float64)
+    ok = np.isfinite(v) & (v >= BIGINT_MIN) & (v <= _BIGINT_MAX_F)
+    ints = np.zeros(len(v), dtype=np.int64)
+    ints[ok] = v[ok].astype(np.int64)
+    out = ints.astype(object)
+    out[~ok] = None
+    return out.tolist()
+
+
+def as_rows(payload: List[Tuple]) -> List[Dict[str, Any]]:
+    """Payload records -> bars_daily row dicts (executemany, bar store)."""
+    return [dict(zip(bars_daily.COLUMNS, r)) for r in payload]
 
 
 def summarize_row(r: Dict[str, Any]) -> str:
@@ -111,92 +200,636 @@ def summarize_row(r: Dict[str, Any]) -> str:
     )
 
 
-async def backfill(start: date, end: date):
-    require_db()
-    engine = get_engine()
+# Off in --workers shards: those runs span long ranges, and one rebuild is
+# cheaper than N processes taking turns on the store's manifest lock
+REFRESH_BAR_STORE = True
 
-    for d in daterange(start, end):
-        # Skip weekends (Polygon often returns empty anyway)
-        if d.weekday() >= 5:
-            continue
 
-        ds = d.strftime("%Y-%m-%d")
+def refresh_bar_store(d: date, payload: List[Tuple]) -> None:
+    """Append a committed day to the mmap bar store, if one has been built."""
+    if not REFRESH_BAR_STORE:
+        return
+    store = bar_columns.get_store()
+    if store is None:
+        return
+    try:
+        store.append_day(d, as_rows(payload))  # serialized by the store's manifest lock
+    except Exception as e:
+        print(f"{d}: bar store refresh failed: {e}")
+
 
+async def fetch_grouped_daily_patiently(ds: str, max_waits: int = 5) -> List[Dict[str, Any]]:
+    """
+    fetch_grouped_daily, but when the circuit breaker is open wait out the
+    cooldown instead of skipping the day (429s/5xx are already retried inside).
+    """
+    for _ in range(max_waits):
         try:
-            rows = await fetch_grouped_daily(ds)  # should return a list[dict]
-        except Exception as e:
-            print(f"{ds}: Polygon ERROR: {e}")
-            continue
+            return await fetch_grouped_daily(ds)
+        except PolygonUnavailable as e:
+            print(f"{ds}: Polygon circuit open, waiting {e.retry_in:.0f}s")
+            await asyncio.sleep(e.retry_in)
+    return await fetch_grouped_daily(ds)
 
-        if not rows:
-            print(f"{ds}: no rows (holiday?)")
-            continue
 
-        df = pd.DataFrame(rows)
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(1, int(os.getenv(name, str(default))))
+    except ValueError:
+        return default
 
-        # Grouped daily endpoint commonly uses:
-        # T = ticker, o/h/l/c, v=volume, vw=vwap, n=trades
-        if "T" not in df.columns:
-            print(f"{ds}: unexpected payload keys: {list(df.columns)[:30]}")
-            continue
 
-        payload: List[Dict[str, Any]] = []
-        for _, r in df.iterrows():
-            ticker = str(r.get("T", "")).strip().upper()
-            if not ticker:
-                continue
+class DayResult(NamedTuple):
+    day: date
+    status: str        # "ok" | "partial" | "empty" | "fetch_error" | "bad_payload" | "db_error"
+                       # (the log may turn "empty" into "no_data", see LOG_DAY_SQL)
+    rows: int
+    bad: int
+    fetch_s: float
+    write_s: float
+    detail: str = ""
+
+
+def build_payload(d: date, rows: List[Dict[str, Any]]) -> Optional[List[Tuple]]:
+    """
+    Grouped-daily results -> bars_daily records for day `d`, as tuples in
+    bars_daily.COLUMNS order (what COPY writes); None if the payload looks wrong.
+
+    Normalised a column at a time: non-finite numbers become NULL, counts
+    outside BIGINT become NULL, tickers are stripped/upper-cased and blank
+    ones dropped.
+    """
+    df = pd.DataFrame(rows)
+
+    # Grouped daily endpoint commonly uses:
+    # T = ticker, o/h/l/c, v=volume, vw=vwap, n=trades
+    if "T" not in df.columns:
+        print(f"{d}: unexpected payload keys: {list(df.columns)[:30]}")
+        return None
 
-            payload.append({
-                "date": d,  # IMPORTANT: pass actual Python date object
-                "ticker": ticker,
-                "open":  safe_float(r.get("o")),
-                "high":  safe_float(r.get("h")),
-                "low":   safe_float(r.get("l")),
-                "close": safe_float(r.get("c")),
-                "volume": safe_bigint(r.get("v")),
-                "vwap":  safe_float(r.get("vw")),
-                "trades": safe_bigint(r.get("n")),
+    tickers = df["T"].where(df["T"].notna(), "").astype(str).str.strip().str.upper()
+    keep = (tickers != "").to_numpy()
+    if not keep.all():
+        df = df[keep]
+        tickers = tickers[keep]
+    n = len(df)
+
+    cols = {name: float_column(df.get(key), n) for name, key in FLOAT_FIELDS}
+    cols.update({name: bigint_column(df.get(key), n) for name, key in INT_FIELDS})
+
+    return list(zip(
+        [d] * n,  # IMPORTANT: actual Python date objects
+        tickers.tolist(),
+        *(cols[c] for c in bars_daily.COLUMNS[2:]),
+    ))
+
+
+def upsert_bisect(conn, rows: List[Dict[str, Any]]) -> Tuple[int, List[Tuple[Dict[str, Any], str]]]:
+    """
+    Upsert `rows` under a savepoint; if that fails, split in half and recurse,
+    so k bad rows among n cost O(k log n) statements and the good rows stay in
+    the (still healthy) outer transaction. Returns (ok, [(row, error)]).
+
+    Only row-level errors (DataError / IntegrityError) are bisected; anything
+    else (lost connection, OperationalError, ...) is raised so the day is
+    logged as db_error and retried instead of every row being "rejected".
+    """
+    try:
+        with conn.begin_nested():
+            conn.execute(UPSERT_SQL, rows)
+        return len(rows), []
+    except (DataError, IntegrityError) as e:
+        if e.connection_invalidated:
+            raise
+        if len(rows) == 1:
+            return 0, [(rows[0], str(getattr(e, "orig", None) or e).strip())]
+    mid = len(rows) // 2
+    ok_a, bad_a = upsert_bisect(conn, rows[:mid])
+    ok_b, bad_b = upsert_bisect(conn, rows[mid:])
+    return ok_a + ok_b, bad_a + bad_b
+
+
+def _jsonable(v: Any) -> Any:
+    # jsonb takes neither NUL characters nor NaN/inf
+    if isinstance(v, str):
+        return v.replace("\x00", "\\0")
+    if isinstance(v, float) and not math.isfinite(v):
+        return str(v)
+    if isinstance(v, date):
+        return v.isoformat()
+    return v
+
+
+def save_rejects(conn, d: date, rejects: List[Tuple[Dict[str, Any], str]]) -> None:
+    params = [
+        {
+            "date": d,
+            "ticker": _jsonable(row.get("ticker")),
+            "row_data": json.dumps({k: _jsonable(v) for k, v in row.items()}),
+            "error": _jsonable(err)[:2000],
+        }
+        for row, err in rejects
+    ]
+    try:
+        with conn.begin_nested():
+            conn.execute(INSERT_REJECTS_SQL, params)
+    except DBAPIError as e:
+        print(f"{d}: could not record {len(rejects)} rejects: {e}")
+
+
+def write_day(engine, d: date, payload: List[Tuple]) -> Tuple[int, int]:
+    """
+    Upsert one day in its own transaction so one bad day never wipes the run.
+    Bad rows are bisected out (upsert_bisect) into bars_daily_rejects and the
+    rest commits. Returns (ok, bad) row counts. Sync: writers call it through
+    asyncio.to_thread.
+    """
+    ds = d.strftime("%Y-%m-%d")
+    rows = as_rows(payload)
+    with engine.begin() as conn:
+        ok, rejects = upsert_bisect(conn, rows)
+        if rejects:
+            for row, err in rejects[:20]:
+                print(f"{ds}: BAD ROW -> {summarize_row(row)} :: {err.splitlines()[0] if err else ''}")
+            if len(rejects) > 20:
+                print(f"{ds}: ... and {len(rejects) - 20} more")
+            save_rejects(conn, d, rejects)
+    return ok, len(rejects)
+
+
+def load_mode() -> str:
+    mode = os.getenv("BACKFILL_LOAD", "copy").strip().lower()
+    return mode if mode in ("copy", "executemany") else "copy"
+
+
+def copy_days(engine, days: List[Tuple[date, List[Tuple]]]) -> int:
+    """
+    Bulk path: every day's rows through one COPY into bars_daily_staging and
+    one merge, all in a single transaction. Raises on any bad row; the
+    caller then falls back to write_day per day.
+    """
+    with engine.begin() as conn:
+        return bars_daily.copy_upsert(conn, (r for _, payload in days for r in payload))
+
+
+def completed_days(engine, start: date, end: date) -> set:
+    with engine.connect() as conn:
+        rows = conn.execute(
+            SELECT_DONE_SQL, {"statuses": list(DONE_STATUSES), "start": start, "end": end}
+        )
+        return {r[0] for r in rows}
+
+
+def last_completed_day(engine) -> Optional[date]:
+    with engine.connect() as conn:
+        return conn.execute(SELECT_LAST_DONE_SQL, {"statuses": list(DONE_STATUSES)}).scalar()
+
+
+def first_retry_day(engine) -> Optional[date]:
+    """
+    Earliest logged day that failed (fetch / payload / DB error), which
+    --incremental must not skip. "empty" days are left to full runs.
+    """
+    with engine.connect() as conn:
+        return conn.execute(
+            SELECT_FIRST_RETRY_SQL, {"statuses": list(DONE_STATUSES + WAITING_STATUSES)}
+        ).scalar()
+
+
+def ensure_partitions(engine, years) -> None:
+    with engine.begin() as conn:
+        bars_daily.ensure_partitions(conn, years)
+
+
+def log_day(engine, res: "DayResult") -> None:
+    """Checkpoint one day. Days after the last settled session are never logged, so they are refetched."""
+    if res.day > bars_daily.settled_through():
+        return
+    try:
+        with engine.begin() as conn:
+            conn.execute(LOG_DAY_SQL, {
+                "date": res.day,
+                "row_count": res.rows,
+                "status": res.status,
+                "detail": res.detail[:500] or None,
+                "max_empty": _env_int("BACKFILL_EMPTY_RETRIES", 3),
             })
+    except Exception as e:
+        print(f"{res.day}: ingest log write failed: {e}")
 
-        # Commit per-day so one bad day never wipes the whole run
-        try:
-            with engine.begin() as conn:
-                try:
-                    conn.execute(UPSERT_SQL, payload)
-                    print(f"{ds}: upserted {len(payload)} rows (batch)")
-                except Exception as e:
-                    print(f"{ds}: batch failed, falling back. Err={e}")
-
-                    ok = 0
-                    bad = 0
-
-                    # First fallback: 500-row chunks
-                    for ch in chunked(payload, 500):
-                        try:
-                            conn.execute(UPSERT_SQL, ch)
-                            ok += len(ch)
-                        except Exception:
-                            # Second fallback: isolate the exact bad row(s)
-                            for row in ch:
-                                try:
-                                    conn.execute(UPSERT_SQL, [row])
-                                    ok += 1
-                                except Exception as e2:
-                                    bad += 1
-                                    print(f"{ds}: BAD ROW -> {summarize_row(row)} :: {e2}")
-
-                    print(f"{ds}: finished day ok={ok} bad={bad}")
 
+def plan_days(engine, start: date, end: date, force: bool = False) -> List[date]:
+    """
+    Trading sessions in [start, end] still to fetch: everything not marked done
+    in bars_daily_ingest_log (or everything, with `force`). Also creates the
+    yearly partitions those days go into.
+    """
+    # Weekends and exchange holidays have no grouped bars; never ask for them
+    days = trading_calendar.sessions(start, end)
+    if not force:
+        done = completed_days(engine, start, end)
+        if done:
+            print(f"skipping {len(done)} days already in bars_daily_ingest_log")
+        days = [d for d in days if d not in done]
+
+    # Writers insert straight into the yearly partitions; create missing ones up front
+    if days:
+        ensure_partitions(engine, {d.year for d in days})
+    return days
+
+
+async def backfill(
+    start: date,
+    end: date,
+    fetchers: Optional[int] = None,
+    writers: Optional[int] = None,
+    queue_size: Optional[int] = None,
+    force: bool = False,
+) -> List[DayResult]:
+    """
+    Fetch every trading session in [start, end] that bars_daily_ingest_log does not
+    already mark done (failed and never-tried days are retried). `force`
+    refetches done days too.
+    """
+    require_db()
+    engine = get_engine()
+
+    days = await asyncio.to_thread(plan_days, engine, start, end, force)
+    if not days:
+        print(f"{start}..{end}: nothing to do")
+        return []
+
+    # Reuse one pooled connection to Polygon for every day in the run
+    async with polygon_session():
+        return await _backfill_days(engine, days, fetchers, writers, queue_size)
+
+
+async def _backfill_days(
+    engine,
+    days: List[date],
+    fetchers: Optional[int] = None,
+    writers: Optional[int] = None,
+    queue_size: Optional[int] = None,
+    on_result: Optional[Callable[[DayResult], None]] = None,
+    quiet: bool = False,
+) -> List[DayResult]:
+    """
+    The pipeline itself. `on_result` sees every DayResult as it lands;
+    `quiet` drops the per-day lines and the closing summary.
+    """
+    fetchers = fetchers or _env_int("BACKFILL_FETCHERS", 4)
+    writers = writers or _env_int("BACKFILL_WRITERS", 2)
+    queue_size = queue_size or _env_int("BACKFILL_QUEUE", 8)
+    batch_days = _env_int("BACKFILL_BATCH_DAYS", 5)
+    use_copy = load_mode() == "copy" and engine.dialect.driver == "psycopg"
+
+    todo: asyncio.Queue = asyncio.Queue()
+    for d in days:
+        todo.put_nowait(d)
+    fetched: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+
+    results: List[DayResult] = []
+    t_start = time.perf_counter()
+
+    def report(res: DayResult) -> None:
+        results.append(res)
+        if on_result is not None:
+            on_result(res)
+        if quiet:
+            return
+        ds = res.day.strftime("%Y-%m-%d")
+        timing = f"fetch {res.fetch_s:.2f}s, write {res.write_s:.2f}s"
+        progress = f"[{len(results)}/{len(days)}]"
+        if res.status == "ok":
+            print(f"{ds}: upserted {res.rows} rows ({timing}) {progress}")
+        elif res.status == "partial":
+            print(f"{ds}: finished day ok={res.rows} bad={res.bad} ({timing}) {progress}")
+        elif res.status == "empty":
+            print(f"{ds}: no rows from Polygon for a trading session, will retry {progress}")
+        else:
+            print(f"{ds}: {res.status}: {res.detail} {progress}")
+
+    async def record(res: DayResult) -> None:
+        report(res)
+        await asyncio.to_thread(log_day, engine, res)
+
+    async def fetcher() -> None:
+        while True:
+            try:
+                d = todo.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            ds = d.strftime("%Y-%m-%d")
+            t0 = time.perf_counter()
+            try:
+                rows = await fetch_grouped_daily_patiently(ds)  # should return a list[dict]
+            except Exception as e:
+                await record(DayResult(d, "fetch_error", 0, 0, time.perf_counter() - t0, 0.0, f"Polygon ERROR: {e}"))
+                continue
+            fetch_s = time.perf_counter() - t0
+
+            if not rows:
+                await fetched.put((d, [], fetch_s))
+                continue
+            try:
+                payload = await asyncio.to_thread(build_payload, d, rows)
+            except Exception as e:
+                # a malformed body must cost one day, not the whole run
+                await record(DayResult(d, "bad_payload", 0, 0, fetch_s, 0.0, f"payload build failed: {e!r}"))
+                continue
+            if payload is None:
+                await record(DayResult(d, "bad_payload", 0, 0, fetch_s, 0.0, "unexpected payload"))
+                continue
+            await fetched.put((d, payload, fetch_s))
+
+    async def write_one(d: date, payload: List[Tuple], fetch_s: float) -> None:
+        t0 = time.perf_counter()
+        try:
+            ok, bad = await asyncio.to_thread(write_day, engine, d, payload)
         except Exception as e:
-            print(f"{ds}: DB ERROR during upsert (outer): {e}")
+            await record(DayResult(d, "db_error", 0, 0, fetch_s, time.perf_counter() - t0,
+                             f"DB ERROR during upsert (outer): {e}"))
+            return
+        await asyncio.to_thread(refresh_bar_store, d, payload)
+        await record(DayResult(d, "ok" if not bad else "partial", ok, bad, fetch_s, time.perf_counter() - t0,
+                               f"{bad} rows in bars_daily_rejects" if bad else ""))
+
+    async def write_batch(batch: List[Tuple[date, List[Tuple], float]]) -> None:
+        for d, payload, fetch_s in batch:
+            if not payload:
+                # a calendar session with no bars: not done, and not in the bar store
+                await record(DayResult(d, "empty", 0, 0, fetch_s, 0.0, "empty grouped response"))
+        batch = [b for b in batch if b[1]]
+        if not batch:
+            return
+
+        if use_copy:
+            t0 = time.perf_counter()
+            try:
+                await asyncio.to_thread(copy_days, engine, [(d, p) for d, p, _ in batch])
+            except Exception as e:
+                print(f"{batch[0][0]}..{batch[-1][0]}: COPY batch failed, retrying day by day. Err={e}")
+            else:
+                # the batch shares one transaction; split its time evenly
+                write_s = (time.perf_counter() - t0) / len(batch)
+                for d, payload, fetch_s in batch:
+                    await asyncio.to_thread(refresh_bar_store, d, payload)
+                    await record(DayResult(d, "ok", len(payload), 0, fetch_s, write_s))
+                return
+
+        for d, payload, fetch_s in batch:
+            await write_one(d, payload, fetch_s)
+
+    async def writer() -> None:
+        done = False
+        while not done:
+            item = await fetched.get()
+            if item is None:
+                return
+            batch = [item]
+            # take whatever else is already waiting, up to batch_days
+            while len(batch) < batch_days:
+                try:
+                    nxt = fetched.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                if nxt is None:
+                    done = True
+                    break
+                batch.append(nxt)
+            await write_batch(sorted(batch, key=lambda b: b[0]))
+
+    writer_tasks = [asyncio.create_task(writer()) for _ in range(writers)]
+    try:
+        await asyncio.gather(*(fetcher() for _ in range(min(fetchers, max(1, len(days))))))
+        for _ in writer_tasks:
+            await fetched.put(None)
+        await asyncio.gather(*writer_tasks)
+    finally:
+        for t in writer_tasks:
+            t.cancel()
+
+    if not quiet:
+        print_summary(results, time.perf_counter() - t_start)
+    return results
+
+
+def print_summary(results: List[DayResult], wall: float) -> None:
+    by_status: Dict[str, int] = {}
+    for r in results:
+        by_status[r.status] = by_status.get(r.status, 0) + 1
+    rows = sum(r.rows for r in results)
+    wall = max(wall, 1e-9)
+
+    print("-" * 60)
+    print(f"days: {len(results)}  " + "  ".join(f"{k}={v}" for k, v in sorted(by_status.items())))
+    print(f"rows: {rows}  wall: {wall:.1f}s  "
+          f"{len(results) / wall:.2f} days/s  {rows / wall:,.0f} rows/s")
+    failed = sorted(r.day for r in results if r.status not in DONE_STATUSES)
+    if failed:
+        print("failed days: " + ", ".join(f"{d:%Y-%m-%d}" for d in failed))
+
+
+# ---------- Sharded (--workers) ----------
+
+# Polygon knobs split evenly between shards so N processes stay inside one budget
+_BUDGET_ENV = ("POLYGON_RATE_PER_MIN", "POLYGON_RATE_BURST", "POLYGON_MAX_CONCURRENCY")
+
+
+def shard_env(workers: int) -> Dict[str, str]:
+    env: Dict[str, str] = {}
+    for name in _BUDGET_ENV:
+        raw = os.getenv(name)
+        if name == "POLYGON_MAX_CONCURRENCY" and raw is None:
+            raw = "10"  # polygon_client's default
+        try:
+            val = float(raw) if raw is not None else 0.0
+        except ValueError:
             continue
+        if val > 0:
+            env[name] = str(max(1, int(val // workers)))
+    return env
+
+
+def split_shards(days: List[date], workers: int) -> List[List[date]]:
+    """Contiguous, near-equal runs of days: each shard writes mostly one partition."""
+    n = max(1, min(workers, len(days)))
+    size, extra = divmod(len(days), n)
+    out: List[List[date]] = []
+    i = 0
+    for k in range(n):
+        j = i + size + (1 if k < extra else 0)
+        out.append(days[i:j])
+        i = j
+    return out
+
+
+def _run_shard(shard_id: int, days: List[date], fetchers, writers, env: Dict[str, str], progress) -> Dict[str, Any]:
+    """Process-pool entry point: one shard, own engine, own Polygon client."""
+    global REFRESH_BAR_STORE
+    os.environ.update(env)
+    REFRESH_BAR_STORE = False
+
+    def on_result(res: DayResult) -> None:
+        progress.put((shard_id, res.status, res.rows))
+
+    async def run() -> List[DayResult]:
+        async with polygon_session():
+            return await _backfill_days(
+                get_engine(), days, fetchers, writers, on_result=on_result, quiet=True
+            )
+
+    t0 = time.perf_counter()
+    results = asyncio.run(run())
+    by_status: Dict[str, int] = {}
+    for r in results:
+        by_status[r.status] = by_status.get(r.status, 0) + 1
+    return {
+        "shard": shard_id,
+        "first": days[0],
+        "last": days[-1],
+        "days": len(results),
+        "rows": sum(r.rows for r in results),
+        "wall": time.perf_counter() - t0,
+        "by_status": by_status,
+        "failed": sorted(r.day for r in results if r.status not in DONE_STATUSES),
+    }
+
+
+def _progress_printer(progress, total: int, t_start: float) -> None:
+    """Folds every shard's day results into one status line until it reads None."""
+    done = rows = failed = 0
+    while True:
+        item = progress.get()
+        if item is None:
+            break
+        _, status, n = item
+        done += 1
+        rows += n
+        if status not in DONE_STATUSES:
+            failed += 1
+        wall = max(time.perf_counter() - t_start, 1e-9)
+        print(
+            f"\r[{done}/{total}] days  failed={failed}  rows={rows:,}  "
+            f"{done / wall:.2f} days/s  {rows / wall:,.0f} rows/s",
+            end="", flush=True,
+        )
+    print()
+
+
+def backfill_sharded(
+    start: date,
+    end: date,
+    workers: int,
+    fetchers: Optional[int] = None,
+    writers: Optional[int] = None,
+    force: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    Same as backfill(), with the days split into `workers` contiguous shards
+    run by a process pool. Each shard has its own DB engine and Polygon client
+    and gets 1/N of POLYGON_RATE_PER_MIN / _RATE_BURST / _MAX_CONCURRENCY.
+    The mmap bar store is not appended to; rebuild it afterwards.
+    """
+    require_db()
+    days = plan_days(get_engine(), start, end, force)
+    if not days:
+        print(f"{start}..{end}: nothing to do")
+        return []
+
+    shards = split_shards(days, workers)
+    env = shard_env(len(shards))
+    print(f"{len(days)} days in {len(shards)} shards; per-shard Polygon budget: {env or 'unlimited'}")
+
+    ctx = multiprocessing.get_context("spawn")
+    t_start = time.perf_counter()
+    reports: List[Dict[str, Any]] = []
+    with ctx.Manager() as manager:
+        progress = manager.Queue()
+        printer = threading.Thread(
+            target=_progress_printer, args=(progress, len(days), t_start), daemon=True
+        )
+        printer.start()
+        with ProcessPoolExecutor(max_workers=len(shards), mp_context=ctx) as pool:
+            futures = {
+                pool.submit(_run_shard, i, shard, fetchers, writers, env, progress): i
+                for i, shard in enumerate(shards)
+            }
+            for fut in as_completed(futures):
+                i = futures[fut]
+                try:
+                    reports.append(fut.result())
+                except Exception as e:
+                    reports.append({
+                        "shard": i, "first": shards[i][0], "last": shards[i][-1],
+                        "days": 0, "rows": 0, "wall": 0.0,
+                        "by_status": {"crashed": len(shards[i])}, "failed": [], "error": repr(e),
+                    })
+        progress.put(None)
+        printer.join()
+
+    print_shard_report(reports, time.perf_counter() - t_start)
+    if bar_columns.get_store() is not None:
+        print("bar store not updated in --workers mode: run python -m Scripts.build_bar_store")
+    return reports
+
+
+def print_shard_report(reports: List[Dict[str, Any]], wall: float) -> None:
+    wall = max(wall, 1e-9)
+    print("-" * 60)
+    for r in sorted(reports, key=lambda r: r["shard"]):
+        statuses = "  ".join(f"{k}={v}" for k, v in sorted(r["by_status"].items()))
+        print(
+            f"shard {r['shard']}: {r['first']:%Y-%m-%d}..{r['last']:%Y-%m-%d}  "
+            f"days={r['days']}  rows={r['rows']:,}  wall={r['wall']:.1f}s  {statuses}"
+        )
+        if r.get("error"):
+            print(f"  crashed: {r['error']}")
+        if r["failed"]:
+            print("  failed days: " + ", ".join(f"{d:%Y-%m-%d}" for d in r["failed"]))
+    days = sum(r["days"] for r in reports)
+    rows = sum(r["rows"] for r in reports)
+    print(f"total: days={days}  rows={rows:,}  wall={wall:.1f}s  "
+          f"{days / wall:.2f} days/s  {rows / wall:,.0f} rows/s")
+
+
+def parse_args(argv=None):
+    today = date.today()
+    ap = argparse.ArgumentParser(description="Backfill bars_daily from Polygon grouped daily")
+    ap.add_argument("--start", type=date.fromisoformat, default=date(today.year - 4, 1, 1),
+                    help="first day (default: Jan 1st four years ago)")
+    ap.add_argument("--end", type=date.fromisoformat, default=today, help="last day (default: today)")
+    ap.add_argument("--incremental", action="store_true",
+                    help="start the day after the last completed day in bars_daily_ingest_log")
+    ap.add_argument("--force", action="store_true", help="refetch days already marked done")
+    ap.add_argument("--fetchers", type=int, default=None, help="overrides BACKFILL_FETCHERS")
+    ap.add_argument("--writers", type=int, default=None, help="overrides BACKFILL_WRITERS")
+    ap.add_argument("--workers", type=int, default=1,
+                    help="split the days over N processes (fetchers/writers are per process)")
+    return ap.parse_args(argv)
+
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    start = args.start
+    if args.incremental:
+        require_db()
+        last = last_completed_day(get_engine())
+        if last is not None:
+            start = last + timedelta(days=1)
+            retry = first_retry_day(get_engine())
+            if retry is not None and retry < start:
+                start = retry  # done days in between are skipped by plan_days
+    print(f"backfill {start}..{args.end}")
+    if args.workers > 1:
+        backfill_sharded(start, args.end, args.workers, args.fetchers, args.writers, force=args.force)
+    else:
+        asyncio.run(backfill(start, args.end, args.fetchers, args.writers, force=args.force))
+    # cached /markets/bars responses may predate the rows just written
+    invalidate(["bars"])
 
 
 if __name__ == "__main__":
-    # START WITH A SHORT TEST WINDOW FIRST (sanity check)
-    # After you confirm counts look good, change to a 4-year backfill.
-
-    end = date.today()
-    start = date(end.year - 4, 1, 1)
-
-    asyncio.run(backfill(start, end))
+    # Nightly:   python -m Scripts.backfill_bars_daily --incremental
+    # Full run:  python -m Scripts.backfill_bars_daily   (skips days already done)
+    main()
@@ -0,0 +1,103 @@
+# Scripts/bench_bars_load.py
+"""
+executemany vs COPY+merge for loading grouped days into bars_daily.
+
+    python -m Scripts.bench_bars_load --days 20 --tickers 10000
+
+Rows are synthetic (Scripts/fake_polygon.py bars) dated in 1971 so they can't
+collide with real data, and every run is rolled back: nothing is left behind.
+Each path is timed twice, into empty keys (insert) and over the rows it just
+wrote (conflict -> update), since a re-run backfill mostly hits the second.
+Needs DATABASE_URL with migrations 005 and 007 applied.
+"""
+import argparse
+import os
+import time
+from datetime import date, timedelta
+from typing import Any, Dict, List
+
+from sqlalchemy import create_engine
+from dotenv import load_dotenv
+
+from app.services import bars_daily
+from Scripts.fake_polygon import fake_bar, universe
+
+load_dotenv()
+
+
+def synthetic_days(n_days: int, n_tickers: int) -> List[List[Dict[str, Any]]]:
+    names = universe(n_tickers)
+    out: List[List[Dict[str, Any]]] = []
+    d = date(1971, 1, 4)
+    while len(out) < n_days:
+        if d.weekday() < 5:
+            day = []
+            for t in names:
+                b = fake_bar(t, d)
+                day.append({
+                    "date": d, "ticker": t,
+                    "open": b["o"], "high": b["h"], "low": b["l"], "close": b["c"],
+                    "volume": b["v"], "vwap": b["vw"], "trades": b["n"],
+                })
+            out.append(day)
+        d += timedelta(days=1)
+    return out
+
+
+def load_executemany(conn, days: List[List[Dict[str, Any]]]) -> None:
+    for payload in days:
+        bars_daily.upsert_rows(conn, payload)
+
+
+def load_copy(conn, days: List[List[Dict[str, Any]]], batch_days: int) -> None:
+    for i in range(0, len(days), batch_days):
+        bars_daily.copy_upsert(conn, (
+            tuple(r[c] for c in bars_daily.COLUMNS)
+            for day in days[i:i + batch_days] for r in day
+        ))
+
+
+def run(engine, name: str, fn, days) -> None:
+    rows = sum(len(d) for d in days)
+    with engine.connect() as conn:
+        trans = conn.begin()
+        try:
+            # 1971 has no partition; created here, it goes away with the rollback
+            bars_daily.ensure_partitions(conn, {d[0]["date"].year for d in days})
+            timings = []
+            for _ in ("insert", "update"):
+                t0 = time.perf_counter()
+                fn(conn, days)
+                timings.append(time.perf_counter() - t0)
+        finally:
+            trans.rollback()
+    ins, upd = timings
+    print(
+        f"{name:<12} insert {ins:7.2f}s ({rows / ins:>10,.0f} rows/s)   "
+        f"update {upd:7.2f}s ({rows / upd:>10,.0f} rows/s)"
+    )
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--days", type=int, default=20)
+    ap.add_argument("--tickers", type=int, default=10000)
+    ap.add_argument("--batch-days", type=int, default=5, help="days per COPY merge")
+    args = ap.parse_args()
+
+    url = os.getenv("DATABASE_URL")
+    if not url:
+        raise RuntimeError("Set DATABASE_URL in your environment/.env")
+    engine = create_engine(url, future=True)
+    with engine.connect() as conn:
+        if not bars_daily.supports_copy(conn):
+            raise RuntimeError("COPY path needs the psycopg (3) driver: postgresql+psycopg://...")
+
+    days = synthetic_days(args.days, args.tickers)
+    print(f"{len(days)} days x {args.tickers} tickers = {sum(len(d) for d in days):,} rows")
+    run(engine, "executemany", load_executemany, days)
+    run(engine, "copy+merge", lambda conn, d: load_copy(conn, d, args.batch_days), days)
+
+
+if __name__ == "__main__":
+    main()
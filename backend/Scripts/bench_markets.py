@@ -0,0 +1,156 @@
+# Scripts/bench_markets.py
+"""
+End-to-end timings for the market-data paths, meant to run against
+Scripts/fake_polygon.py so no network or API key is needed:
+
+    python -m Scripts.fake_polygon --latency-ms 80 --rate-429 0.02 &
+    POLYGON_BASE_URL=http://127.0.0.1:8900 POLYGON_API_KEY=fake uvicorn app.main:app &
+
+    python -m Scripts.bench_markets bars --requests 500 --concurrency 20
+    python -m Scripts.bench_markets batch --symbols 200 --start 2024-01-02 --end 2024-06-28 --format ndjson
+    POLYGON_BASE_URL=http://127.0.0.1:8900 POLYGON_API_KEY=fake \\
+        python -m Scripts.bench_markets backfill --start 2024-01-02 --end 2024-03-29
+
+`bars` and `batch` hit a running API (--api); `backfill` runs
+Scripts/backfill_bars_daily.py in-process against DATABASE_URL.
+Truncate bars_daily / bars_daily_coverage between runs to measure cold fills.
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from datetime import date
+from typing import List
+
+import httpx
+
+from Scripts.fake_polygon import universe
+
+
+def _report(name: str, latencies: List[float], wall: float, failures: int, extra: str = "") -> None:
+    lat = sorted(latencies)
+    if not lat:
+        print(f"{name}: no successful requests ({failures} failed)")
+        return
+
+    def pct(p: float) -> float:
+        return lat[min(len(lat) - 1, int(p * len(lat)))] * 1000
+
+    print(
+        f"{name}: n={len(lat)} failed={failures} wall={wall:.2f}s "
+        f"rps={len(lat) / wall:.1f} p50={pct(0.50):.1f}ms p95={pct(0.95):.1f}ms "
+        f"p99={pct(0.99):.1f}ms mean={statistics.mean(lat) * 1000:.1f}ms {extra}".rstrip()
+    )
+
+
+async def bench_bars(args) -> None:
+    names = universe(args.universe)
+    timeframes = args.timeframes.split(",")
+    latencies: List[float] = []
+    failures = 0
+    sem = asyncio.Semaphore(args.concurrency)
+
+    async with httpx.AsyncClient(base_url=args.api, timeout=120) as client:
+        async def one() -> None:
+            nonlocal failures
+            params = {"ticker": random.choice(names), "timeframe": random.choice(timeframes)}
+            async with sem:
+                t0 = time.perf_counter()
+                resp = await client.get("/api/markets/bars", params=params)
+                dt = time.perf_counter() - t0
+            if resp.status_code == 200:
+                latencies.append(dt)
+            else:
+                failures += 1
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(args.requests)))
+        wall = time.perf_counter() - t0
+
+    _report("get_bars", latencies, wall, failures)
+
+
+async def bench_batch(args) -> None:
+    names = universe(args.universe)
+    latencies: List[float] = []
+    first_byte: List[float] = []
+    failures = 0
+    total_bytes = 0
+
+    async with httpx.AsyncClient(base_url=args.api, timeout=600) as client:
+        t_all = time.perf_counter()
+        for _ in range(args.requests):
+            body = {
+                "symbols": random.sample(names, min(args.symbols, len(names))),
+                "start": args.start,
+                "end": args.end,
+            }
+            t0 = time.perf_counter()
+            async with client.stream(
+                "POST", "/api/markets/bars/daily/batch",
+                params={"format": args.format}, json=body,
+            ) as resp:
+                got_first = False
+                async for chunk in resp.aiter_bytes():
+                    if not got_first:
+                        first_byte.append(time.perf_counter() - t0)
+                        got_first = True
+                    total_bytes += len(chunk)
+            dt = time.perf_counter() - t0
+            if resp.status_code == 200:
+                latencies.append(dt)
+            else:
+                failures += 1
+        wall = time.perf_counter() - t_all
+
+    ttfb = f"ttfb_p50={statistics.median(first_byte) * 1000:.1f}ms" if first_byte else ""
+    _report(
+        f"batch_daily_bars[{args.format}, {args.symbols} symbols]",
+        latencies, wall, failures,
+        f"{ttfb} bytes={total_bytes}",
+    )
+
+
+async def bench_backfill(args) -> None:
+    from Scripts.backfill_bars_daily import backfill
+
+    start, end = date.fromisoformat(args.start), date.fromisoformat(args.end)
+    t0 = time.perf_counter()
+    await backfill(start, end, force=args.force)
+    wall = time.perf_counter() - t0
+    print(f"backfill {start}..{end}: wall={wall:.2f}s")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Benchmark market-data paths")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("bars", help="GET /api/markets/bars")
+    p.add_argument("--api", default="http://127.0.0.1:8000")
+    p.add_argument("--requests", type=int, default=200)
+    p.add_argument("--concurrency", type=int, default=10)
+    p.add_argument("--universe", type=int, default=200, help="draw tickers from this many symbols")
+    p.add_argument("--timeframes", default="1D,1M,6M,1Y")
+
+    p = sub.add_parser("batch", help="POST /api/markets/bars/daily/batch")
+    p.add_argument("--api", default="http://127.0.0.1:8000")
+    p.add_argument("--requests", type=int, default=5)
+    p.add_argument("--symbols", type=int, default=100)
+    p.add_argument("--universe", type=int, default=2000)
+    p.add_argument("--start", required=True)
+    p.add_argument("--end", required=True)
+    p.add_argument("--format", default="json", choices=("json", "ndjson", "arrow"))
+
+    p = sub.add_parser("backfill", help="Scripts/backfill_bars_daily.backfill in-process")
+    p.add_argument("--start", required=True)
+    p.add_argument("--end", required=True)
+    p.add_argument("--force", action="store_true", help="refetch days already in bars_daily_ingest_log")
+
+    args = ap.parse_args()
+    runner = {"bars": bench_bars, "batch": bench_batch, "backfill": bench_backfill}[args.cmd]
+    asyncio.run(runner(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+# Scripts/bench_payload.py
+"""
+Per-day transform time of the backfill: grouped-daily JSON results ->
+bars_daily records, old row-wise path vs the column-wise build_payload.
+
+    python -m Scripts.bench_payload --tickers 10000 --repeat 5
+
+Input is a synthetic grouped day (Scripts/fake_polygon.py) with a sprinkling
+of the junk the normalisation exists for: NaN/inf prices, blank tickers,
+out-of-range volumes. No DB or network needed.
+"""
+import argparse
+import math
+import time
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from Scripts.backfill_bars_daily import BIGINT_MIN, build_payload
+from Scripts.fake_polygon import fake_bar, universe
+
+DAY = date(2024, 3, 1)
+
+
+# ---------- previous implementation, kept verbatim for comparison ----------
+
+def _is_finite_number(x) -> bool:
+    try:
+        return x is not None and isinstance(x, (int, float)) and math.isfinite(float(x))
+    except Exception:
+        return False
+
+
+def _safe_float(x) -> Optional[float]:
+    return float(x) if _is_finite_number(x) else None
+
+
+def _safe_bigint(x) -> Optional[int]:
+    try:
+        if x is None:
+            return None
+        if isinstance(x, float):
+            if math.isnan(x) or math.isinf(x):
+                return None
+        if isinstance(x, str):
+            x = x.strip()
+            if x == "":
+                return None
+            x = float(x)
+        v = int(x)
+        if v < BIGINT_MIN or v > 9223372036854775807:
+            return None
+        return v
+    except Exception:
+        return None
+
+
+def legacy_build_payload(d: date, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    df = pd.DataFrame(rows)
+    payload: List[Dict[str, Any]] = []
+    for _, r in df.iterrows():
+        ticker = str(r.get("T", "")).strip().upper()
+        if not ticker:
+            continue
+        payload.append({
+            "date": d,
+            "ticker": ticker,
+            "open":  _safe_float(r.get("o")),
+            "high":  _safe_float(r.get("h")),
+            "low":   _safe_float(r.get("l")),
+            "close": _safe_float(r.get("c")),
+            "volume": _safe_bigint(r.get("v")),
+            "vwap":  _safe_float(r.get("vw")),
+            "trades": _safe_bigint(r.get("n")),
+        })
+    return payload
+
+
+# ---------- bench ----------
+
+def synthetic_day(n: int) -> List[Dict[str, Any]]:
+    rows = [dict(fake_bar(t, DAY), T=t) for t in universe(n)]
+    for i in range(0, n, 97):
+        rows[i]["vw"] = float("nan")
+    for i in range(5, n, 211):
+        rows[i]["v"] = 1e20
+    for i in range(11, n, 503):
+        rows[i]["T"] = "  "
+    return rows
+
+
+def best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Backfill payload transform micro-benchmark")
+    ap.add_argument("--tickers", type=int, default=10000)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    rows = synthetic_day(args.tickers)
+    old = legacy_build_payload(DAY, rows)
+    new = build_payload(DAY, rows)
+    print(f"{len(rows)} results -> {len(new)} records (legacy: {len(old)})")
+
+    t_old = best_of(lambda: legacy_build_payload(DAY, rows), args.repeat)
+    t_new = best_of(lambda: build_payload(DAY, rows), args.repeat)
+    print(f"iterrows     {t_old * 1000:8.1f} ms/day")
+    print(f"column-wise  {t_new * 1000:8.1f} ms/day   ({t_old / t_new:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
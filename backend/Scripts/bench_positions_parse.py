@@ -0,0 +1,199 @@
+# Scripts/bench_positions_parse.py
+"""
+Parse time of a Fidelity positions export, the old DictReader + pick() +
+to_num() loop vs the header-profile, index-based parse_positions.
+
+    python -m Scripts.bench_positions_parse --rows 100000 --repeat 3
+
+Input is a synthetic export with the real header row, $ / % / comma /
+paren formatting, "--" cells, SPAXX and Pending Activity lines. No DB or
+network needed (importing the router still wants DATABASE_URL set; nothing
+connects).
+"""
+import argparse
+import csv
+import io
+import json
+import random
+import re
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app.routers.uploads import new_skip_reasons, norm, parse_positions, pick  # noqa: E402
+from app.services import upload_stream  # noqa: E402
+from Scripts.fake_polygon import universe  # noqa: E402
+
+HEADER = [
+    "Account Number", "Account Name", "Symbol", "Description", "Quantity",
+    "Last Price", "Last Price Change", "Current Value", "Today's Gain/Loss Dollar",
+    "Today's Gain/Loss Percent", "Total Gain/Loss Dollar", "Total Gain/Loss Percent",
+    "Percent Of Account", "Cost Basis Total", "Average Cost Basis", "Type",
+]
+
+
+# ---------- previous implementation, kept verbatim for comparison ----------
+
+def legacy_to_num(x):
+    """Robust numeric parser: handles $, %, commas, parens, stray chars."""
+    if x is None:
+        return None
+    s = str(x).strip()
+    if s == "" or s == "--" or s.lower() == "n/a":
+        return None
+
+    neg = s.startswith("(") and s.endswith(")")
+    s = s.replace(",", "").replace("$", "").replace("%", "")
+    s = re.sub(r"[^0-9.\-]", "", s)
+
+    if s in ("", ".", "-"):
+        return None
+
+    try:
+        v = float(s)
+        return -v if neg and v > 0 else v
+    except Exception:
+        return None
+
+
+def legacy_parse(content: bytes) -> int:
+    buf = io.StringIO(content.decode("utf-8", errors="ignore"))
+    reader = csv.DictReader(buf)
+    cols = {c.lower(): c for c in (reader.fieldnames or [])}
+
+    c_symbol        = pick(cols, "symbol", "security symbol", "ticker")
+    c_qty           = pick(cols, "quantity", "shares", "current shares")
+    c_avgcost       = pick(cols, "average cost basis", "average cost", "cost basis per share", "average cost basis")
+    c_lastpx        = pick(cols, "last price", "price", "current price")
+    c_lastpx_change = pick(cols, "last price change", "price change")
+    c_currval       = pick(cols, "current va", "current value", "market value")
+    c_todays_dollar = pick(cols, "today's ga $", "todays gain $", "today's gain $")
+    c_todays_pct    = pick(cols, "today's ga %", "todays gain %", "today's gain %")
+    c_total_dollar  = pick(cols, "total gain/loss dollar", "total gain dollar", "total gain/loss $")
+    c_total_pct     = pick(cols, "total gain/loss percent", "total gain %")
+    c_percent_of    = pick(cols, "percent of account", "percent of")
+    c_costbasis_tot = pick(cols, "cost basis total", "cost basis t")
+    c_acctname      = pick(cols, "account name", "account")
+    c_acctnum       = pick(cols, "account number", "account #")
+    c_desc          = pick(cols, "description")
+    c_type          = pick(cols, "type")
+
+    out = []
+    for row in reader:
+        acct_number = norm(row.get(c_acctnum)) if c_acctnum else None
+        acct_name   = norm(row.get(c_acctname)) if c_acctname else None
+        symbol      = norm(row.get(c_symbol)) if c_symbol else ""
+        description = norm(row.get(c_desc)) if c_desc else None
+        sec_type    = norm(row.get(c_type)) if c_type else None
+
+        qty                = legacy_to_num(row.get(c_qty)) if c_qty else None
+        last_price         = legacy_to_num(row.get(c_lastpx)) if c_lastpx else None
+        last_price_change  = legacy_to_num(row.get(c_lastpx_change)) if c_lastpx_change else None
+        current_value      = legacy_to_num(row.get(c_currval)) if c_currval else None
+        todays_gain_dollar = legacy_to_num(row.get(c_todays_dollar)) if c_todays_dollar else None
+        todays_gain_pct    = legacy_to_num(row.get(c_todays_pct)) if c_todays_pct else None
+        total_gain_dollar  = legacy_to_num(row.get(c_total_dollar)) if c_total_dollar else None
+        total_gain_pct     = legacy_to_num(row.get(c_total_pct)) if c_total_pct else None
+        percent_of         = legacy_to_num(row.get(c_percent_of)) if c_percent_of else None
+        cost_basis_total   = legacy_to_num(row.get(c_costbasis_tot)) if c_costbasis_tot else None
+        avg_cost           = legacy_to_num(row.get(c_avgcost)) if c_avgcost else None
+
+        if cost_basis_total is None and qty is not None and avg_cost is not None:
+            cost_basis_total = qty * avg_cost
+
+        out.append({
+            "account_number": acct_number,
+            "account_name": acct_name,
+            "symbol": symbol,
+            "description": description,
+            "quantity": qty,
+            "last_price": last_price,
+            "last_price_change": last_price_change,
+            "current_value": current_value,
+            "todays_gain_dollar": todays_gain_dollar,
+            "todays_gain_pct": todays_gain_pct,
+            "total_gain_dollar": total_gain_dollar,
+            "total_gain_pct": total_gain_pct,
+            "percent_of": percent_of,
+            "cost_basis": cost_basis_total,
+            "average_cost": avg_cost,
+            "security_type": sec_type,
+            "raw_row": json.dumps(row, ensure_ascii=False),
+        })
+    return len(out)
+
+
+# ---------- bench ----------
+
+def money(v: float) -> str:
+    s = f"${abs(v):,.2f}"
+    return f"-{s}" if v < 0 else f"+{s}"
+
+
+def synthetic_export(n: int, seed: int = 7) -> bytes:
+    rng = random.Random(seed)
+    names = universe(2000)
+    accounts = [(f"Z{10000000 + i}", name) for i, name in
+                enumerate(["Individual", "ROTH IRA", "Traditional IRA", "HSA", "Brokerage 2"])]
+    out = io.StringIO()
+    w = csv.writer(out)
+    w.writerow(HEADER)
+    for i in range(n):
+        acct_num, acct_name = rng.choice(accounts)
+        if i % 50 == 0:
+            w.writerow([acct_num, acct_name, "SPAXX**", "HELD IN MONEY MARKET", "", "", "", money(rng.uniform(10, 5e4)),
+                        "", "", "", "", f"{rng.uniform(0, 20):.2f}%", "", "", "Cash"])
+            continue
+        if i % 97 == 0:
+            w.writerow([acct_num, acct_name, "Pending Activity", "", "", "", "", money(rng.uniform(-500, 500)),
+                        "", "", "", "", "", "", "", ""])
+            continue
+        qty = round(rng.uniform(0.5, 500), 3)
+        px = rng.uniform(5, 800)
+        avg = px * rng.uniform(0.6, 1.4)
+        chg = rng.uniform(-0.05, 0.05) * px
+        w.writerow([
+            acct_num, acct_name, rng.choice(names), "SYNTHETIC CORP COM", f"{qty:,}",
+            f"${px:,.2f}", money(chg), f"${qty * px:,.2f}", money(qty * chg),
+            f"{chg / px * 100:+.2f}%", money(qty * (px - avg)), f"{(px / avg - 1) * 100:+.2f}%",
+            f"{rng.uniform(0, 10):.2f}%", f"${qty * avg:,.2f}", f"${avg:,.2f}",
+            "Margin" if i % 7 else "--",
+        ])
+    return out.getvalue().encode()
+
+
+def current_parse(content: bytes) -> int:
+    reasons = new_skip_reasons()
+    lines = upload_stream.iter_lines(io.BytesIO(content), "utf-8", errors="ignore")
+    return len(list(parse_positions(csv.reader(lines), reasons)))
+
+
+def best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Fidelity positions parse micro-benchmark")
+    ap.add_argument("--rows", type=int, default=100_000)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    content = synthetic_export(args.rows)
+    rows_old, rows_new = legacy_parse(content), current_parse(content)
+    print(f"{len(content) / 1e6:.1f} MB, {rows_new} rows (legacy: {rows_old})")
+
+    t_old = best_of(lambda: legacy_parse(content), args.repeat)
+    t_new = best_of(lambda: current_parse(content), args.repeat)
+    print(f"DictReader + pick     {t_old * 1000:8.0f} ms  ({rows_old / t_old:>9,.0f} rows/s)")
+    print(f"profile + csv.reader  {t_new * 1000:8.0f} ms  ({rows_new / t_new:>9,.0f} rows/s)   ({t_old / t_new:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
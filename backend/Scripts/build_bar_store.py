@@ -0,0 +1,76 @@
+# Scripts/build_bar_store.py
+"""
+(Re)build the memory-mapped bar store (app/services/bar_columns.py) from bars_daily.
+
+    python -m Scripts.build_bar_store                  # whole table
+    python -m Scripts.build_bar_store 2022-01-01 2025-12-31
+
+After this, the backfill appends each new day to the store on its own.
+"""
+import os
+import sys
+import time
+from datetime import date
+
+import numpy as np
+from sqlalchemy import create_engine, text
+from dotenv import load_dotenv
+
+from app.services import bar_columns
+
+load_dotenv()
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+
+CHUNK_ROWS = 200_000
+
+
+def main(argv):
+    if not DATABASE_URL:
+        raise RuntimeError("Set DATABASE_URL in your environment/.env")
+    engine = create_engine(DATABASE_URL, future=True)
+
+    with engine.connect() as conn:
+        if len(argv) >= 2:
+            first, last = date.fromisoformat(argv[0]), date.fromisoformat(argv[1])
+        else:
+            first, last = conn.execute(text("SELECT MIN(date), MAX(date) FROM bars_daily")).one()
+            if first is None:
+                print("bars_daily is empty, nothing to build")
+                return
+
+        t0 = time.perf_counter()
+        result = conn.execution_options(stream_results=True, yield_per=CHUNK_ROWS).execute(
+            text("""
+                SELECT date, ticker, open, high, low, close, volume, vwap, trades
+                FROM bars_daily
+                WHERE date BETWEEN :first AND :last
+            """),
+            {"first": first, "last": last},
+        )
+
+        tick_parts, col_parts = [], []
+        total = 0
+        for chunk in result.mappings().partitions():
+            t, c = bar_columns.columns_from_rows(chunk)
+            tick_parts.append(t)
+            col_parts.append(c)
+            total += len(t)
+            print(f"read {total} rows", end="\r")
+
+    if not tick_parts:
+        print(f"no rows between {first} and {last}")
+        return
+
+    tickers = np.concatenate(tick_parts)
+    cols = {c: np.concatenate([p[c] for p in col_parts]) for c in bar_columns.COLS}
+    store = bar_columns.build(bar_columns._store_dir(), tickers, cols, first, last)
+
+    print(
+        f"\nbuilt {store.root}: {total} rows, {len(store.bases[0].index)} tickers, "
+        f"{first}..{last} in {time.perf_counter() - t0:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
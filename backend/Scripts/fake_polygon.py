@@ -0,0 +1,230 @@
+# Scripts/fake_polygon.py
+"""
+Local stand-in for the two Polygon endpoints we use, for offline runs and
+load tests:
+
+  /v2/aggs/ticker/{T}/range/1/day/{start}/{end}
+  /v2/aggs/grouped/locale/us/market/stocks/{date}
+
+Bodies come from recorded fixtures when there is one (record them by running
+anything against the real API with POLYGON_RECORD_DIR set), otherwise they
+are generated: every (ticker, session) gets the same bar on every call, so
+repeated runs and runs against a warm bars_daily agree. Weekends and NYSE
+holidays come back empty, like the real API.
+
+    python -m Scripts.fake_polygon --port 8900 --latency-ms 80 --rate-429 0.05
+    POLYGON_BASE_URL=http://127.0.0.1:8900 POLYGON_API_KEY=fake uvicorn app.main:app
+
+Flags (or the matching FAKE_POLYGON_* env vars, for `uvicorn Scripts.fake_polygon:app`):
+  --fixtures DIR        replay recorded bodies from DIR          (FAKE_POLYGON_FIXTURES)
+  --fixtures-only       404 instead of generating when missing   (FAKE_POLYGON_FIXTURES_ONLY=1)
+  --tickers N           size of the generated grouped universe   (FAKE_POLYGON_TICKERS, default 5000)
+  --latency-ms MS       added to every response                  (FAKE_POLYGON_LATENCY_MS, default 0)
+  --jitter-ms MS        extra uniform 0..MS on top               (FAKE_POLYGON_JITTER_MS, default 0)
+  --rate-429 P          fraction answered 429 + Retry-After      (FAKE_POLYGON_RATE_429, default 0)
+  --rate-5xx P          fraction answered 503                    (FAKE_POLYGON_RATE_5XX, default 0)
+  --retry-after S       Retry-After seconds on 429s              (FAKE_POLYGON_RETRY_AFTER, default 1)
+"""
+import argparse
+import asyncio
+import math
+import os
+import random
+import zlib
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import FileResponse, JSONResponse
+
+from app.services import trading_calendar
+from app.services.bars_daily import session_epoch
+from app.services.polygon_client import fixture_name
+
+# A few real names so the usual UI symbols resolve; the rest are synthetic.
+KNOWN_TICKERS = [
+    "AAPL", "MSFT", "NVDA", "AMZN", "GOOGL", "META", "TSLA", "BRK.B", "JPM", "V",
+    "SPY", "QQQ", "IWM", "DIA", "XOM", "UNH", "JNJ", "PG", "HD", "COST",
+]
+
+
+class Settings:
+    def __init__(
+        self,
+        fixtures: Optional[str] = None,
+        fixtures_only: bool = False,
+        tickers: int = 5000,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        rate_429: float = 0.0,
+        rate_5xx: float = 0.0,
+        retry_after: float = 1.0,
+    ):
+        self.fixtures = fixtures
+        self.fixtures_only = fixtures_only
+        self.tickers = tickers
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.rate_429 = rate_429
+        self.rate_5xx = rate_5xx
+        self.retry_after = retry_after
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        env = os.getenv
+        return cls(
+            fixtures=env("FAKE_POLYGON_FIXTURES") or None,
+            fixtures_only=env("FAKE_POLYGON_FIXTURES_ONLY", "0") in ("1", "true", "yes"),
+            tickers=int(env("FAKE_POLYGON_TICKERS", "5000")),
+            latency_ms=float(env("FAKE_POLYGON_LATENCY_MS", "0")),
+            jitter_ms=float(env("FAKE_POLYGON_JITTER_MS", "0")),
+            rate_429=float(env("FAKE_POLYGON_RATE_429", "0")),
+            rate_5xx=float(env("FAKE_POLYGON_RATE_5XX", "0")),
+            retry_after=float(env("FAKE_POLYGON_RETRY_AFTER", "1")),
+        )
+
+
+# ---------- Generated data ----------
+
+def universe(n: int) -> List[str]:
+    """KNOWN_TICKERS, then AAAA, AAAB, ... up to n symbols."""
+    out = list(KNOWN_TICKERS[:n])
+    i = 0
+    while len(out) < n:
+        k, name = i, ""
+        for _ in range(4):
+            k, r = divmod(k, 26)
+            name = chr(65 + r) + name
+        if name not in KNOWN_TICKERS:
+            out.append(name)
+        i += 1
+    return out
+
+
+def fake_bar(ticker: str, d: date) -> Dict[str, Any]:
+    """Deterministic daily bar for (ticker, d): a slow sine around a per-ticker level plus noise."""
+    seed = zlib.crc32(ticker.encode())
+    rng = random.Random(seed ^ d.toordinal())
+    level = 5 + (seed % 500)
+    close = level * (1 + 0.25 * math.sin(d.toordinal() / 40 + seed % 97)) * (1 + rng.uniform(-0.02, 0.02))
+    open_ = close * (1 + rng.uniform(-0.01, 0.01))
+    high = max(open_, close) * (1 + rng.uniform(0, 0.015))
+    low = min(open_, close) * (1 - rng.uniform(0, 0.015))
+    volume = int(10_000 + (seed % 5_000_000) * rng.uniform(0.5, 1.5))
+    return {
+        "o": round(open_, 4),
+        "h": round(high, 4),
+        "l": round(low, 4),
+        "c": round(close, 4),
+        "v": volume,
+        "vw": round((open_ + high + low + close) / 4, 4),
+        "n": max(1, volume // 120),
+        "t": session_epoch(d) * 1000,
+    }
+
+
+# ---------- App ----------
+
+def create_app(settings: Settings) -> FastAPI:
+    app = FastAPI(title="Fake Polygon")
+    names = universe(settings.tickers)
+
+    async def faults() -> Optional[JSONResponse]:
+        delay = settings.latency_ms + random.uniform(0, settings.jitter_ms)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+        roll = random.random()
+        if roll < settings.rate_429:
+            return JSONResponse(
+                {"status": "ERROR", "error": "fake rate limit"},
+                status_code=429,
+                headers={"Retry-After": f"{settings.retry_after:g}"},
+            )
+        if roll < settings.rate_429 + settings.rate_5xx:
+            return JSONResponse({"status": "ERROR", "error": "fake outage"}, status_code=503)
+        return None
+
+    def fixture(request: Request):
+        if not settings.fixtures:
+            return None
+        path = os.path.join(
+            settings.fixtures, fixture_name(request.url.path, dict(request.query_params))
+        )
+        if os.path.exists(path):
+            return FileResponse(path, media_type="application/json")
+        if settings.fixtures_only:
+            return JSONResponse({"status": "NOT_FOUND", "error": "no fixture"}, status_code=404)
+        return None
+
+    @app.get("/v2/aggs/ticker/{ticker}/range/1/day/{start}/{end}")
+    async def aggs(ticker: str, start: date, end: date, request: Request):
+        err = await faults()
+        if err is not None:
+            return err
+        hit = fixture(request)
+        if hit is not None:
+            return hit
+        ticker = ticker.upper()
+        results = [fake_bar(ticker, d) for d in trading_calendar.sessions(start, end)]
+        return {
+            "ticker": ticker,
+            "status": "OK",
+            "adjusted": request.query_params.get("adjusted", "true") == "true",
+            "queryCount": len(results),
+            "resultsCount": len(results),
+            "results": results,
+        }
+
+    @app.get("/v2/aggs/grouped/locale/us/market/stocks/{day}")
+    async def grouped(day: date, request: Request):
+        err = await faults()
+        if err is not None:
+            return err
+        hit = fixture(request)
+        if hit is not None:
+            return hit
+        results = []
+        if trading_calendar.is_session(day):
+            results = [dict(fake_bar(t, day), T=t) for t in names]
+        return {
+            "status": "OK",
+            "adjusted": request.query_params.get("adjusted", "true") == "true",
+            "queryCount": len(results),
+            "resultsCount": len(results),
+            "results": results,
+        }
+
+    return app
+
+
+app = create_app(Settings.from_env())
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    defaults = Settings.from_env()
+    ap = argparse.ArgumentParser(description="Local fake Polygon aggregates API")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8900)
+    ap.add_argument("--fixtures", default=defaults.fixtures)
+    ap.add_argument("--fixtures-only", action="store_true", default=defaults.fixtures_only)
+    ap.add_argument("--tickers", type=int, default=defaults.tickers)
+    ap.add_argument("--latency-ms", type=float, default=defaults.latency_ms)
+    ap.add_argument("--jitter-ms", type=float, default=defaults.jitter_ms)
+    ap.add_argument("--rate-429", type=float, default=defaults.rate_429)
+    ap.add_argument("--rate-5xx", type=float, default=defaults.rate_5xx)
+    ap.add_argument("--retry-after", type=float, default=defaults.retry_after)
+    args = ap.parse_args()
+
+    settings = Settings(
+        fixtures=args.fixtures,
+        fixtures_only=args.fixtures_only,
+        tickers=args.tickers,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        rate_429=args.rate_429,
+        rate_5xx=args.rate_5xx,
+        retry_after=args.retry_after,
+    )
+    uvicorn.run(create_app(settings), host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,152 @@
+# Scripts/gen_trading_calendar.py
+"""
+Regenerate app/services/trading_calendar_data.py (NYSE full holidays and
+1:00pm early closes) from the exchange's rules plus the one-off closures.
+
+    python -m Scripts.gen_trading_calendar              # 2000..2035
+    python -m Scripts.gen_trading_calendar 1990 2040
+
+Check new years against the published NYSE calendar when extending the range:
+one-off closures (national days of mourning, weather) have to be added to
+SPECIAL_CLOSURES by hand.
+"""
+import json
+import os
+import sys
+from datetime import date, timedelta
+from typing import Dict, List
+
+OUT = os.path.join(os.path.dirname(__file__), "..", "app", "services", "trading_calendar_data.py")
+
+SPECIAL_CLOSURES = {
+    date(2001, 9, 11): "September 11",
+    date(2001, 9, 12): "September 11",
+    date(2001, 9, 13): "September 11",
+    date(2001, 9, 14): "September 11",
+    date(2004, 6, 11): "Reagan day of mourning",
+    date(2007, 1, 2): "Ford day of mourning",
+    date(2012, 10, 29): "Hurricane Sandy",
+    date(2012, 10, 30): "Hurricane Sandy",
+    date(2018, 12, 5): "G.H.W. Bush day of mourning",
+    date(2025, 1, 9): "Carter day of mourning",
+}
+
+
+def easter(year: int) -> date:
+    """Gregorian Easter Sunday (anonymous Gregorian algorithm)."""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def nth_weekday(year: int, month: int, weekday: int, n: int) -> date:
+    d = date(year, month, 1)
+    d += timedelta(days=(weekday - d.weekday()) % 7)
+    return d + timedelta(weeks=n - 1)
+
+
+def last_weekday(year: int, month: int, weekday: int) -> date:
+    d = date(year, month + 1, 1) - timedelta(days=1)
+    return d - timedelta(days=(d.weekday() - weekday) % 7)
+
+
+def observed(d: date) -> date:
+    """Saturday holidays move to Friday, Sunday ones to Monday."""
+    if d.weekday() == 5:
+        return d - timedelta(days=1)
+    if d.weekday() == 6:
+        return d + timedelta(days=1)
+    return d
+
+
+def holidays(year: int) -> Dict[date, str]:
+    out: Dict[date, str] = {}
+
+    # New Year's Day: Sunday -> Monday; a Saturday one is not made up on Dec 31
+    ny = date(year, 1, 1)
+    if ny.weekday() == 6:
+        out[ny + timedelta(days=1)] = "New Year's Day"
+    elif ny.weekday() < 5:
+        out[ny] = "New Year's Day"
+
+    if year >= 1998:
+        out[nth_weekday(year, 1, 0, 3)] = "Martin Luther King Jr. Day"
+    out[nth_weekday(year, 2, 0, 3)] = "Washington's Birthday"
+    out[easter(year) - timedelta(days=2)] = "Good Friday"
+    out[last_weekday(year, 5, 0)] = "Memorial Day"
+    if year >= 2022:
+        out[observed(date(year, 6, 19))] = "Juneteenth"
+    out[observed(date(year, 7, 4))] = "Independence Day"
+    out[nth_weekday(year, 9, 0, 1)] = "Labor Day"
+    out[nth_weekday(year, 11, 3, 4)] = "Thanksgiving Day"
+    out[observed(date(year, 12, 25))] = "Christmas Day"
+
+    for d, name in SPECIAL_CLOSURES.items():
+        if d.year == year:
+            out[d] = name
+    return out
+
+
+def early_closes(year: int, closed: Dict[date, str]) -> Dict[date, str]:
+    """1:00pm closes: eve of Independence Day, day after Thanksgiving, Christmas Eve."""
+    out: Dict[date, str] = {}
+    candidates = [
+        date(year, 7, 3),
+        nth_weekday(year, 11, 3, 4) + timedelta(days=1),
+        date(year, 12, 24),
+    ]
+    for d in candidates:
+        if d.weekday() < 5 and d not in closed:
+            out[d] = "13:00"
+    return out
+
+
+def render(first: int, last: int) -> str:
+    closed: Dict[date, str] = {}
+    early: Dict[date, str] = {}
+    for y in range(first, last + 1):
+        h = holidays(y)
+        closed.update(h)
+        early.update(early_closes(y, h))
+
+    lines: List[str] = [
+        "# app/services/trading_calendar_data.py",
+        '"""',
+        "NYSE holidays and early closes. GENERATED by Scripts/gen_trading_calendar.py,",
+        "do not edit by hand; see app/services/trading_calendar.py for the API.",
+        '"""',
+        "from datetime import date",
+        "",
+        f"FIRST_YEAR = {first}",
+        f"LAST_YEAR = {last}",
+        "",
+        "# weekday closures only; weekends are never sessions",
+        "HOLIDAYS = {",
+    ]
+    for d in sorted(closed):
+        if d.weekday() < 5:
+            lines.append(f"    date({d.year}, {d.month}, {d.day}): {json.dumps(closed[d])},")
+    lines += ["}", "", "# local (New York) close time on shortened sessions", "EARLY_CLOSES = {"]
+    for d in sorted(early):
+        lines.append(f"    date({d.year}, {d.month}, {d.day}): {json.dumps(early[d])},")
+    lines += ["}", ""]
+    return "\n".join(lines)
+
+
+def main(argv: List[str]) -> None:
+    first, last = (int(argv[0]), int(argv[1])) if len(argv) >= 2 else (2000, 2035)
+    with open(OUT, "w") as fh:
+        fh.write(render(first, last))
+    print(f"wrote {os.path.normpath(OUT)} ({first}..{last})")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
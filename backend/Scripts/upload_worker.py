@@ -0,0 +1,43 @@
+# Scripts/upload_worker.py
+"""
+Standalone consumer for the upload_jobs queue, for running the API with
+UPLOAD_WORKERS=0 and doing the loads somewhere else:
+
+    python -m Scripts.upload_worker              # UPLOAD_WORKERS tasks (default 2)
+    python -m Scripts.upload_worker --workers 4
+
+Needs the same DATABASE_URL and a UPLOAD_SPOOL_DIR the API writes to.
+"""
+import argparse
+import asyncio
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app.services import upload_jobs  # noqa: E402
+# the routers register the "positions" / "nav" handlers on import
+from app.routers import performance, uploads  # noqa: E402,F401
+
+
+async def run(workers: int) -> None:
+    await upload_jobs.start_workers(workers)
+    print(f"upload worker: {workers} task(s) on {upload_jobs.SPOOL_DIR}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await upload_jobs.stop_workers()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Process queued uploads (app/services/upload_jobs.py)")
+    ap.add_argument("--workers", type=int, default=max(1, upload_jobs.WORKERS))
+    args = ap.parse_args()
+    try:
+        asyncio.run(run(args.workers))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+BEGIN;
+
+-- Daily OHLCV per ticker. Filled in bulk by Scripts/backfill_bars_daily.py
+-- (grouped daily) and on demand by the /api/markets read-through cache.
+CREATE TABLE IF NOT EXISTS public.bars_daily (
+  date    DATE NOT NULL,
+  ticker  TEXT NOT NULL,
+  open    DOUBLE PRECISION,
+  high    DOUBLE PRECISION,
+  low     DOUBLE PRECISION,
+  close   DOUBLE PRECISION,
+  volume  BIGINT,
+  vwap    DOUBLE PRECISION,
+  trades  BIGINT,
+  PRIMARY KEY (date, ticker)
+);
+
+-- Per-ticker range reads (charts, batch endpoint)
+CREATE INDEX IF NOT EXISTS ix_bars_daily_ticker_date
+ON public.bars_daily (ticker, date);
+
+-- Date span per ticker that has already been fetched from Polygon.
+-- Days inside the span with no bar are holidays/halts, not cache misses,
+-- so the read-through cache never asks upstream for them again.
+CREATE TABLE IF NOT EXISTS public.bars_daily_coverage (
+  ticker      TEXT PRIMARY KEY,
+  first_date  DATE NOT NULL,
+  last_date   DATE NOT NULL,
+  checked_at  TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+COMMIT;
@@ -0,0 +1,24 @@
+BEGIN;
+
+-- Landing area for bulk loads (COPY FROM STDIN) into bars_daily.
+-- UNLOGGED: no WAL for rows that only live until the merge in the same
+-- transaction. Each load tags its rows with a random batch_id so concurrent
+-- backfill writers never merge or clear each other's rows.
+CREATE UNLOGGED TABLE IF NOT EXISTS public.bars_daily_staging (
+  batch_id  BIGINT NOT NULL,
+  seq       BIGSERIAL,
+  date      DATE NOT NULL,
+  ticker    TEXT NOT NULL,
+  open      DOUBLE PRECISION,
+  high      DOUBLE PRECISION,
+  low       DOUBLE PRECISION,
+  close     DOUBLE PRECISION,
+  volume    BIGINT,
+  vwap      DOUBLE PRECISION,
+  trades    BIGINT
+);
+
+CREATE INDEX IF NOT EXISTS ix_bars_daily_staging_batch
+ON public.bars_daily_staging (batch_id);
+
+COMMIT;
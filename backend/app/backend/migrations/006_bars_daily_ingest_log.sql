@@ -0,0 +1,14 @@
+BEGIN;
+
+-- Backfill checkpoint: one row per grouped day Scripts/backfill_bars_daily.py
+-- has attempted. Days with status ok / partial / no_data are skipped on the
+-- next run; anything else (empty, fetch_error, bad_payload, db_error) is retried.
+CREATE TABLE IF NOT EXISTS public.bars_daily_ingest_log (
+  date        DATE PRIMARY KEY,
+  row_count   INTEGER NOT NULL DEFAULT 0,
+  status      TEXT NOT NULL,
+  detail      TEXT,
+  fetched_at  TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+COMMIT;
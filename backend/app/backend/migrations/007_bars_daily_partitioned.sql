@@ -0,0 +1,89 @@
+BEGIN;
+
+-- bars_daily becomes RANGE-partitioned by calendar year (bars_daily_y2024, ...).
+-- A grouped-day upsert lands in exactly one partition; a per-ticker window
+-- read is pruned to the year(s) it spans.
+--
+-- Indexes (declared on the parent, created on every partition):
+--   PRIMARY KEY (date, ticker)   upserts / ON CONFLICT
+--   ix_bars_daily_ticker_date    per-ticker range scans
+--   ix_bars_daily_date_brin      date-range scans; rows arrive in date order,
+--                                so a few pages of BRIN cover a whole year
+
+-- Creates the partition for year `y` if missing; true if it had to.
+-- Called by app/services/bars_daily.ensure_partitions before writes, so new
+-- years appear on their own.
+CREATE OR REPLACE FUNCTION public.bars_daily_ensure_partition(y INT)
+RETURNS BOOLEAN
+LANGUAGE plpgsql AS $$
+DECLARE
+  part TEXT := format('bars_daily_y%s', y);
+BEGIN
+  IF to_regclass(format('public.%I', part)) IS NOT NULL THEN
+    RETURN FALSE;
+  END IF;
+  EXECUTE format(
+    'CREATE TABLE IF NOT EXISTS public.%I PARTITION OF public.bars_daily FOR VALUES FROM (%L) TO (%L)',
+    part, make_date(y, 1, 1), make_date(y + 1, 1, 1)
+  );
+  RETURN TRUE;
+END;
+$$;
+
+DO $$
+DECLARE
+  first_year INT;
+  last_year  INT := extract(year FROM now())::INT + 1;
+BEGIN
+  -- already partitioned (re-run): nothing to convert
+  IF EXISTS (
+    SELECT 1 FROM pg_partitioned_table p
+    JOIN pg_class c ON c.oid = p.partrelid
+    WHERE c.relname = 'bars_daily' AND c.relnamespace = 'public'::regnamespace
+  ) THEN
+    RETURN;
+  END IF;
+
+  ALTER TABLE public.bars_daily RENAME TO bars_daily_unpartitioned;
+  ALTER TABLE public.bars_daily_unpartitioned
+    RENAME CONSTRAINT bars_daily_pkey TO bars_daily_unpartitioned_pkey;
+  ALTER INDEX IF EXISTS public.ix_bars_daily_ticker_date
+    RENAME TO ix_bars_daily_unpartitioned_ticker_date;
+
+  CREATE TABLE public.bars_daily (
+    date    DATE NOT NULL,
+    ticker  TEXT NOT NULL,
+    open    DOUBLE PRECISION,
+    high    DOUBLE PRECISION,
+    low     DOUBLE PRECISION,
+    close   DOUBLE PRECISION,
+    volume  BIGINT,
+    vwap    DOUBLE PRECISION,
+    trades  BIGINT,
+    PRIMARY KEY (date, ticker)
+  ) PARTITION BY RANGE (date);
+
+  CREATE INDEX ix_bars_daily_ticker_date ON public.bars_daily (ticker, date);
+  CREATE INDEX ix_bars_daily_date_brin ON public.bars_daily USING brin (date);
+
+  SELECT LEAST(COALESCE(extract(year FROM MIN(date))::INT, 2000), 2000)
+  INTO first_year
+  FROM public.bars_daily_unpartitioned;
+
+  FOR y IN first_year..last_year LOOP
+    PERFORM public.bars_daily_ensure_partition(y);
+  END LOOP;
+
+  -- date order keeps each partition's heap (and so its BRIN ranges) tight
+  INSERT INTO public.bars_daily (date, ticker, open, high, low, close, volume, vwap, trades)
+  SELECT date, ticker, open, high, low, close, volume, vwap, trades
+  FROM public.bars_daily_unpartitioned
+  ORDER BY date, ticker;
+
+  DROP TABLE public.bars_daily_unpartitioned;
+END;
+$$;
+
+ANALYZE public.bars_daily;
+
+COMMIT;
@@ -0,0 +1,19 @@
+BEGIN;
+
+-- Rows the backfill could not upsert into bars_daily, with the database
+-- error, so a bad value never costs the rest of its day. Filled by the
+-- savepoint bisection in Scripts/backfill_bars_daily.py; fix and re-run
+-- the day with --force --start D --end D.
+CREATE TABLE IF NOT EXISTS public.bars_daily_rejects (
+  id           BIGSERIAL PRIMARY KEY,
+  date         DATE NOT NULL,
+  ticker       TEXT,
+  row_data     JSONB NOT NULL,
+  error        TEXT NOT NULL,
+  rejected_at  TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS ix_bars_daily_rejects_date
+ON public.bars_daily_rejects (date);
+
+COMMIT;
@@ -0,0 +1,38 @@
+BEGIN;
+
+-- Uploads get-or-create accounts by name with INSERT ... ON CONFLICT, which
+-- needs a unique key. Fold any duplicate names into their oldest row first:
+-- holdings move over unless the survivor already has that (security, as_of),
+-- in which case the duplicate snapshot row is dropped.
+CREATE TEMP TABLE account_dupes ON COMMIT DROP AS
+SELECT a.id AS dupe_id, k.id AS keep_id
+FROM accounts a
+JOIN (
+  SELECT DISTINCT ON (name) id, name
+  FROM accounts
+  ORDER BY name, created_at, id
+) k ON k.name = a.name AND k.id <> a.id;
+
+DELETE FROM holdings h
+USING account_dupes d
+WHERE h.account_id = d.dupe_id
+  AND EXISTS (
+    SELECT 1 FROM holdings k
+    WHERE k.account_id = d.keep_id
+      AND k.security_id = h.security_id
+      AND k.as_of = h.as_of
+  );
+
+UPDATE holdings h
+SET account_id = d.keep_id
+FROM account_dupes d
+WHERE h.account_id = d.dupe_id;
+
+DELETE FROM accounts a
+USING account_dupes d
+WHERE a.id = d.dupe_id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS ux_accounts_name
+ON public.accounts (name);
+
+COMMIT;
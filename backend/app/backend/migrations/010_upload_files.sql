@@ -0,0 +1,26 @@
+BEGIN;
+
+-- One row per file currently loaded by an upload route, keyed by content
+-- hash so an identical re-upload is answered without touching the data.
+-- kind: 'positions' (one row per as_of snapshot; a changed file replaces
+-- the previous one) or 'nav' (as_of NULL; days are upserted).
+CREATE TABLE IF NOT EXISTS public.upload_files (
+  id           BIGSERIAL PRIMARY KEY,
+  kind         TEXT NOT NULL,
+  filename     TEXT,
+  sha256       TEXT NOT NULL,
+  as_of        DATE,
+  byte_count   BIGINT NOT NULL,
+  row_count    INTEGER NOT NULL,
+  counts       JSONB NOT NULL,          -- the route's response counts + skip_reasons
+  duration_ms  INTEGER NOT NULL,
+  ingested_at  TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS ux_upload_files_hash
+ON public.upload_files (kind, sha256, COALESCE(as_of, DATE '0001-01-01'));
+
+CREATE INDEX IF NOT EXISTS ix_upload_files_as_of
+ON public.upload_files (kind, as_of);
+
+COMMIT;
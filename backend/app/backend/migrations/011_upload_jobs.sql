@@ -0,0 +1,28 @@
+BEGIN;
+
+-- Queue + status for background uploads (app/services/upload_jobs.py).
+-- The routes spool the file to UPLOAD_SPOOL_DIR and insert a 'queued' row;
+-- workers claim rows with FOR UPDATE SKIP LOCKED, so any number of API
+-- processes (or Scripts/upload_worker.py) can share the queue.
+CREATE TABLE IF NOT EXISTS public.upload_jobs (
+  id           UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+  kind         TEXT NOT NULL,                    -- 'positions' | 'nav'
+  filename     TEXT,
+  path         TEXT NOT NULL,                    -- spooled copy of the upload
+  params       JSONB NOT NULL DEFAULT '{}',      -- route form fields (as_of, ...)
+  status       TEXT NOT NULL DEFAULT 'queued',   -- queued | running | done | failed
+  bytes_total  BIGINT NOT NULL,
+  progress     JSONB NOT NULL DEFAULT '{}',      -- rows, bytes_done, skip_reasons while running
+  result       JSONB,                            -- the route's response body when done
+  error        TEXT,
+  attempts     INTEGER NOT NULL DEFAULT 0,
+  created_at   TIMESTAMPTZ NOT NULL DEFAULT now(),
+  started_at   TIMESTAMPTZ,
+  finished_at  TIMESTAMPTZ
+);
+
+CREATE INDEX IF NOT EXISTS ix_upload_jobs_pending
+ON public.upload_jobs (created_at)
+WHERE status IN ('queued', 'running');
+
+COMMIT;
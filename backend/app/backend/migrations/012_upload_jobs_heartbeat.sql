@@ -0,0 +1,9 @@
+BEGIN;
+
+-- Workers touch heartbeat_at while a job runs (app/services/upload_jobs.py);
+-- a 'running' job is only reclaimed once its heartbeat, not its start, is
+-- older than UPLOAD_JOB_STALE_S, so a long ingest is not picked up twice.
+ALTER TABLE public.upload_jobs
+  ADD COLUMN IF NOT EXISTS heartbeat_at TIMESTAMPTZ;
+
+COMMIT;
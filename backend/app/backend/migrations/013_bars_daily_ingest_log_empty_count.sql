@@ -0,0 +1,9 @@
+BEGIN;
+
+-- Consecutive empty grouped responses for a session (Scripts/backfill_bars_daily.py).
+-- After BACKFILL_EMPTY_RETRIES of them the day is logged 'no_data' and no
+-- longer retried (e.g. sessions past the plan's history limit).
+ALTER TABLE public.bars_daily_ingest_log
+  ADD COLUMN IF NOT EXISTS empty_count INTEGER NOT NULL DEFAULT 0;
+
+COMMIT;
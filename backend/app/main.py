@@ -1,15 +1,32 @@
 # app/main.py
 import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy import text
 
 from .db import get_db
+from .services.polygon_client import start_client, close_client
+from .services import upload_jobs
 
 # Each of these modules defines: `router = APIRouter()`
 from .routers import portfolio, positions, uploads, transparency, performance, history, markets
 
-app = FastAPI(title="The Obvious Trades API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One pooled Polygon client for the whole process (keep-alive, HTTP/2 if available)
+    await start_client()
+    # Background upload workers (UPLOAD_WORKERS per process, 0 = enqueue only)
+    await upload_jobs.start_workers()
+    try:
+        yield
+    finally:
+        await upload_jobs.stop_workers()
+        await close_client()
+
+
+app = FastAPI(title="The Obvious Trades API", lifespan=lifespan)
 
 # CORS (tighten for prod as needed)
 app.add_middleware(
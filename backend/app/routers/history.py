@@ -7,6 +7,7 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy import text
 
 from app import db as dbmod
+from app.services.cache import cached
 
 # Single router for all history endpoints
 router = APIRouter(prefix="/api/history", tags=["history"])
@@ -14,6 +15,12 @@ router = APIRouter(prefix="/api/history", tags=["history"])
 
 # ---------- Helpers ----------
 
+def _snapshot_ttl(kwargs) -> Optional[int]:
+    """Past snapshots don't change (re-uploads invalidate the tag); today's might."""
+    as_of = kwargs.get("as_of")
+    return None if as_of is not None and as_of < date.today() else 300
+
+
 def f(x) -> Optional[float]:
     """Best-effort float conversion; returns None on failure."""
     if x is None:
@@ -51,6 +58,7 @@ def list_snapshots(conn = Depends(dbmod.get_db)) -> List[str]:
 
 
 @router.get("/positions")
+@cached("history.positions", ttl=_snapshot_ttl, tags=["positions"], key_params=["as_of"])
 def positions_as_of(
     as_of: date,
     conn = Depends(dbmod.get_db),
@@ -1,67 +1,91 @@
 # app/routers/markets.py
-from datetime import date, timedelta
-from typing import List, Dict, Any
+import io
+import json
+from datetime import date
+from typing import List, Dict, Any, AsyncIterator, Optional
 
-import pandas as pd
 from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
-from app.services.polygon import fetch_daily_aggs
+from app.services import trading_calendar
+from app.services.bars_daily import session_epoch
+from app.services.cache import cached
+from app.services.markets import daily_bars_many, iter_daily_bars
+
+try:
+    import pyarrow as pa
+except ImportError:  # only needed for format=arrow
+    pa = None
 
 router = APIRouter(prefix="/api/markets", tags=["markets"])
 
 
-def timeframe_to_start(tf: str) -> date:
-    """Rough conversion of timeframe labels to start date."""
-    today = date.today()
-    tf = (tf or "").upper()
-    if tf == "1D":
-        return today - timedelta(days=2)
-    if tf == "1M":
-        return today - timedelta(days=32)
-    if tf == "3M":
-        return today - timedelta(days=100)
-    if tf == "6M":
-        return today - timedelta(days=200)
-    if tf == "1Y":
-        return today - timedelta(days=370)
-    return today - timedelta(days=365 * 5)
+# Trading sessions per timeframe label. 1D keeps the prior session too so
+# the day's change can be drawn; anything unknown gets five years.
+TIMEFRAME_SESSIONS = {
+    "1D": 2,
+    "1M": 21,
+    "3M": 63,
+    "6M": 126,
+    "1Y": 252,
+}
+
+
+def timeframe_to_start(tf: str, today: Optional[date] = None) -> date:
+    """First day of the window holding exactly the last N trading sessions (today included if open)."""
+    n = TIMEFRAME_SESSIONS.get((tf or "").upper(), 5 * 252)
+    return trading_calendar.sessions_back(today or date.today(), n)
+
+
+def _bars_ttl(kwargs) -> int:
+    # 1D moves during the session; longer windows only gain one bar per day
+    return 60 if (kwargs.get("timeframe") or "").upper() == "1D" else 900
 
 
 @router.get("/bars")
+@cached(
+    "markets.bars",
+    ttl=_bars_ttl,
+    tags=["bars"],
+    key_params=["ticker", "timeframe"],
+    cache_if=lambda out: not out.get("stale"),
+    vary=lambda kwargs: date.today().isoformat(),  # the window ends today
+)
 async def get_bars(
     ticker: str = Query(..., min_length=1),
     timeframe: str = Query("6M"),
 ):
     """
     Return daily OHLC bars for a ticker & timeframe, normalized for the frontend.
+    Served from bars_daily; only missing ranges go to Polygon. If that upstream
+    refresh fails but cached bars exist, they are returned with "stale": true.
     """
     symbol = ticker.upper()
     end = date.today()
     start = timeframe_to_start(timeframe)
 
-    try:
-        results = await fetch_daily_aggs(
-            symbol=symbol,
-            start=f"{start:%Y-%m-%d}",
-            end=f"{end:%Y-%m-%d}",
-            adjusted=True,
-        )
-    except RuntimeError as e:
-        raise HTTPException(status_code=502, detail=str(e))
+    # If Polygon is failing (or the circuit is open) serve what bars_daily has
+    errors: Dict[str, str] = {}
+    rows = (await daily_bars_many([symbol], start, end, errors=errors))[symbol]
+    if errors and not rows:
+        raise HTTPException(status_code=502, detail=errors[symbol])
 
     bars = [
         {
-            "time": int(row["t"] / 1000),  # ms → seconds
-            "open": row["o"],
-            "high": row["h"],
-            "low": row["l"],
-            "close": row["c"],
+            "time": session_epoch(row["date"]),  # seconds, same stamp Polygon uses
+            "open": row["open"],
+            "high": row["high"],
+            "low": row["low"],
+            "close": row["close"],
         }
-        for row in (results or [])
+        for row in rows
     ]
 
-    return {"bars": bars}
+    out: Dict[str, Any] = {"bars": bars}
+    if errors:
+        out["stale"] = True  # cached bars only; upstream refresh failed
+    return out
 
 
 # ---------- BATCH ENDPOINT ----------
@@ -72,47 +96,138 @@ class BatchDailyBarsRequest(BaseModel):
     end: str    # YYYY-MM-DD
 
 
+BATCH_COLUMNS = ["ticker", "date", "open", "high", "low", "close", "volume", "vwap", "trades"]
+
+
+def _batch_row(sym: str, r: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "ticker": sym,
+        "date": f"{r['date']:%Y-%m-%d}",
+        "open": r["open"],
+        "high": r["high"],
+        "low": r["low"],
+        "close": r["close"],
+        "volume": r["volume"],
+        "vwap": r["vwap"],
+        "trades": r["trades"],
+    }
+
+
+async def _ndjson_stream(symbols: List[str], start: date, end: date) -> AsyncIterator[bytes]:
+    errors: Dict[str, str] = {}
+    async for sym, rows in iter_daily_bars(symbols, start, end, errors=errors):
+        lines = [json.dumps(_batch_row(sym, r)) for r in rows]
+        if sym in errors:
+            lines.append(json.dumps({"ticker": sym, "error": errors[sym]}))
+        if lines:
+            yield ("\n".join(lines) + "\n").encode()
+
+
+def _arrow_schema():
+    return pa.schema([
+        ("ticker", pa.string()),
+        ("date", pa.date32()),
+        ("open", pa.float64()),
+        ("high", pa.float64()),
+        ("low", pa.float64()),
+        ("close", pa.float64()),
+        ("volume", pa.int64()),
+        ("vwap", pa.float64()),
+        ("trades", pa.int64()),
+        ("error", pa.string()),
+    ])
+
+
+async def _arrow_stream(symbols: List[str], start: date, end: date) -> AsyncIterator[bytes]:
+    """Arrow IPC stream: schema first, then one record batch per symbol."""
+    schema = _arrow_schema()
+    buf = io.BytesIO()
+    writer = pa.ipc.new_stream(buf, schema)
+
+    def drain() -> bytes:
+        data = buf.getvalue()
+        buf.seek(0)
+        buf.truncate(0)
+        return data
+
+    yield drain()
+
+    errors: Dict[str, str] = {}
+    async for sym, rows in iter_daily_bars(symbols, start, end, errors=errors):
+        cols: Dict[str, List[Any]] = {name: [] for name in schema.names}
+        for r in rows:
+            cols["ticker"].append(sym)
+            for c in BATCH_COLUMNS[1:]:
+                cols[c].append(r[c])
+            cols["error"].append(None)
+        if sym in errors:
+            # one null-valued row carrying the upstream error for this symbol
+            cols["ticker"].append(sym)
+            for c in BATCH_COLUMNS[1:]:
+                cols[c].append(None)
+            cols["error"].append(errors[sym])
+        if cols["ticker"]:
+            writer.write_batch(pa.RecordBatch.from_pydict(cols, schema=schema))
+            yield drain()
+
+    writer.close()
+    yield drain()
+
+
 @router.post("/bars/daily/batch")
-async def batch_daily_bars(req: BatchDailyBarsRequest) -> List[Dict[str, Any]]:
+async def batch_daily_bars(
+    req: BatchDailyBarsRequest,
+    fmt: str = Query("json", alias="format", pattern="^(json|ndjson|arrow)$"),
+):
     """
     Return daily OHLCV for many symbols in a TA-friendly tidy row format.
-    Rows:
-      ticker, date, open, high, low, close, volume, vwap, trades
+    Symbols are filled concurrently (bounded); see app/services/markets.py.
+
+    format=json (default):
+      rows:   [{ticker, date, open, high, low, close, volume, vwap, trades}]
+      errors: {ticker: message} for symbols whose upstream fetch failed
+              (their rows, if any, are whatever was already cached)
+
+    format=ndjson / format=arrow stream symbol by symbol as each is ready, so
+    memory stays flat and clients can start on the first symbol right away:
+      ndjson  one row object per line; a failed symbol adds {ticker, error}
+      arrow   Arrow IPC stream, one record batch per symbol, with an extra
+              nullable `error` column (a failed symbol adds one row carrying it)
     """
-    out: List[Dict[str, Any]] = []
-
+    symbols: List[str] = []
     for sym in req.symbols:
         sym = sym.strip().upper()
-        if not sym:
-            continue
-
-        try:
-            rows = await fetch_daily_aggs(sym, req.start, req.end, adjusted=True)
-        except RuntimeError:
-            continue
-
-        if not rows:
-            continue
-
-        df = pd.DataFrame(rows)
-        df["date"] = pd.to_datetime(df["t"], unit="ms").dt.strftime("%Y-%m-%d")
-        df = df.rename(
-            columns={
-                "o": "open",
-                "h": "high",
-                "l": "low",
-                "c": "close",
-                "v": "volume",
-                "vw": "vwap",
-                "n": "trades",
-            }
+        if sym and sym not in symbols:
+            symbols.append(sym)
+
+    try:
+        start = date.fromisoformat(req.start)
+        end = date.fromisoformat(req.end)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="start/end must be YYYY-MM-DD")
+
+    if fmt == "ndjson":
+        return StreamingResponse(
+            _ndjson_stream(symbols, start, end), media_type="application/x-ndjson"
+        )
+    if fmt == "arrow":
+        if pa is None:
+            raise HTTPException(status_code=400, detail="format=arrow needs pyarrow installed on the server")
+        return StreamingResponse(
+            _arrow_stream(symbols, start, end),
+            media_type="application/vnd.apache.arrow.stream",
         )
-        df["ticker"] = sym
 
-        df = df[
-            ["ticker", "date", "open", "high", "low", "close", "volume", "vwap", "trades"]
-        ]
+    if not symbols:
+        return {"rows": [], "errors": {}}
 
-        out.extend(df.to_dict(orient="records"))
+    # Upstream failures for one symbol must not sink the whole batch
+    errors: Dict[str, str] = {}
+    by_symbol = await daily_bars_many(symbols, start, end, errors=errors)
 
-    return out
+    out: List[Dict[str, Any]] = []
+    for sym in symbols:
+        for r in by_symbol.get(sym, []):
+            out.append(_batch_row(sym, r))
+
+    return {"rows": out, "errors": errors}
@@ -1,10 +1,14 @@
 
 
 # app/routers/performance.py
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Query
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy import text
 from app import db
-import csv, io
+from app.services import upload_files, upload_jobs, upload_stream
+from app.services.cache import cached, invalidate
+import csv
+import time
 from datetime import datetime
 
 # NOTE: no prefix here; main.py will mount with prefix="/api/portfolio"
@@ -14,10 +18,10 @@ router = APIRouter(tags=["performance"])
 # 1) CSV UPLOAD (keep existing)
 # -----------------------------
 # app/routers/performance.py
-@router.post("/performance/upload-csv")
+@router.post("/performance/upload-csv", status_code=202)
 async def upload_nav_csv(
+    request: Request,
     file: UploadFile = File(...),
-    conn = Depends(db.get_db),
 ):
     """
     Accepts a CSV exported from the ROTH PERFORMANCES sheet.
@@ -36,23 +40,88 @@ async def upload_nav_csv(
       - Converts percent strings like '1.37%' into 0.0137 (decimal).
       - Upserts into public.performance_daily:
           day, portfolio_value, portfolio_ret, voo_ret, qqq_ret
+      - Re-uploading the identical file returns status "already_ingested"
+        (upload_files, by SHA-256) without rewriting anything.
+
+    Returns 202 with a job id once the file is stored; the upsert runs in
+    the background (app/services/upload_jobs.py, ingest_nav). Poll
+    `status_url` (built with url_for from the upload_job_status route, so it
+    includes the prefix main.py mounts the uploads router under) for
+    progress and the result.
     """
+    # Unreadable / headerless files are still a 400 here rather than a failed job
+    _nav_header(csv.DictReader(upload_stream.iter_lines(file.file, "utf-8-sig")))
+
+    job_id = await run_in_threadpool(upload_jobs.enqueue, "nav", file.file, file.filename, {})
+    return {
+        "status": "queued",
+        "job_id": job_id,
+        "status_url": request.url_for("upload_job_status", job_id=job_id).path,
+    }
+
+
+def _nav_header(reader):
+    """(first_col, second_col) of the DictReader, or a 400."""
     try:
-        content = await file.read()
-        s = content.decode("utf-8-sig")
-        reader = csv.DictReader(io.StringIO(s))
+        fieldnames = reader.fieldnames
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Could not read CSV: {e}")
 
-    if not reader.fieldnames:
+    if not fieldnames:
         raise HTTPException(status_code=400, detail="CSV has no header row.")
 
-    fieldnames = reader.fieldnames
     first_col = fieldnames[0] if len(fieldnames) > 0 else None
     second_col = fieldnames[1] if len(fieldnames) > 1 else None
+    return first_col, second_col
+
+
+def ingest_nav(conn, fileobj, filename, progress=None):
+    """Upsert one ROTH PERFORMANCES CSV into performance_daily and commit (see upload_nav_csv)."""
+    # An identical re-upload is answered from upload_files without parsing
+    started = time.perf_counter()
+    digest, size = upload_stream.sha256(fileobj)
+    prior = upload_files.claim(conn, "nav", digest)
+    if prior:
+        conn.rollback()
+        return upload_files.already_ingested(prior)
+
+    # Decoded a chunk at a time from the spooled upload and upserted in
+    # batches as rows parse (app/services/upload_stream.py)
+    reader = csv.DictReader(upload_stream.iter_lines(fileobj, "utf-8-sig"))
+    first_col, second_col = _nav_header(reader)
+
+    try:
+        upserted = 0
+        for batch in upload_stream.batches(_nav_rows(reader, first_col, second_col)):
+            upserted += _upsert_nav(conn, batch)
+            if progress:
+                progress(rows=upserted, bytes_done=fileobj.tell())
+    except UnicodeDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"Could not read CSV: {e}")
+
+    if not upserted:
+        raise HTTPException(status_code=400, detail="No usable rows found in CSV.")
+
+    counts = {"rows_upserted": upserted}
+    upload_id = upload_files.record(
+        conn, "nav", filename, digest, None, size, max(reader.line_num - 1, 0), counts, started
+    )
+    conn.commit()
+    invalidate(["performance"])
+    if progress:
+        progress(rows=upserted, bytes_done=size)
+    return {"status": "ok", "upload_id": upload_id, **counts}
+
+
+def _nav_job(conn, fileobj, job, progress):
+    return ingest_nav(conn, fileobj, job["filename"], progress)
+
+
+upload_jobs.register("nav", _nav_job)
 
-    rows = []
 
+def _nav_rows(reader, first_col, second_col):
+    """Yield performance_daily rows from the ROTH PERFORMANCES DictReader."""
     for row in reader:
         if not row:
             continue
@@ -161,38 +230,42 @@ async def upload_nav_csv(
         voo_ret = to_float_pct(voo_ret_raw)
         qqq_ret = to_float_pct(qqq_ret_raw)
 
-        rows.append(
-            {
-                "day": parsed_date,
-                "portfolio_value": bal,
-                "portfolio_ret": port_ret,
-                "voo_ret": voo_ret,
-                "qqq_ret": qqq_ret,
-            }
-        )
+        yield {
+            "day": parsed_date,
+            "portfolio_value": bal,
+            "portfolio_ret": port_ret,
+            "voo_ret": voo_ret,
+            "qqq_ret": qqq_ret,
+        }
 
-    if not rows:
-        raise HTTPException(status_code=400, detail="No usable rows found in CSV.")
 
-    stmt = text(
-        """
-        INSERT INTO public.performance_daily (
-            day, portfolio_value, portfolio_ret, voo_ret, qqq_ret
-        )
-        VALUES (:day, :portfolio_value, :portfolio_ret, :voo_ret, :qqq_ret)
-        ON CONFLICT (day) DO UPDATE
-          SET portfolio_value = EXCLUDED.portfolio_value,
-              portfolio_ret   = EXCLUDED.portfolio_ret,
-              voo_ret         = EXCLUDED.voo_ret,
-              qqq_ret         = EXCLUDED.qqq_ret
-        """
+UPSERT_NAV = text(
+    """
+    INSERT INTO public.performance_daily (
+        day, portfolio_value, portfolio_ret, voo_ret, qqq_ret
     )
+    SELECT * FROM unnest(
+        CAST(:day AS date[]),
+        CAST(:portfolio_value AS numeric[]),
+        CAST(:portfolio_ret AS numeric[]),
+        CAST(:voo_ret AS numeric[]),
+        CAST(:qqq_ret AS numeric[])
+    )
+    ON CONFLICT (day) DO UPDATE
+      SET portfolio_value = EXCLUDED.portfolio_value,
+          portfolio_ret   = EXCLUDED.portfolio_ret,
+          voo_ret         = EXCLUDED.voo_ret,
+          qqq_ret         = EXCLUDED.qqq_ret
+    """
+)
 
-    for r in rows:
-        conn.execute(stmt, r)
 
-    conn.commit()
-    return {"rows_upserted": len(rows)}
+def _upsert_nav(conn, rows) -> int:
+    """One statement per batch. A day repeated in the batch keeps its last row, as the per-row upserts did."""
+    by_day = {r["day"]: r for r in rows}
+    cols = ("day", "portfolio_value", "portfolio_ret", "voo_ret", "qqq_ret")
+    conn.execute(UPSERT_NAV, {c: [r[c] for r in by_day.values()] for c in cols})
+    return len(rows)
 
 # ------------------------------------------------
 # 2) DAILY SERIES for charts (normalized or raw)
@@ -227,6 +300,7 @@ def get_performance_series(
 #    This matches your Excel-style compounding of daily returns
 # ---------------------------------------------------------
 @router.get("/performance/rollups")
+@cached("performance.rollups", ttl=3600, tags=["performance"])
 def get_performance_rollups(conn = Depends(db.get_db)):
     """
     Compounded returns since start, last 30d, last 7d, and YTD.
@@ -5,6 +5,7 @@ from sqlalchemy import text
 from ..db import get_db
 import math
 from app import db
+from app.services.cache import cached
 from typing import List, Dict
 
 router = APIRouter()  # prefix is provided by main.py
@@ -20,6 +21,7 @@ def clean_num(x):
         return 0.0
 
 @router.get("/summary")
+@cached("portfolio.summary", ttl=3600, tags=["positions"])
 def portfolio_summary(conn = Depends(db.get_db)):
     """
     Dashboard KPIs based on latest positions_fidelity snapshot.
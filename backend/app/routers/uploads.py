@@ -1,8 +1,12 @@
-from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy import text
 from datetime import datetime, date
-import io, csv, re, json
-from ..db import get_db
+import csv, functools, hashlib, io, json, multiprocessing, os, re, time, uuid, zipfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, NamedTuple
+from ..services import refdata, upload_files, upload_jobs, upload_stream
+from ..services.cache import invalidate
 
 router = APIRouter()
 
@@ -51,17 +55,27 @@ def _parse_date(s: str | None) -> date | None:
 def norm(x):
     return (x or "").strip()
 
+_PLAIN_NUM = re.compile(r"-?(?:[0-9]+\.?[0-9]*|\.[0-9]+)").fullmatch
+_NON_NUM = re.compile(r"[^0-9.\-]").sub
+
 def to_num(x):
     """Robust numeric parser: handles $, %, commas, parens, stray chars."""
     if x is None:
         return None
-    s = str(x).strip()
-    if s == "" or s == "--" or s.lower() == "n/a":
+    s = x.strip() if type(x) is str else str(x).strip()
+    if not s:
+        return None
+
+    # fast path: "$1,234.56", "+12.3%", "-$4.00" -- a plain decimal once the
+    # currency/percent/grouping marks are dropped, same as the general path
+    t = s.replace(",", "").replace("$", "").replace("%", "").replace("+", "")
+    if _PLAIN_NUM(t):
+        return float(t)
+    if s == "--" or s.lower() == "n/a":
         return None
 
     neg = s.startswith("(") and s.endswith(")")
-    s = s.replace(",", "").replace("$", "").replace("%", "")
-    s = re.sub(r"[^0-9.\-]", "", s)
+    s = _NON_NUM("", s)
 
     if s in ("", ".", "-"):
         return None
@@ -69,7 +83,7 @@ def to_num(x):
     try:
         v = float(s)
         return -v if neg and v > 0 else v
-    except Exception:
+    except ValueError:
         return None
 
 def pick(cols: dict, *cands: str) -> str | None:
@@ -93,151 +107,308 @@ def pick(cols: dict, *cands: str) -> str | None:
 
 
 # -----------------------------
-# Route: upload positions (dated snapshot)
+# Header profiles
 # -----------------------------
-@router.post("/api/uploads/positions", tags=["uploads"])
-async def upload_positions(
-    file: UploadFile = File(...),
-    as_of: str | None = Form(None),
-    db = Depends(get_db),
-):
+# (role, candidate headers) in the order pick() tries them. Required roles
+# are symbol, qty and avgcost.
+HEADER_ROLES = (
+    ("symbol",        ("symbol", "security symbol", "ticker")),
+    ("qty",           ("quantity", "shares", "current shares")),
+    ("avgcost",       ("average cost basis", "average cost", "cost basis per share", "average cost basis")),
+    ("lastpx",        ("last price", "price", "current price")),
+    ("lastpx_change", ("last price change", "price change")),
+    ("currval",       ("current va", "current value", "market value")),
+    ("todays_dollar", ("today's ga $", "todays gain $", "today's gain $")),
+    ("todays_pct",    ("today's ga %", "todays gain %", "today's gain %")),
+    ("total_dollar",  ("total gain/loss dollar", "total gain dollar", "total gain/loss $")),
+    ("total_pct",     ("total gain/loss percent", "total gain %")),
+    ("percent_of",    ("percent of account", "percent of")),
+    ("costbasis_tot", ("cost basis total", "cost basis t")),
+    ("acctname",      ("account name", "account")),
+    ("acctnum",       ("account number", "account #")),
+    ("desc",          ("description",)),
+    ("type",          ("type",)),
+)
+
+
+class HeaderProfile(NamedTuple):
+    fieldnames: tuple
+    index: dict          # role -> column index, or None when the file lacks it
+    missing: tuple       # required roles not found
+
+
+@functools.lru_cache(maxsize=64)
+def header_profile(fieldnames: tuple) -> HeaderProfile:
     """
-    Upload a Fidelity Positions CSV as a dated snapshot.
+    Resolve HEADER_ROLES to column indexes once per distinct header row
+    (every export from the same Fidelity screen shares one), so rows are
+    decoded by position instead of through pick() and a dict per line.
+    """
+    cols = {c.lower(): c for c in fieldnames}
+    # a repeated header name resolves to its last column, as in DictReader
+    position = {name: i for i, name in enumerate(fieldnames)}
+    index = {}
+    for role, cands in HEADER_ROLES:
+        name = pick(cols, *cands)
+        index[role] = position[name] if name is not None else None
+    missing = tuple(r for r in ("symbol", "qty", "avgcost") if index[r] is None)
+    return HeaderProfile(fieldnames, index, missing)
 
-    - Populates `holdings` + `prices` (equity positions only).
-    - Populates `positions_fidelity` with ALL rows (including SPAXX + Pending).
 
-    Date stamping:
-      - If `as_of` is provided (YYYY-MM-DD), use it.
-      - Else parse date from filename (e.g., Nov-03-2025 or 2025-11-03).
-      - Else fall back to today's date.
+# -----------------------------
+# Bulk writes
+# -----------------------------
+# One statement per table: every column goes over as an array and is
+# unnested server side, so a file costs the same handful of round trips
+# whether it has 10 rows or 1000.
+INSERT_POSITIONS_FIDELITY = text("""
+    INSERT INTO public.positions_fidelity (
+        as_of,
+        source_filename,
+        account_number,
+        account_name,
+        symbol,
+        description,
+        quantity,
+        last_price,
+        last_price_change,
+        current_value,
+        todays_gain_dollar,
+        todays_gain_pct,
+        total_gain_dollar,
+        total_gain_pct,
+        percent_of,
+        cost_basis,
+        average_cost,
+        security_type,
+        raw_row
+    )
+    SELECT :as_of, :source_filename, u.*
+    FROM unnest(
+        CAST(:account_number     AS text[]),
+        CAST(:account_name       AS text[]),
+        CAST(:symbol             AS text[]),
+        CAST(:description        AS text[]),
+        CAST(:quantity           AS numeric[]),
+        CAST(:last_price         AS numeric[]),
+        CAST(:last_price_change  AS numeric[]),
+        CAST(:current_value      AS numeric[]),
+        CAST(:todays_gain_dollar AS numeric[]),
+        CAST(:todays_gain_pct    AS numeric[]),
+        CAST(:total_gain_dollar  AS numeric[]),
+        CAST(:total_gain_pct     AS numeric[]),
+        CAST(:percent_of         AS numeric[]),
+        CAST(:cost_basis         AS numeric[]),
+        CAST(:average_cost       AS numeric[]),
+        CAST(:security_type      AS text[]),
+        CAST(:raw_row            AS jsonb[])
+    ) AS u
+""")
+
+PF_COLUMNS = (
+    "account_number", "account_name", "symbol", "description",
+    "quantity", "last_price", "last_price_change", "current_value",
+    "todays_gain_dollar", "todays_gain_pct", "total_gain_dollar", "total_gain_pct",
+    "percent_of", "cost_basis", "average_cost", "security_type", "raw_row",
+)
+
+INSERT_HOLDINGS = text("""
+    INSERT INTO holdings (security_id, account_id, quantity, cost_basis, as_of)
+    SELECT u.security_id, u.account_id, u.quantity, u.cost_basis, :as_of
+    FROM unnest(
+        CAST(:security_id AS uuid[]),
+        CAST(:account_id  AS uuid[]),
+        CAST(:quantity    AS numeric[]),
+        CAST(:cost_basis  AS numeric[])
+    ) AS u(security_id, account_id, quantity, cost_basis)
+""")
+
+INSERT_PRICES = text("""
+    INSERT INTO prices (security_id, date, close)
+    SELECT u.security_id, :date, u.close
+    FROM unnest(
+        CAST(:security_id AS uuid[]),
+        CAST(:close       AS numeric[])
+    ) AS u(security_id, close)
+""")
+
+
+def _columns(rows: list[dict], keys) -> dict[str, list]:
+    """[{k: v}, ...] -> {k: [v, ...]} for the unnest() statements."""
+    return {k: [r[k] for r in rows] for k in keys}
+
+
+class PositionsLoader:
+    """
+    Writes one snapshot as rows arrive: positions_fidelity and holdings go
+    out every `batch_rows` rows, prices (one per security) in finish().
+    Never commits; the caller owns the transaction.
     """
-    if not file.filename.lower().endswith(".csv"):
-        raise HTTPException(status_code=400, detail="Please upload a .csv file")
 
-    # Decide snapshot date
-    snap = _parse_date(as_of) or _parse_date(file.filename) or date.today()
+    def __init__(self, db, snap: date, filename: str, batch_rows: int = upload_stream.BATCH_ROWS):
+        self.db = db
+        self.snap = snap
+        self.filename = filename
+        self.batch_rows = batch_rows
+        self.pf_rows: list[dict] = []
+        self.equities: list[dict] = []
+        # prices is unique on (security_id, date): a ticker held in several
+        # accounts gets one row, the last price seen for it
+        self.closes: dict = {}
+        self.rows = 0
+        self.counts = {
+            "inserted_holdings": 0,
+            "inserted_prices": 0,
+            "created_securities": 0,
+            "created_accounts": 0,
+        }
+
+    def add(self, pf_row: dict, equity: dict | None) -> None:
+        self.rows += 1
+        self.pf_rows.append(pf_row)
+        if equity is not None:
+            self.equities.append(equity)
+        if len(self.pf_rows) >= self.batch_rows:
+            self.flush()
 
-    content = await file.read()
-    buf = io.StringIO(content.decode("utf-8", errors="ignore"))
-    reader = csv.DictReader(buf)
-
-    cols = {c.lower(): c for c in (reader.fieldnames or [])}
-
-    # Header picking (tolerant to slight naming differences)
-    c_symbol        = pick(cols, "symbol", "security symbol", "ticker")
-    c_qty           = pick(cols, "quantity", "shares", "current shares")
-    c_avgcost       = pick(cols, "average cost basis", "average cost", "cost basis per share", "average cost basis")
-    c_lastpx        = pick(cols, "last price", "price", "current price")
-    c_lastpx_change = pick(cols, "last price change", "price change")
-    c_currval       = pick(cols, "current va", "current value", "market value")
-    c_todays_dollar = pick(cols, "today's ga $", "todays gain $", "today's gain $")
-    c_todays_pct    = pick(cols, "today's ga %", "todays gain %", "today's gain %")
-    c_total_dollar  = pick(cols, "total gain/loss dollar", "total gain dollar", "total gain/loss $")
-    c_total_pct     = pick(cols, "total gain/loss percent", "total gain %")
-    c_percent_of    = pick(cols, "percent of account", "percent of")
-    c_costbasis_tot = pick(cols, "cost basis total", "cost basis t")
-    c_acctname      = pick(cols, "account name", "account")
-    c_acctnum       = pick(cols, "account number", "account #")
-    c_desc          = pick(cols, "description")
-    c_type          = pick(cols, "type")
-
-    if not all([c_symbol, c_qty, c_avgcost]):
-        raise HTTPException(
-            status_code=400,
-            detail=(
-                "CSV missing required headers (symbol/quantity/average cost). "
-                f"Got: {reader.fieldnames}"
-            ),
+    def flush(self) -> None:
+        db, pf_rows, equities = self.db, self.pf_rows, self.equities
+        self.pf_rows, self.equities = [], []
+
+        if pf_rows:
+            db.execute(
+                INSERT_POSITIONS_FIDELITY,
+                {"as_of": self.snap, "source_filename": self.filename, **_columns(pf_rows, PF_COLUMNS)},
+            )
+        if not equities:
+            return
+
+        sec_ids, created_secs = refdata.security_ids(db, (e["ticker"] for e in equities))
+        acct_ids, created_accts = refdata.account_ids(db, (e["account_name"] for e in equities))
+        self.counts["created_securities"] += created_secs
+        self.counts["created_accounts"] += created_accts
+
+        holdings = [
+            {
+                "security_id": sec_ids[e["ticker"]],
+                "account_id": acct_ids.get(e["account_name"]),
+                "quantity": e["qty"],
+                "cost_basis": e["avg_cost"],
+            }
+            for e in equities
+        ]
+        db.execute(
+            INSERT_HOLDINGS,
+            {"as_of": self.snap, **_columns(holdings, ("security_id", "account_id", "quantity", "cost_basis"))},
         )
+        self.counts["inserted_holdings"] += len(holdings)
+
+        for e in equities:
+            if e["last_price"] is not None:
+                self.closes[sec_ids[e["ticker"]]] = e["last_price"]
+
+    def finish(self) -> dict:
+        self.flush()
+        if self.closes:
+            self.db.execute(
+                INSERT_PRICES,
+                {"date": self.snap, "security_id": list(self.closes), "close": list(self.closes.values())},
+            )
+            self.counts["inserted_prices"] = len(self.closes)
+            self.closes = {}
+        return self.counts
+
 
-    inserted_holdings = 0
-    inserted_prices   = 0
-    created_secs      = 0
-    created_accts     = 0
-    skipped           = 0
-    reasons = {"blank_symbol": 0, "spaxx": 0, "pending": 0, "bad_qty": 0, "bad_avgcost": 0}
-
-    # Optional: clear existing snapshot before re-loading
-    # db.execute(text("DELETE FROM holdings WHERE as_of = :d"), {"d": snap})
-    # db.execute(text("DELETE FROM prices   WHERE date  = :d"), {"d": snap})
-    # db.execute(text("DELETE FROM positions_fidelity WHERE as_of = :d"), {"d": snap})
-
-    INSERT_POSITIONS_FIDELITY = text("""
-        INSERT INTO public.positions_fidelity (
-            as_of,
-            source_filename,
-            account_number,
-            account_name,
-            symbol,
-            description,
-            quantity,
-            last_price,
-            last_price_change,
-            current_value,
-            todays_gain_dollar,
-            todays_gain_pct,
-            total_gain_dollar,
-            total_gain_pct,
-            percent_of,
-            cost_basis,
-            average_cost,
-            security_type,
-            raw_row
+# -----------------------------
+# Parsing
+# -----------------------------
+# json.dumps(..., ensure_ascii=False) builds a new encoder per call
+_raw_json = json.JSONEncoder(ensure_ascii=False).encode
+
+
+class MissingHeaders(ValueError):
+    pass
+
+
+def parse_positions(rows: Iterable[list[str]], reasons: dict) -> Iterator[tuple[dict, dict | None]]:
+    """
+    Decode a Fidelity positions export (csv.reader rows, header first).
+    Yields (positions_fidelity row, equity row or None) per line and counts
+    why a line is not an equity in `reasons`. Raises MissingHeaders before
+    the first yield if symbol/quantity/average cost can't be found.
+    """
+    rows = iter(rows)
+    prof = header_profile(tuple(next(rows, None) or ()))
+    fieldnames = list(prof.fieldnames)
+    if prof.missing:
+        raise MissingHeaders(
+            "CSV missing required headers (symbol/quantity/average cost). "
+            f"Got: {fieldnames}"
         )
-        VALUES (
-            :as_of,
-            :source_filename,
-            :account_number,
-            :account_name,
-            :symbol,
-            :description,
-            :quantity,
-            :last_price,
-            :last_price_change,
-            :current_value,
-            :todays_gain_dollar,
-            :todays_gain_pct,
-            :total_gain_dollar,
-            :total_gain_pct,
-            :percent_of,
-            :cost_basis,
-            :average_cost,
-            :security_type,
-            :raw_row
-        );
-    """)
-
-    for row in reader:
+
+    n = len(fieldnames)
+    ix = prof.index
+
+    def num_col(role):
+        # absent numeric columns read slot n, which every row is padded with (None)
+        return n if ix[role] is None else ix[role]
+
+    i_symbol, i_acctname, i_acctnum = ix["symbol"], ix["acctname"], ix["acctnum"]
+    i_desc, i_type = ix["desc"], ix["type"]
+    i_qty           = num_col("qty")
+    i_avgcost       = num_col("avgcost")
+    i_lastpx        = num_col("lastpx")
+    i_lastpx_change = num_col("lastpx_change")
+    i_currval       = num_col("currval")
+    i_todays_dollar = num_col("todays_dollar")
+    i_todays_pct    = num_col("todays_pct")
+    i_total_dollar  = num_col("total_dollar")
+    i_total_pct     = num_col("total_pct")
+    i_percent_of    = num_col("percent_of")
+    i_costbasis_tot = num_col("costbasis_tot")
+    pad = [None]
+
+    for values in rows:
+        # csv.DictReader semantics: skip blank lines, short rows read as None,
+        # extra cells go to raw_row under a null key
+        if not values:
+            continue
+        row = dict(zip(fieldnames, values))
+        if len(values) != n:
+            for extra in fieldnames[len(values):]:
+                row[extra] = None
+            if len(values) > n:
+                row[None] = values[n:]
+            values = values[:n] + [None] * (n - len(values))
+        values += pad
+
         # ---------- 1) Parse raw fields ----------
-        acct_number = norm(row.get(c_acctnum)) if c_acctnum else None
-        acct_name   = norm(row.get(c_acctname)) if c_acctname else None
-        symbol      = norm(row.get(c_symbol)) if c_symbol else ""
-        description = norm(row.get(c_desc)) if c_desc else None
-        sec_type    = norm(row.get(c_type)) if c_type else None
-
-        qty                = to_num(row.get(c_qty)) if c_qty else None
-        last_price         = to_num(row.get(c_lastpx)) if c_lastpx else None
-        last_price_change  = to_num(row.get(c_lastpx_change)) if c_lastpx_change else None
-        current_value      = to_num(row.get(c_currval)) if c_currval else None
-        todays_gain_dollar = to_num(row.get(c_todays_dollar)) if c_todays_dollar else None
-        todays_gain_pct    = to_num(row.get(c_todays_pct)) if c_todays_pct else None
-        total_gain_dollar  = to_num(row.get(c_total_dollar)) if c_total_dollar else None
-        total_gain_pct     = to_num(row.get(c_total_pct)) if c_total_pct else None
-        percent_of         = to_num(row.get(c_percent_of)) if c_percent_of else None
-        cost_basis_total   = to_num(row.get(c_costbasis_tot)) if c_costbasis_tot else None
-        avg_cost           = to_num(row.get(c_avgcost)) if c_avgcost else None
+        acct_number = norm(values[i_acctnum]) if i_acctnum is not None else None
+        acct_name   = norm(values[i_acctname]) if i_acctname is not None else None
+        symbol      = norm(values[i_symbol])
+        description = norm(values[i_desc]) if i_desc is not None else None
+        sec_type    = norm(values[i_type]) if i_type is not None else None
+
+        qty                = to_num(values[i_qty])
+        last_price         = to_num(values[i_lastpx])
+        last_price_change  = to_num(values[i_lastpx_change])
+        current_value      = to_num(values[i_currval])
+        todays_gain_dollar = to_num(values[i_todays_dollar])
+        todays_gain_pct    = to_num(values[i_todays_pct])
+        total_gain_dollar  = to_num(values[i_total_dollar])
+        total_gain_pct     = to_num(values[i_total_pct])
+        percent_of         = to_num(values[i_percent_of])
+        cost_basis_total   = to_num(values[i_costbasis_tot])
+        avg_cost           = to_num(values[i_avgcost])
 
         # Fallback for cost basis total if missing but qty * avg_cost is available
         if cost_basis_total is None and qty is not None and avg_cost is not None:
             cost_basis_total = qty * avg_cost
 
-        raw_json = json.dumps(row, ensure_ascii=False)
+        raw_json = _raw_json(row)
 
         # ---------- 2) ALWAYS store raw row in positions_fidelity ----------
-        pf_params = {
-            "as_of": snap,
-            "source_filename": file.filename,
+        pf_row = {
             "account_number": acct_number,
             "account_name": acct_name,
             "symbol": symbol,
@@ -256,111 +427,338 @@ async def upload_positions(
             "security_type": sec_type,
             "raw_row": raw_json,
         }
-        db.execute(INSERT_POSITIONS_FIDELITY, pf_params)
 
         # ---------- 3) Equity holdings/prices (like before) ----------
         ticker = symbol.upper()
+        reason = None
 
         # Blank symbol → ok for positions_fidelity, but skip for holdings/prices
         if not ticker:
-            reasons["blank_symbol"] += 1
-            skipped += 1
-            continue
-
+            reason = "blank_symbol"
         # Skip money-market & placeholders for holdings/prices
-        if ticker in {"SPAXX", "SPAXX**", "MMF", "CASH"}:
-            reasons["spaxx"] += 1
-            skipped += 1
+        elif ticker in {"SPAXX", "SPAXX**", "MMF", "CASH"}:
+            reason = "spaxx"
+        elif sec_type is not None and sec_type.upper() == "PENDING ACTIVITY":
+            reason = "pending"
+        # For holdings, we require good qty + avg_cost
+        elif qty is None or qty == 0:
+            reason = "bad_qty"
+        elif avg_cost is None:
+            reason = "bad_avgcost"
+
+        if reason:
+            reasons[reason] += 1
+            yield pf_row, None
             continue
 
-        if c_type and norm(row.get(c_type)).upper() == "PENDING ACTIVITY":
-            reasons["pending"] += 1
-            skipped += 1
-            continue
+        yield pf_row, {
+            "ticker": ticker,
+            "account_name": acct_name,
+            "qty": qty,
+            "avg_cost": avg_cost,
+            "last_price": last_price,
+        }
 
-        # For holdings, we require good qty + avg_cost
-        if qty is None or qty == 0:
-            reasons["bad_qty"] += 1
-            skipped += 1
-            continue
-        if avg_cost is None:
-            reasons["bad_avgcost"] += 1
-            skipped += 1
-            continue
 
-        # ---- Get-or-create security ----
-        sec = db.execute(
-            text("SELECT id FROM securities WHERE ticker = :t"),
-            {"t": ticker},
-        ).mappings().first()
-        if sec:
-            security_id = sec["id"]
-        else:
-            sec = db.execute(
-                text("INSERT INTO securities (ticker, name) VALUES (:t, NULL) RETURNING id"),
-                {"t": ticker},
-            ).mappings().first()
-            security_id = sec["id"]
-            created_secs += 1
-
-        # ---- Get-or-create account (optional, by account name) ----
-        account_id = None
-        if acct_name:
-            acct = db.execute(
-                text("SELECT id FROM accounts WHERE name = :n"),
-                {"n": acct_name},
-            ).mappings().first()
-            if acct:
-                account_id = acct["id"]
-            else:
-                acct = db.execute(
-                    text("INSERT INTO accounts (name) VALUES (:n) RETURNING id"),
-                    {"n": acct_name},
-                ).mappings().first()
-                account_id = acct["id"]
-                created_accts += 1
-
-        # ---- Insert holding snapshot (uses `snap`, not NOW) ----
-        db.execute(
-            text("""
-                INSERT INTO holdings (security_id, account_id, quantity, cost_basis, as_of)
-                VALUES (:security_id, :account_id, :qty, :cost_basis, :as_of)
-            """),
-            {
-                "security_id": security_id,
-                "account_id": account_id,
-                "qty": qty,
-                "cost_basis": avg_cost,
-                "as_of": snap,
-            },
-        )
-        inserted_holdings += 1
+def clear_snapshot(db, snap: date) -> None:
+    """Remove everything a previous upload wrote for `snap` (caller's transaction)."""
+    db.execute(text("DELETE FROM holdings WHERE as_of = :d"), {"d": snap})
+    db.execute(text("DELETE FROM prices   WHERE date  = :d"), {"d": snap})
+    db.execute(text("DELETE FROM positions_fidelity WHERE as_of = :d"), {"d": snap})
+    upload_files.forget(db, "positions", snap)
+
+
+def new_skip_reasons() -> dict:
+    return {"blank_symbol": 0, "spaxx": 0, "pending": 0, "bad_qty": 0, "bad_avgcost": 0}
 
-        # ---- Insert price snapshot (also stamped to `snap`) ----
-        if last_price is not None:
-            db.execute(
-                text("""
-                    INSERT INTO prices (security_id, date, close)
-                    VALUES (:security_id, :date, :px)
-                """),
-                {"security_id": security_id, "date": snap, "px": last_price},
-            )
-            inserted_prices += 1
 
+# -----------------------------
+# Ingest (runs in an upload_jobs worker)
+# -----------------------------
+def load_snapshot(db, snap: date, filename: str, digest: str, size: int,
+                  rows, reasons: dict, started: float, on_batch=None) -> dict:
+    """
+    Write one parsed positions file as the `snap` snapshot and commit.
+
+    `rows` is parse_positions output (pairs of positions_fidelity row and
+    equity row or None), possibly still being parsed, and `reasons` its
+    skip tally. Rows are written in batches (PositionsLoader), all in one
+    transaction; `on_batch(rows_so_far)` is called after each batch.
+
+    Re-uploads (services/upload_files.py): the identical file for the same
+    snapshot returns status "already_ingested" without writing; a different
+    file for an already loaded snapshot replaces it atomically.
+    """
+    # Same file for the same snapshot: nothing to do. Anything else for this
+    # snapshot is replaced wholesale, in this one transaction.
+    prior = upload_files.claim(db, "positions", digest, snap)
+    if prior:
+        db.rollback()
+        return {"snapshot_as_of": str(snap), **upload_files.already_ingested(prior)}
+    clear_snapshot(db, snap)
+
+    loader = PositionsLoader(db, snap, filename)
+    for pf_row, equity in rows:
+        loader.add(pf_row, equity)
+        if on_batch and not loader.pf_rows:  # just flushed a batch
+            on_batch(loader.rows)
+
+    counts = {
+        **loader.finish(),
+        "skipped_rows": sum(reasons.values()),
+        "skip_reasons": reasons,
+    }
+    upload_id = upload_files.record(
+        db, "positions", filename, digest, snap, size, loader.rows, counts, started
+    )
     db.commit()
 
     return {
         "status": "ok",
         "snapshot_as_of": str(snap),
-        "inserted_holdings": inserted_holdings,
-        "inserted_prices": inserted_prices,
-        "created_securities": created_secs,
-        "created_accounts": created_accts,
-        "skipped_rows": skipped,
-        "skip_reasons": reasons,
+        "upload_id": upload_id,
+        "rows": loader.rows,
+        **counts,
     }
 
 
+def ingest_positions(db, fileobj, filename: str, snap: date, progress=None) -> dict:
+    """
+    Load one positions CSV as the `snap` snapshot (see load_snapshot). The
+    file is decoded a chunk at a time (services/upload_stream.py) and
+    written as it is parsed.
+    """
+    started = time.perf_counter()
+    digest, size = upload_stream.sha256(fileobj)
+
+    reasons = new_skip_reasons()
+    lines = upload_stream.iter_lines(fileobj, "utf-8", errors="ignore")
+    on_batch = None
+    if progress:
+        def on_batch(n):
+            progress(rows=n, bytes_done=fileobj.tell(), skip_reasons=reasons)
+
+    result = load_snapshot(
+        db, snap, filename, digest, size,
+        parse_positions(csv.reader(lines), reasons), reasons, started, on_batch,
+    )
+    if result["status"] == "ok":
+        invalidate(["positions"])
+        if progress:
+            progress(rows=result["rows"], bytes_done=size, skip_reasons=reasons)
+    return result
+
+
+def _positions_job(db, fileobj, job: dict, progress) -> dict:
+    snap = date.fromisoformat(job["params"]["as_of"])
+    return ingest_positions(db, fileobj, job["filename"], snap, progress)
+
+
+upload_jobs.register("positions", _positions_job)
+
+
+# -----------------------------
+# Route: upload positions (dated snapshot)
+# -----------------------------
+@router.post("/api/uploads/positions", tags=["uploads"], status_code=202)
+async def upload_positions(
+    request: Request,
+    file: UploadFile = File(...),
+    as_of: str | None = Form(None),
+):
+    """
+    Upload a Fidelity Positions CSV as a dated snapshot.
+
+    - Populates `holdings` + `prices` (equity positions only).
+    - Populates `positions_fidelity` with ALL rows (including SPAXX + Pending).
+
+    Date stamping:
+      - If `as_of` is provided (YYYY-MM-DD), use it.
+      - Else parse date from filename (e.g., Nov-03-2025 or 2025-11-03).
+      - Else fall back to today's date.
+
+    Returns 202 with a job id once the file is stored; the load runs in the
+    background (services/upload_jobs.py, ingest_positions). Poll
+    `status_url` for progress and, when done, the counts and skip_reasons.
+    """
+    if not file.filename.lower().endswith(".csv"):
+        raise HTTPException(status_code=400, detail="Please upload a .csv file")
+
+    # Decide snapshot date
+    snap = _parse_date(as_of) or _parse_date(file.filename) or date.today()
+
+    # Bad headers are still a 400 here rather than a failed job
+    lines = upload_stream.iter_lines(file.file, "utf-8", errors="ignore")
+    try:
+        next(parse_positions(csv.reader(lines), new_skip_reasons()), None)
+    except MissingHeaders as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    job_id = await run_in_threadpool(
+        upload_jobs.enqueue, "positions", file.file, file.filename, {"as_of": snap.isoformat()}
+    )
+    return {
+        "status": "queued",
+        "job_id": job_id,
+        "snapshot_as_of": str(snap),
+        "status_url": request.url_for("upload_job_status", job_id=job_id).path,
+    }
+
+
+# -----------------------------
+# Archives: many dated snapshots in one zip
+# -----------------------------
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(1, int(os.getenv(name, str(default))))
+    except ValueError:
+        return default
+
+
+# Parsing (the CPU part) fans out to UPLOAD_PARSE_PROCS processes (at least 1;
+# unparsable = default); writes stay in the job's thread, one transaction per
+# file, in snapshot order.
+PARSE_PROCS = _env_int("UPLOAD_PARSE_PROCS", min(4, os.cpu_count() or 1))
+
+
+def archive_members(zf: zipfile.ZipFile) -> list[tuple[date | None, str]]:
+    """(snapshot date from the file name, member name) for every CSV in the zip."""
+    out = []
+    for info in zf.infolist():
+        base = os.path.basename(info.filename)
+        if info.is_dir() or info.filename.startswith("__MACOSX/") or base.startswith("."):
+            continue
+        if base.lower().endswith(".csv"):
+            out.append((_parse_date(base), info.filename))
+    return out
+
+
+def _parse_member(path: str, name: str) -> dict:
+    """Process-pool worker: read and parse one archive member (everything returned pickles)."""
+    with zipfile.ZipFile(path) as zf:
+        data = zf.read(name)
+    reasons = new_skip_reasons()
+    lines = upload_stream.iter_lines(io.BytesIO(data), "utf-8", errors="ignore")
+    try:
+        rows = list(parse_positions(csv.reader(lines), reasons))
+    except MissingHeaders as e:
+        return {"error": str(e)}
+    return {
+        "sha256": hashlib.sha256(data).hexdigest(),
+        "size": len(data),
+        "rows": rows,
+        "reasons": reasons,
+    }
+
+
+def ingest_archive(db, path: str, progress=None) -> dict:
+    """
+    Load every dated positions CSV in the zip at `path` as its own snapshot.
+    A file that fails (bad headers, DB error) is rolled back and reported;
+    the others still load. Returns a per-file summary.
+    """
+    with zipfile.ZipFile(path) as zf:
+        members = archive_members(zf)
+
+    summary = []
+    for snap, name in members:
+        if snap is None:
+            summary.append({"file": name, "status": "failed", "error": "No date in file name"})
+    # same-date files load in name order, so the last one is what stays
+    dated = sorted((snap, name) for snap, name in members if snap is not None)
+
+    totals = {"loaded": 0, "already_ingested": 0, "failed": len(summary)}
+    rows_done = 0
+    if dated:
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=max(1, min(PARSE_PROCS, len(dated))), mp_context=ctx) as pool:
+            futures = [pool.submit(_parse_member, path, name) for _, name in dated]
+            for (snap, name), fut in zip(dated, futures):
+                started = time.perf_counter()
+                entry = {"file": name, "snapshot_as_of": str(snap)}
+                try:
+                    parsed = fut.result()
+                    if "error" in parsed:
+                        raise MissingHeaders(parsed["error"])
+                    res = load_snapshot(
+                        db, snap, os.path.basename(name), parsed["sha256"], parsed["size"],
+                        parsed["rows"], parsed["reasons"], started,
+                    )
+                except Exception as e:
+                    db.rollback()
+                    detail = str(e) if isinstance(e, MissingHeaders) else f"{type(e).__name__}: {e}"
+                    entry.update(status="failed", error=detail)
+                    totals["failed"] += 1
+                else:
+                    entry.update(res)
+                    totals["loaded" if res["status"] == "ok" else "already_ingested"] += 1
+                    rows_done += res.get("rows", 0)
+                summary.append(entry)
+                if progress:
+                    progress(files_done=len(summary), files_total=len(members), rows=rows_done)
+
+    if totals["loaded"]:
+        invalidate(["positions"])
+    return {"status": "ok", "files": len(members), **totals, "summary": summary}
+
+
+def _archive_job(db, fileobj, job: dict, progress) -> dict:
+    return ingest_archive(db, job["path"], progress)
+
+
+upload_jobs.register("positions_archive", _archive_job)
+
+
+@router.post("/api/uploads/positions/archive", tags=["uploads"], status_code=202)
+async def upload_positions_archive(request: Request, file: UploadFile = File(...)):
+    """
+    Upload a .zip of dated Fidelity Positions CSVs (e.g. months of daily
+    exports) in one go. Each file's snapshot date comes from its name, as
+    in upload_positions; files without one are reported and skipped.
+
+    Returns 202 with a job id; the job's result is a per-file summary
+    (status ok / already_ingested / failed, counts, skip_reasons).
+    """
+    if not file.filename.lower().endswith(".zip"):
+        raise HTTPException(status_code=400, detail="Please upload a .zip file")
+    if not zipfile.is_zipfile(file.file):
+        raise HTTPException(status_code=400, detail="Not a readable zip archive")
+    file.file.seek(0)
+    with zipfile.ZipFile(file.file) as zf:
+        members = archive_members(zf)
+    if not members:
+        raise HTTPException(status_code=400, detail="No .csv files in the archive")
+
+    job_id = await run_in_threadpool(
+        upload_jobs.enqueue, "positions_archive", file.file, file.filename, {}
+    )
+    return {
+        "status": "queued",
+        "job_id": job_id,
+        "files": len(members),
+        "undated_files": sum(1 for snap, _ in members if snap is None),
+        "status_url": request.url_for("upload_job_status", job_id=job_id).path,
+    }
+
+
+# -----------------------------
+# Route: background upload status
+# -----------------------------
+@router.get("/api/uploads/jobs/{job_id}", tags=["uploads"], name="upload_job_status")
+async def upload_job_status(job_id: uuid.UUID):
+    """
+    status: queued | running | done | failed
+    progress: rows, bytes_done, pct, skip_reasons (positions) while running;
+              files_done / files_total for archives
+    result: the upload's response body (counts, skip_reasons) once done
+    error: why it failed
+    """
+    job = await run_in_threadpool(upload_jobs.get, str(job_id))
+    if job is None:
+        raise HTTPException(status_code=404, detail="No such upload job")
+    return job
+
+
 """
 # app/routers/uploads.py
 from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
@@ -370,7 +768,6 @@ from typing import Optional
 import pandas as pd
 import io, re, math
 
-from ..db import get_db
 
 router = APIRouter()
 
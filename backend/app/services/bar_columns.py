@@ -0,0 +1,565 @@
+# app/services/bar_columns.py
+"""
+Memory-mapped columnar copy of bars_daily for fast multi-symbol reads.
+
+Layout under BARSTORE_DIR (default ./data/barstore):
+
+  manifest.json           base segments, covered date range, delta days, version
+  manifest.lock           held by whichever process is rewriting the manifest
+  base-<ts>/              one .npy per column, rows sorted by (ticker, date),
+                          index.json = {ticker: [offset, length]}
+  seg-<version>/          same layout, a batch of compacted delta days
+  year-YYYY-<version>/    same layout, the compacted segments of one finished year
+  delta-YYYYMMDD-<v>/     same layout for one appended backfill day
+
+Columns: date (int32 days since 1970-01-01), open/high/low/close/vwap
+(float64, NaN = null), volume/trades (int64, INT_NULL = null).
+
+Arrays are opened with np.load(mmap_mode="r"), so `slice()` within one
+segment is a zero-copy view; rows from several segments are concatenated.
+`append_day()` is called by the backfill after each committed day; once there
+are more than BARSTORE_MAX_DELTAS deltas they are folded into one new base
+segment (nothing older is rewritten), and the segments of a finished year are
+merged once into a year segment. Segments that drop out of the manifest are
+deleted BARSTORE_RETIRE_S later (default 600), so a reader in another process
+that still has the old manifest can open them. Writers (append_day, compact,
+build) take an exclusive lock on manifest.lock and re-read the manifest under
+it, so backfill shards or a concurrent build never drop each other's updates.
+
+Build the base with `python -m Scripts.build_bar_store`.
+"""
+import contextlib
+import copy
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from app.services import trading_calendar
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+EPOCH = date(1970, 1, 1)
+INT_NULL = np.iinfo(np.int64).min
+
+FLOAT_COLS = ("open", "high", "low", "close", "vwap")
+INT_COLS = ("volume", "trades")
+COLS = ("date",) + FLOAT_COLS + INT_COLS
+
+SEGMENT_PREFIXES = ("base", "seg", "year", "delta")
+
+
+def to_days(d: date) -> int:
+    return (d - EPOCH).days
+
+
+def from_days(n: int) -> date:
+    return EPOCH + timedelta(days=int(n))
+
+
+def _store_dir() -> str:
+    return os.getenv("BARSTORE_DIR", os.path.join(".", "data", "barstore"))
+
+
+def _max_deltas() -> int:
+    try:
+        return max(1, int(os.getenv("BARSTORE_MAX_DELTAS", "20")))
+    except ValueError:
+        return 20
+
+
+def _retire_s() -> float:
+    try:
+        return max(0.0, float(os.getenv("BARSTORE_RETIRE_S", "600")))
+    except ValueError:
+        return 600.0
+
+
+@contextlib.contextmanager
+def _file_lock(root: str):
+    """Exclusive cross-process lock on <root>/manifest.lock (blocks until held)."""
+    os.makedirs(root, exist_ok=True)
+    with open(os.path.join(root, "manifest.lock"), "a+") as fh:
+        if fcntl is not None:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+        else:
+            fh.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(fh.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:  # LK_LOCK gives up after ~10s
+                    continue
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+            else:
+                fh.seek(0)
+                msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+# ---------- Segments ----------
+
+def columns_from_rows(rows: Iterable[Dict[str, Any]]) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """bars_daily row dicts -> (tickers object array, {col: array}) unsorted."""
+    rows = list(rows)
+    n = len(rows)
+    tickers = np.empty(n, dtype=object)
+    cols: Dict[str, np.ndarray] = {"date": np.empty(n, dtype=np.int32)}
+    for c in FLOAT_COLS:
+        cols[c] = np.empty(n, dtype=np.float64)
+    for c in INT_COLS:
+        cols[c] = np.empty(n, dtype=np.int64)
+
+    for i, r in enumerate(rows):
+        tickers[i] = r["ticker"]
+        cols["date"][i] = to_days(r["date"])
+        for c in FLOAT_COLS:
+            v = r.get(c)
+            cols[c][i] = np.nan if v is None else float(v)
+        for c in INT_COLS:
+            v = r.get(c)
+            cols[c][i] = INT_NULL if v is None else int(v)
+    return tickers, cols
+
+
+def write_segment(path: str, tickers: np.ndarray, cols: Dict[str, np.ndarray]) -> None:
+    """Sort by (ticker, date), write one .npy per column plus the ticker index."""
+    order = np.lexsort((cols["date"], tickers.astype(str)))
+    tickers = tickers[order]
+
+    os.makedirs(path, exist_ok=True)
+    for c in COLS:
+        np.save(os.path.join(path, f"{c}.npy"), np.ascontiguousarray(cols[c][order]))
+
+    index: Dict[str, List[int]] = {}
+    if len(tickers):
+        names, starts, counts = np.unique(tickers.astype(str), return_index=True, return_counts=True)
+        index = {str(t): [int(s), int(n)] for t, s, n in zip(names, starts, counts)}
+    with open(os.path.join(path, "index.json"), "w") as fh:
+        json.dump(index, fh)
+
+
+def _dedupe(tickers: np.ndarray, cols: Dict[str, np.ndarray]) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """Drop repeated (ticker, date) rows; the later one wins."""
+    if not len(tickers):
+        return tickers, cols
+    _, codes = np.unique(tickers.astype(str), return_inverse=True)
+    key = (codes.astype(np.int64) << 32) | (cols["date"].astype(np.int64) & 0xFFFFFFFF)
+    _, idx = np.unique(key[::-1], return_index=True)
+    keep = np.sort(len(key) - 1 - idx)
+    return tickers[keep], {c: a[keep] for c, a in cols.items()}
+
+
+class Segment:
+    def __init__(self, path: str):
+        self.path = path
+        self.cols = {
+            c: np.load(os.path.join(path, f"{c}.npy"), mmap_mode="r")
+            for c in COLS
+        }
+        with open(os.path.join(path, "index.json")) as fh:
+            self.index: Dict[str, List[int]] = json.load(fh)
+
+    def slice(self, ticker: str, lo: int, hi: int) -> Optional[Dict[str, np.ndarray]]:
+        """Views over this segment's rows for `ticker` with lo <= date <= hi."""
+        ent = self.index.get(ticker)
+        if ent is None:
+            return None
+        off, n = ent
+        dates = self.cols["date"][off:off + n]
+        i = int(np.searchsorted(dates, lo, side="left"))
+        j = int(np.searchsorted(dates, hi, side="right"))
+        if i >= j:
+            return None
+        return {c: a[off + i:off + j] for c, a in self.cols.items()}
+
+    def all_rows(self) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        tickers = np.empty(len(self.cols["date"]), dtype=object)
+        for t, (off, n) in self.index.items():
+            tickers[off:off + n] = t
+        return tickers, {c: np.asarray(a) for c, a in self.cols.items()}
+
+
+# ---------- Store ----------
+
+class _View(NamedTuple):
+    """One consistent manifest + the segments it names; readers never mix two."""
+    manifest: Dict[str, Any]
+    bases: List[Segment]
+    deltas: Dict[int, Segment]
+
+
+def _upgrade(manifest: Dict[str, Any]) -> Dict[str, Any]:
+    """Manifests written before segmented bases: one "base", deltas as a day list."""
+    if "bases" not in manifest:
+        manifest["bases"] = [{
+            "name": manifest.pop("base"),
+            "first": manifest.get("first_date"),
+            "last": manifest.get("last_date"),
+        }]
+    if isinstance(manifest.get("deltas"), list):
+        manifest["deltas"] = {
+            str(d): f"delta-{from_days(int(d)):%Y%m%d}" for d in manifest["deltas"]
+        }
+    manifest.setdefault("deltas", {})
+    manifest.setdefault("retired", [])
+    return manifest
+
+
+class BarStore:
+    def __init__(self, root: str):
+        self.root = root
+        self._lock = threading.Lock()         # reload + swap of the view
+        self._write_lock = threading.RLock()  # one writer at a time per process
+        self._write_depth = 0                 # nesting under _write_lock (compact from append_day)
+        self._manifest_mtime = 0
+        self._view: Optional[_View] = None
+        self._reload()
+
+    # --- manifest ---
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.root, "manifest.json")
+
+    @property
+    def manifest(self) -> Dict[str, Any]:
+        return self._reload().manifest
+
+    @property
+    def bases(self) -> List[Segment]:
+        return self._reload().bases
+
+    @property
+    def deltas(self) -> Dict[int, Segment]:
+        return self._reload().deltas
+
+    def _reload(self) -> _View:
+        with self._lock:
+            mtime = os.stat(self.manifest_path).st_mtime_ns
+            if mtime == self._manifest_mtime and self._view is not None:
+                return self._view
+            with open(self.manifest_path) as fh:
+                manifest = _upgrade(json.load(fh))
+            try:
+                view = _View(
+                    manifest,
+                    [Segment(os.path.join(self.root, b["name"])) for b in manifest["bases"]],
+                    {
+                        int(d): Segment(os.path.join(self.root, name))
+                        for d, name in manifest["deltas"].items()
+                    },
+                )
+            except FileNotFoundError:
+                # a segment this manifest names is already gone (we read it
+                # very late); keep serving the view we have
+                if self._view is None:
+                    raise
+                return self._view
+            self._view = view
+            self._manifest_mtime = mtime
+            return view
+
+    def _write_manifest(self, manifest: Dict[str, Any]) -> _View:
+        manifest["version"] = int(manifest.get("version", 0)) + 1
+        tmp = self.manifest_path + ".tmp"
+        with open(tmp, "w") as fh:
+            json.dump(manifest, fh)
+        os.replace(tmp, self.manifest_path)
+        with self._lock:
+            self._manifest_mtime = 0
+        return self._reload()
+
+    @contextlib.contextmanager
+    def _writing(self):
+        """One writer across threads and processes; re-entrant within a thread."""
+        with self._write_lock:
+            if self._write_depth:
+                self._write_depth += 1
+                try:
+                    yield
+                finally:
+                    self._write_depth -= 1
+                return
+            with _file_lock(self.root):
+                self._write_depth = 1
+                try:
+                    yield
+                finally:
+                    self._write_depth = 0
+
+    def _retire(self, manifest: Dict[str, Any], names: Iterable[str]) -> None:
+        """
+        Schedule segment dirs for deletion. Other processes may still be about
+        to open them from the manifest they read, so they are only removed
+        BARSTORE_RETIRE_S after they stopped being referenced.
+        """
+        now = time.time()
+        manifest["retired"] = manifest.get("retired", []) + [[n, now] for n in names]
+
+    def _sweep(self, manifest: Dict[str, Any]) -> None:
+        cutoff = time.time() - _retire_s()
+        keep = []
+        for name, at in manifest.get("retired", []):
+            if at <= cutoff:
+                # open mmaps keep the old files alive (or block removal on Windows)
+                shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+            else:
+                keep.append([name, at])
+        manifest["retired"] = keep
+
+    # --- reads ---
+
+    def last_day(self) -> Optional[date]:
+        """The newest day the store has (base range or delta), None if empty."""
+        manifest = self._reload().manifest
+        days = [d for d in [manifest.get("last_date")] + list(manifest.get("days", [])) if d is not None]
+        return from_days(max(days)) if days else None
+
+    def covers(self, start: date, end: date) -> bool:
+        """True if every trading session in [start, end] is in the base range or a delta day."""
+        manifest = self._reload().manifest
+        first = manifest.get("first_date")
+        last = manifest.get("last_date")
+        if first is None or last is None:
+            return False
+        days = set(manifest.get("days", []))
+        for d in trading_calendar.sessions(start, end):
+            n = to_days(d)
+            if not (first <= n <= last) and n not in days:
+                return False
+        return True
+
+    def holds(self, tickers: Iterable[str]) -> List[str]:
+        """The subset of `tickers` that has rows in any base segment or delta."""
+        view = self._reload()
+        segs = view.bases + list(view.deltas.values())
+        return [t for t in tickers if any(t in seg.index for seg in segs)]
+
+    def slice(self, ticker: str, start: date, end: date) -> Dict[str, np.ndarray]:
+        """
+        Columns for one ticker in [start, end], ascending by date.
+        A hit in a single segment is a zero-copy view; otherwise the parts are
+        concatenated (copy).
+        """
+        view = self._reload()
+        lo, hi = to_days(start), to_days(end)
+        parts = []
+        for meta, seg in zip(view.manifest["bases"], view.bases):
+            if meta.get("first") is not None and (meta["last"] < lo or meta["first"] > hi):
+                continue
+            p = seg.slice(ticker, lo, hi)
+            if p is not None:
+                parts.append(p)
+        for day, seg in sorted(view.deltas.items()):
+            if lo <= day <= hi:
+                p = seg.slice(ticker, lo, hi)
+                if p is not None:
+                    parts.append(p)
+
+        if not parts:
+            return {c: view.bases[0].cols[c][:0] for c in COLS}
+        if len(parts) == 1:
+            return parts[0]
+
+        merged = {c: np.concatenate([p[c] for p in parts]) for c in COLS}
+        # later segments and delta days overwrite earlier rows: keep the last occurrence per date
+        rev = merged["date"][::-1]
+        _, idx = np.unique(rev, return_index=True)
+        keep = len(rev) - 1 - idx
+        return {c: a[keep] for c, a in merged.items()}
+
+    def rows(self, tickers: List[str], start: date, end: date) -> Dict[str, List[Dict[str, Any]]]:
+        """Same shape as bars_daily.load_range()."""
+        out: Dict[str, List[Dict[str, Any]]] = {}
+        for t in tickers:
+            cols = self.slice(t, start, end)
+            vals = {c: cols[c].tolist() for c in COLS}
+            rows: List[Dict[str, Any]] = []
+            for i in range(len(vals["date"])):
+                r: Dict[str, Any] = {"date": from_days(vals["date"][i]), "ticker": t}
+                for c in FLOAT_COLS:
+                    v = vals[c][i]
+                    r[c] = None if v != v else v  # NaN -> None
+                for c in INT_COLS:
+                    v = vals[c][i]
+                    r[c] = None if v == INT_NULL else v
+                rows.append(r)
+            out[t] = rows
+        return out
+
+    # --- writes (backfill) ---
+
+    def append_day(self, d: date, rows: List[Dict[str, Any]]) -> None:
+        """Record one backfilled day (possibly empty, e.g. a holiday)."""
+        with self._writing():
+            manifest = copy.deepcopy(self._reload().manifest)
+            day = to_days(d)
+            if rows:
+                tickers, cols = columns_from_rows(rows)
+                name = f"delta-{d:%Y%m%d}-{int(manifest.get('version', 0)) + 1}"
+                write_segment(os.path.join(self.root, name), tickers, cols)
+                old = manifest["deltas"].get(str(day))
+                if old:
+                    self._retire(manifest, [old])
+                manifest["deltas"][str(day)] = name
+            manifest["days"] = sorted(set(manifest.get("days", [])) | {day})
+            self._sweep(manifest)
+            self._write_manifest(manifest)
+
+            if len(manifest["deltas"]) > _max_deltas():
+                self.compact()
+
+    def compact(self) -> None:
+        """
+        Fold the deltas into one new base segment appended to the list; the
+        existing bases are not rewritten. Segments that lie inside a calendar
+        year older than the newest segment are then merged into one per year,
+        so a multi-year backfill rewrites each year once, not the whole history.
+        """
+        with self._writing():
+            view = self._reload()
+            manifest = copy.deepcopy(view.manifest)
+            if not view.deltas:
+                return
+            version = int(manifest.get("version", 0)) + 1
+
+            parts = [view.deltas[d].all_rows() for d in sorted(view.deltas)]
+            tickers, cols = _dedupe(
+                np.concatenate([p[0] for p in parts]),
+                {c: np.concatenate([p[1][c] for p in parts]) for c in COLS},
+            )
+            name = f"seg-{version}"
+            write_segment(os.path.join(self.root, name), tickers, cols)
+            bases = manifest["bases"] + [{
+                "name": name,
+                "first": min(view.deltas),
+                "last": max(view.deltas),
+            }]
+            self._retire(manifest, manifest["deltas"].values())
+            manifest["bases"] = self._fold_years(bases, manifest, version)
+
+            # only days contiguous with the base range extend it; the rest stay listed
+            days = set(manifest.get("days", []))
+            first = manifest["first_date"]
+            last = manifest["last_date"]
+            while days and last < max(days):
+                nxt = last + 1
+                if nxt not in days and trading_calendar.is_session(from_days(nxt)):
+                    break
+                last = nxt
+            manifest.update({
+                "deltas": {},
+                "last_date": last,
+                "days": sorted(d for d in days if not first <= d <= last),
+            })
+            self._sweep(manifest)
+            self._write_manifest(manifest)
+
+    def _fold_years(
+        self, bases: List[Dict[str, Any]], manifest: Dict[str, Any], version: int
+    ) -> List[Dict[str, Any]]:
+        """Merge the segments of each finished year (see compact) into one."""
+        def year(n: int) -> int:
+            return from_days(n).year
+
+        newest = year(max(b["last"] for b in bases))
+        by_year: Dict[int, List[int]] = {}
+        for i, b in enumerate(bases):
+            if b.get("first") is not None and year(b["first"]) == year(b["last"]) < newest:
+                by_year.setdefault(year(b["first"]), []).append(i)
+
+        out = list(bases)
+        for y, idxs in sorted(by_year.items()):
+            if len(idxs) < 2:
+                continue
+            # bases are in write order, so concatenating them keeps "later wins"
+            parts = [Segment(os.path.join(self.root, bases[i]["name"])).all_rows() for i in idxs]
+            tickers, cols = _dedupe(
+                np.concatenate([p[0] for p in parts]),
+                {c: np.concatenate([p[1][c] for p in parts]) for c in COLS},
+            )
+            name = f"year-{y}-{version}"
+            write_segment(os.path.join(self.root, name), tickers, cols)
+            merged = {
+                "name": name,
+                "first": min(bases[i]["first"] for i in idxs),
+                "last": max(bases[i]["last"] for i in idxs),
+            }
+            self._retire(manifest, [bases[i]["name"] for i in idxs])
+            out[idxs[0]] = merged
+            for i in idxs[1:]:
+                out[i] = None
+        return [b for b in out if b is not None]
+
+
+def build(
+    root: str,
+    tickers: np.ndarray,
+    cols: Dict[str, np.ndarray],
+    first: date,
+    last: date,
+) -> "BarStore":
+    """Write a fresh base (see columns_from_rows) covering [first, last] and point the manifest at it."""
+    os.makedirs(root, exist_ok=True)
+    name = f"base-{int(time.time())}"
+    write_segment(os.path.join(root, name), tickers, cols)
+
+    with _file_lock(root):
+        # everything else on disk is retired, and swept once the grace period is over
+        retired: Dict[str, float] = {}
+        path = os.path.join(root, "manifest.json")
+        if os.path.exists(path):
+            with open(path) as fh:
+                retired = {n: at for n, at in json.load(fh).get("retired", [])}
+        now = time.time()
+        for entry in os.listdir(root):
+            if entry != name and entry.split("-")[0] in SEGMENT_PREFIXES:
+                retired.setdefault(entry, now)
+        cutoff = now - _retire_s()
+        for entry, at in list(retired.items()):
+            if at <= cutoff:
+                shutil.rmtree(os.path.join(root, entry), ignore_errors=True)
+                del retired[entry]
+
+        manifest = {
+            "version": 0,
+            "bases": [{"name": name, "first": to_days(first), "last": to_days(last)}],
+            "first_date": to_days(first),
+            "last_date": to_days(last),
+            "days": [],
+            "deltas": {},
+            "retired": [[n, at] for n, at in retired.items()],
+        }
+        tmp = path + ".tmp"
+        with open(tmp, "w") as fh:
+            json.dump(manifest, fh)
+        os.replace(tmp, path)
+    return BarStore(root)
+
+
+_store: Optional[BarStore] = None
+
+
+def get_store() -> Optional[BarStore]:
+    """The store under BARSTORE_DIR, or None if it was never built."""
+    global _store
+    root = _store_dir()
+    if _store is not None and _store.root == root:
+        return _store
+    if not os.path.exists(os.path.join(root, "manifest.json")):
+        return None
+    _store = BarStore(root)
+    return _store
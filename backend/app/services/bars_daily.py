@@ -0,0 +1,240 @@
+# app/services/bars_daily.py
+"""
+SQL + row helpers for the local `bars_daily` table.
+
+Rows everywhere in here use the table's own shape:
+  {date, ticker, open, high, low, close, volume, vwap, trades}
+with `date` as a Python date.
+
+`copy_upsert` is the bulk path (psycopg 3 COPY into bars_daily_staging, then
+one merge); `upsert_rows` is the executemany path for small writes.
+
+bars_daily is partitioned by year (migration 007). `upsert_rows` makes sure
+the partitions it needs exist; bulk callers call `ensure_partitions` for
+their date range first.
+"""
+import secrets
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import text
+
+from app.services import trading_calendar
+
+NY = ZoneInfo("America/New_York")
+
+Span = Tuple[Optional[date], Optional[date]]
+
+
+UPSERT_SQL = text("""
+INSERT INTO bars_daily (date, ticker, open, high, low, close, volume, vwap, trades)
+VALUES (:date, :ticker, :open, :high, :low, :close, :volume, :vwap, :trades)
+ON CONFLICT (date, ticker) DO UPDATE SET
+  open   = EXCLUDED.open,
+  high   = EXCLUDED.high,
+  low    = EXCLUDED.low,
+  close  = EXCLUDED.close,
+  volume = EXCLUDED.volume,
+  vwap   = EXCLUDED.vwap,
+  trades = EXCLUDED.trades;
+""")
+
+SELECT_RANGE_SQL = text("""
+SELECT date, ticker, open, high, low, close, volume, vwap, trades
+FROM bars_daily
+WHERE ticker = ANY(:tickers)
+  AND date BETWEEN :start AND :end
+ORDER BY ticker, date
+""")
+
+# Known span per ticker: the coverage row if we have one, otherwise whatever
+# the backfill already put in bars_daily (grouped days cover every ticker).
+SELECT_SPANS_SQL = text("""
+SELECT t.ticker,
+       COALESCE(c.first_date, (SELECT MIN(b.date) FROM bars_daily b WHERE b.ticker = t.ticker)) AS first_date,
+       COALESCE(c.last_date,  (SELECT MAX(b.date) FROM bars_daily b WHERE b.ticker = t.ticker)) AS last_date
+FROM unnest(CAST(:tickers AS text[])) AS t(ticker)
+LEFT JOIN bars_daily_coverage c ON c.ticker = t.ticker
+""")
+
+COLUMNS = ("date", "ticker", "open", "high", "low", "close", "volume", "vwap", "trades")
+
+COPY_STAGING_SQL = (
+    "COPY bars_daily_staging (batch_id, " + ", ".join(COLUMNS) + ") FROM STDIN"
+)
+
+# Last copy of a (date, ticker) wins if a batch carries it twice; ON CONFLICT
+# DO UPDATE refuses to touch the same row twice in one statement.
+MERGE_STAGING_SQL = text("""
+INSERT INTO bars_daily (date, ticker, open, high, low, close, volume, vwap, trades)
+SELECT DISTINCT ON (date, ticker)
+       date, ticker, open, high, low, close, volume, vwap, trades
+FROM bars_daily_staging
+WHERE batch_id = :batch_id
+ORDER BY date, ticker, seq DESC
+ON CONFLICT (date, ticker) DO UPDATE SET
+  open   = EXCLUDED.open,
+  high   = EXCLUDED.high,
+  low    = EXCLUDED.low,
+  close  = EXCLUDED.close,
+  volume = EXCLUDED.volume,
+  vwap   = EXCLUDED.vwap,
+  trades = EXCLUDED.trades;
+""")
+
+CLEAR_STAGING_SQL = text("DELETE FROM bars_daily_staging WHERE batch_id = :batch_id")
+
+ENSURE_PARTITION_SQL = text("SELECT public.bars_daily_ensure_partition(:year)")
+
+EXTEND_COVERAGE_SQL = text("""
+INSERT INTO bars_daily_coverage (ticker, first_date, last_date, checked_at)
+VALUES (:ticker, :first_date, :last_date, now())
+ON CONFLICT (ticker) DO UPDATE SET
+  first_date = LEAST(bars_daily_coverage.first_date, EXCLUDED.first_date),
+  last_date  = GREATEST(bars_daily_coverage.last_date, EXCLUDED.last_date),
+  checked_at = now();
+""")
+
+
+# ---------- Row helpers ----------
+
+def rows_from_aggs(ticker: str, results: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Polygon /v2/aggs results (t in ms) -> bars_daily rows."""
+    out: List[Dict[str, Any]] = []
+    for r in results or []:
+        out.append({
+            "date": datetime.fromtimestamp(r["t"] / 1000, tz=timezone.utc).date(),
+            "ticker": ticker,
+            "open": r.get("o"),
+            "high": r.get("h"),
+            "low": r.get("l"),
+            "close": r.get("c"),
+            "volume": int(r["v"]) if r.get("v") is not None else None,
+            "vwap": r.get("vw"),
+            "trades": r.get("n"),
+        })
+    return out
+
+
+def rows_from_grouped(
+    d: date, results: Iterable[Dict[str, Any]], tickers: Optional[set] = None
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Polygon grouped-daily results (T = ticker) -> {ticker: bars_daily row} for day `d`.
+    `tickers` limits the output to the symbols we care about.
+    """
+    out: Dict[str, Dict[str, Any]] = {}
+    for r in results or []:
+        t = str(r.get("T") or "").strip().upper()
+        if not t or (tickers is not None and t not in tickers):
+            continue
+        out[t] = {
+            "date": d,
+            "ticker": t,
+            "open": r.get("o"),
+            "high": r.get("h"),
+            "low": r.get("l"),
+            "close": r.get("c"),
+            "volume": int(r["v"]) if r.get("v") is not None else None,
+            "vwap": r.get("vw"),
+            "trades": r.get("n"),
+        }
+    return out
+
+
+def session_epoch(d: date) -> int:
+    """Epoch seconds of the session's midnight in New York (what Polygon uses for `t`)."""
+    return int(datetime(d.year, d.month, d.day, tzinfo=NY).timestamp())
+
+
+def settled_through(today: Optional[date] = None) -> date:
+    """Last session whose daily bar is final. Today's bar may still move."""
+    return (today or date.today()) - timedelta(days=1)
+
+
+def missing_ranges(span: Span, start: date, end: date) -> List[Tuple[date, date]]:
+    """
+    Ranges to fetch so the known span covers [start, end].
+
+    Gaps always run up to the span edge (even past the requested window) so the
+    span stays one contiguous block. Ranges without a trading session
+    (weekends, holidays) are dropped: Polygon has nothing for them.
+    """
+    lo, hi = span
+    if lo is None or hi is None:
+        return [(start, end)] if trading_calendar.has_session(start, end) else []
+
+    gaps: List[Tuple[date, date]] = []
+    head = (start, lo - timedelta(days=1))
+    tail = (hi + timedelta(days=1), end)
+    for a, b in (head, tail):
+        if trading_calendar.has_session(a, b):
+            gaps.append((a, b))
+    return gaps
+
+
+# ---------- DB access (sync; call through run_in_threadpool from async code) ----------
+
+def load_range(conn, tickers: List[str], start: date, end: date) -> Dict[str, List[Dict[str, Any]]]:
+    out: Dict[str, List[Dict[str, Any]]] = {t: [] for t in tickers}
+    rows = conn.execute(
+        SELECT_RANGE_SQL, {"tickers": tickers, "start": start, "end": end}
+    ).mappings()
+    for r in rows:
+        out.setdefault(r["ticker"], []).append(dict(r))
+    return out
+
+
+def load_spans(conn, tickers: List[str]) -> Dict[str, Span]:
+    rows = conn.execute(SELECT_SPANS_SQL, {"tickers": tickers}).mappings()
+    return {r["ticker"]: (r["first_date"], r["last_date"]) for r in rows}
+
+
+# Years whose partition already existed when we asked (so it is committed)
+_partition_years: set = set()
+
+
+def ensure_partitions(conn, years: Iterable[int]) -> None:
+    """Create any missing yearly partitions of bars_daily, in the caller's transaction."""
+    for y in sorted(set(years) - _partition_years):
+        created = conn.execute(ENSURE_PARTITION_SQL, {"year": y}).scalar()
+        if not created:
+            _partition_years.add(y)
+
+
+def upsert_rows(conn, rows: List[Dict[str, Any]]) -> None:
+    if rows:
+        ensure_partitions(conn, {r["date"].year for r in rows})
+        conn.execute(UPSERT_SQL, rows)
+
+
+def supports_copy(conn) -> bool:
+    return conn.dialect.driver == "psycopg"
+
+
+def copy_upsert(conn, records: Iterable[Sequence[Any]]) -> int:
+    """
+    Bulk upsert through the staging table, inside the caller's transaction:
+    COPY the records (tuples in COLUMNS order) in, merge them into bars_daily,
+    clear them out again. psycopg 3 only (see supports_copy). Returns rows merged.
+    """
+    batch_id = secrets.randbits(62)
+    raw = conn.connection.driver_connection
+    with raw.cursor() as cur:
+        with cur.copy(COPY_STAGING_SQL) as cp:
+            for r in records:
+                cp.write_row((batch_id, *r))
+    merged = conn.execute(MERGE_STAGING_SQL, {"batch_id": batch_id}).rowcount
+    conn.execute(CLEAR_STAGING_SQL, {"batch_id": batch_id})
+    return merged
+
+
+def extend_coverage(conn, ticker: str, first_date: date, last_date: date) -> None:
+    if last_date < first_date:
+        return
+    conn.execute(EXTEND_COVERAGE_SQL, {
+        "ticker": ticker,
+        "first_date": first_date,
+        "last_date": last_date,
+    })
@@ -0,0 +1,222 @@
+# app/services/cache.py
+"""
+Redis response cache shared by every uvicorn worker.
+
+    @router.get("/summary")
+    @cached("portfolio.summary", ttl=3600, tags=["positions"])
+    def portfolio_summary(conn = Depends(db.get_db)): ...
+
+- Key = namespace + the listed `key_params` (query/path params, never Depends)
+  + `vary(kwargs)` if given, for inputs that are not params (e.g. today's date).
+- `ttl` is seconds, None for no expiry, or a callable(kwargs) -> either.
+- `tags` (list or callable(kwargs) -> list) group keys so the write paths can
+  drop them with `invalidate([...])`; the upload routes do this.
+- Every tag has a generation counter that is part of the key. `invalidate`
+  bumps it, so a response computed before the bump (a read racing an upload)
+  lands under the old generation and is never served; the old keys are also
+  deleted, and a late write is swept by the next invalidate of that tag.
+- Hits are returned as raw JSON bytes; misses run the route as usual.
+
+REDIS_URL unset, redis not installed, or Redis down => the cache is bypassed
+and routes behave exactly as without it. After a connection error or timeout
+Redis is left alone for CACHE_REDIS_RETRY_S (default 5) so an outage does
+not add the socket timeouts to every request (invalidate still tries).
+"""
+import functools
+import hashlib
+import inspect
+import json
+import os
+import time
+from typing import Any, Callable, Dict, Iterable, Optional, Sequence, Union
+
+from fastapi import Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+
+try:
+    import redis
+except ImportError:  # cache is optional
+    redis = None
+
+PREFIX = "tobs:cache:"
+
+_client = None
+_disabled = False
+_down_until = 0.0
+
+Ttl = Union[None, int, Callable[[Dict[str, Any]], Optional[int]]]
+Tags = Union[Sequence[str], Callable[[Dict[str, Any]], Iterable[str]]]
+
+
+def _redis(retry: bool = False):
+    """The client, or None if the cache is off (or cooling down, unless `retry`)."""
+    global _client, _disabled
+    if _disabled or (not retry and time.monotonic() < _down_until):
+        return None
+    if _client is None:
+        url = os.getenv("REDIS_URL")
+        if not url or redis is None:
+            _disabled = True
+            return None
+        _client = redis.Redis.from_url(
+            url, socket_timeout=0.25, socket_connect_timeout=0.25
+        )
+    return _client
+
+
+def _skipped(what: str, e: Exception) -> None:
+    global _down_until
+    print(f"{what}:", e)
+    if isinstance(e, (redis.ConnectionError, redis.TimeoutError)):
+        try:
+            retry_s = float(os.getenv("CACHE_REDIS_RETRY_S", "5"))
+        except ValueError:
+            retry_s = 5.0
+        _down_until = time.monotonic() + retry_s
+
+
+def _key(namespace: str, key_params: Sequence[str], kwargs: Dict[str, Any]) -> str:
+    parts = "&".join(f"{p}={kwargs.get(p)}" for p in key_params)
+    if len(parts) > 200:
+        parts = hashlib.sha1(parts.encode()).hexdigest()
+    return f"{PREFIX}{namespace}:{parts}"
+
+
+def _tag_key(tag: str) -> str:
+    return f"{PREFIX}tag:{tag}"
+
+
+def _gen_key(tag: str) -> str:
+    return f"{PREFIX}gen:{tag}"
+
+
+def _versioned(key: str, tags: Sequence[str]) -> Optional[str]:
+    """`key` plus the current generation of each tag; None if Redis is unavailable."""
+    if not tags:
+        return key
+    r = _redis()
+    if r is None:
+        return None
+    try:
+        gens = r.mget([_gen_key(t) for t in tags])
+    except redis.RedisError as e:
+        _skipped("Cache read skipped", e)
+        return None
+    return key + "|" + ",".join((g or b"0").decode() for g in gens)
+
+
+def _get(key: str) -> Optional[bytes]:
+    r = _redis()
+    if r is None:
+        return None
+    try:
+        return r.get(key)
+    except redis.RedisError as e:
+        _skipped("Cache read skipped", e)
+        return None
+
+
+def _put(key: str, body: bytes, ttl: Optional[int], tags: Iterable[str]) -> None:
+    r = _redis()
+    if r is None:
+        return
+    try:
+        pipe = r.pipeline()
+        if ttl is None:
+            pipe.set(key, body)
+        else:
+            pipe.set(key, body, ex=max(1, int(ttl)))
+        for tag in tags:
+            pipe.sadd(_tag_key(tag), key)
+        pipe.execute()
+    except redis.RedisError as e:
+        _skipped("Cache write skipped", e)
+
+
+def invalidate(tags: Iterable[str]) -> int:
+    """Drop every cached response carrying any of `tags`. Returns keys deleted."""
+    r = _redis(retry=True)  # writes are rare; don't let the cooldown swallow one
+    if r is None:
+        return 0
+    deleted = 0
+    try:
+        for tag in tags:
+            r.incr(_gen_key(tag))
+            tk = _tag_key(tag)
+            keys = list(r.smembers(tk))
+            if keys:
+                deleted += r.delete(*keys)
+            r.delete(tk)
+    except redis.RedisError as e:
+        _skipped("Cache invalidation failed", e)
+    return deleted
+
+
+def _encode(result: Any) -> Optional[bytes]:
+    if isinstance(result, Response):
+        return None
+    try:
+        return json.dumps(jsonable_encoder(result), allow_nan=False).encode()
+    except (TypeError, ValueError):
+        return None
+
+
+def cached(
+    namespace: str,
+    ttl: Ttl = 300,
+    tags: Tags = (),
+    key_params: Sequence[str] = (),
+    cache_if: Optional[Callable[[Any], bool]] = None,
+    vary: Optional[Callable[[Dict[str, Any]], Any]] = None,
+):
+    def resolve(kwargs: Dict[str, Any]):
+        t = ttl(kwargs) if callable(ttl) else ttl
+        tg = list(tags(kwargs) if callable(tags) else tags)
+        return t, tg
+
+    def lookup(kwargs: Dict[str, Any]):
+        # the generations are read before the route runs, so an invalidate
+        # that lands while it runs makes its result unreachable
+        t, tg = resolve(kwargs)
+        base = _key(namespace, key_params, kwargs)
+        if vary is not None:
+            base += f"@{vary(kwargs)}"
+        key = _versioned(base, tg)
+        hit = _get(key) if key is not None else None
+        return key, hit
+
+    def store(key: Optional[str], kwargs: Dict[str, Any], result: Any) -> None:
+        if key is None:
+            return
+        if cache_if is not None and not cache_if(result):
+            return
+        body = _encode(result)
+        if body is None:
+            return
+        t, tg = resolve(kwargs)
+        _put(key, body, t, tg)
+
+    def decorator(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                key, hit = await run_in_threadpool(lookup, kwargs)
+                if hit is not None:
+                    return Response(content=hit, media_type="application/json")
+                result = await fn(*args, **kwargs)
+                await run_in_threadpool(store, key, kwargs, result)
+                return result
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            key, hit = lookup(kwargs)
+            if hit is not None:
+                return Response(content=hit, media_type="application/json")
+            result = fn(*args, **kwargs)
+            store(key, kwargs, result)
+            return result
+        return wrapper
+
+    return decorator
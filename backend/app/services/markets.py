@@ -0,0 +1,445 @@
+# app/services/markets.py
+"""
+Daily bars for the /api/markets routes.
+
+Read-through over the local bars_daily table: serve what we have, fetch only
+the missing date ranges from Polygon, upsert them, and return the merged series.
+Coverage is only recorded through yesterday (`bars_daily.settled_through`);
+today's bar, when the window reaches it, is fetched per ticker on top and
+never stored or planned as a grouped day. It is kept in-process for
+MARKETS_LIVE_TTL_S during the session (MARKETS_LIVE_FINAL_TTL_S once the
+session has closed) and not asked for at all before the open, so a warm
+window costs no upstream call within the TTL.
+
+If the mmap bar store (app/services/bar_columns.py) covers the window up to its
+last day, the tickers it holds are read from it for that part and from
+bars_daily (read-through as usual) for the days after it; tickers it does not
+hold go through the read-through path for the whole window, and today's bar is
+fetched on top either way. How the gaps get filled is decided by `plan_fill`:
+  - local    nothing missing, zero upstream calls
+  - aggs     one /v2/aggs/ticker range call per gap (few symbols / long spans)
+  - grouped  one /v2/aggs/grouped call per missing day, shared by every symbol
+             (many symbols over a short window)
+
+Env (optional):
+  MARKETS_BATCH_CONCURRENCY  tickers / grouped days filled at once per request (default 8)
+  MARKETS_GROUPED_MAX_DAYS   never plan more grouped days than this (default 30);
+                             each one is a whole-market payload
+  MARKETS_STREAM_CHUNK       tickers read from the cache at a time when streaming (default 16)
+  MARKETS_LIVE_TTL_S         reuse today's bar this long during the session (default 60)
+  MARKETS_LIVE_FINAL_TTL_S   ... and this long after the close (default 3600)
+The process-wide Polygon cap in polygon_client still applies on top.
+"""
+import asyncio
+import os
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, AsyncIterator, Dict, List, NamedTuple, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.db import SessionLocal
+from app.services import bar_columns, bars_daily, trading_calendar
+from app.services.polygon import fetch_daily_aggs
+from app.services.polygon_grouped import fetch_grouped_daily
+
+Gaps = Dict[str, List[Tuple[date, date]]]
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(1, int(os.getenv(name, str(default))))
+    except ValueError:
+        return default
+
+
+def _batch_concurrency() -> int:
+    return _env_int("MARKETS_BATCH_CONCURRENCY", 8)
+
+
+def _grouped_max_days() -> int:
+    return _env_int("MARKETS_GROUPED_MAX_DAYS", 30)
+
+
+# ---------- Planner ----------
+
+class FillPlan(NamedTuple):
+    strategy: str           # "local" | "aggs" | "grouped"
+    upstream_calls: int
+    days: List[date]        # grouped days to pull (grouped strategy only)
+
+
+def plan_fill(gaps: Gaps) -> FillPlan:
+    """
+    Pick the cheapest way to fill `gaps`, counted in upstream requests:
+    per-ticker aggs cost one call per gap range, grouped costs one call per
+    distinct trading session across all gaps.
+    """
+    aggs_calls = sum(len(g) for g in gaps.values())
+    if aggs_calls == 0:
+        return FillPlan("local", 0, [])
+
+    days = sorted({
+        d
+        for ranges in gaps.values()
+        for a, b in ranges
+        for d in trading_calendar.sessions(a, b)
+    })
+
+    if len(days) < aggs_calls and len(days) <= _grouped_max_days():
+        return FillPlan("grouped", len(days), days)
+    return FillPlan("aggs", aggs_calls, [])
+
+
+# ---------- DB (sync, run in the threadpool) ----------
+
+def _read_spans(tickers: List[str]) -> Dict[str, bars_daily.Span]:
+    with SessionLocal() as db:
+        return bars_daily.load_spans(db, tickers)
+
+
+def _read_range(
+    tickers: List[str], start: date, end: date
+) -> Dict[str, List[Dict[str, Any]]]:
+    with SessionLocal() as db:
+        return bars_daily.load_range(db, tickers, start, end)
+
+
+def _read_cached(
+    tickers: List[str],
+    start: date,
+    end: date,
+    store: Optional[bar_columns.BarStore],
+    stored: set,
+    through: Optional[date],
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Cached rows per ticker: `stored` tickers from the bar store through
+    `through` and from bars_daily after it, the rest from bars_daily.
+    """
+    out: Dict[str, List[Dict[str, Any]]] = {}
+    mine = [t for t in tickers if t in stored]
+    rest = [t for t in tickers if t not in stored]
+    if mine:
+        out.update(store.rows(mine, start, through))
+        if through < end:
+            newer = _read_range(mine, through + timedelta(days=1), end)
+            for t in mine:
+                out[t] = out[t] + newer.get(t, [])
+    if rest:
+        out.update(_read_range(rest, start, end))
+    return out
+
+
+def _store(
+    rows: List[Dict[str, Any]], coverage: Dict[str, Tuple[date, date]]
+) -> None:
+    if not rows and not coverage:
+        return
+    with SessionLocal() as db:
+        bars_daily.upsert_rows(db, rows)
+        for ticker, (first, last) in coverage.items():
+            bars_daily.extend_coverage(db, ticker, first, last)
+        db.commit()
+
+
+def _live_range(settled: date, end: date) -> Optional[Tuple[date, date]]:
+    """
+    The unsettled tail of the window (today's bar), if it has a session.
+    It is fetched per ticker, never planned as a grouped day (today's grouped
+    payload is empty until the close) and never recorded as coverage.
+    """
+    a = settled + timedelta(days=1)
+    if end < a or not trading_calendar.has_session(a, end):
+        return None
+    return a, end
+
+
+def _new_span(
+    span: bars_daily.Span, gaps: List[Tuple[date, date]], settled: date
+) -> Tuple[date, date]:
+    """Known span once `gaps` are filled (gaps are adjacent to the span by construction)."""
+    lo, hi = span
+    first = min([g[0] for g in gaps] + ([lo] if lo else []))
+    last = max([g[1] for g in gaps] + ([hi] if hi else []))
+    return first, min(last, settled)
+
+
+# ---------- Live tail ----------
+
+# (ticker, first, last) -> (expires at, rows); only the current tail is kept
+_live_rows: Dict[Tuple[str, date, date], Tuple[float, List[Dict[str, Any]]]] = {}
+
+
+def _live_ttl(live: Tuple[date, date], now: Optional[datetime] = None) -> Optional[int]:
+    """
+    Seconds the tail's rows may be reused, or None if its first session has
+    not opened yet in New York (nothing to fetch).
+    """
+    day = trading_calendar.sessions(*live)[0]
+    now = now or datetime.now(bars_daily.NY)
+    opens = datetime(day.year, day.month, day.day, 9, 30, tzinfo=bars_daily.NY)
+    if now < opens:
+        return None
+    hh, mm = (trading_calendar.early_close(day) or "16:00").split(":")
+    closes = opens.replace(hour=int(hh), minute=int(mm))
+    if now >= closes + timedelta(minutes=15):
+        return _env_int("MARKETS_LIVE_FINAL_TTL_S", 3600)
+    return _env_int("MARKETS_LIVE_TTL_S", 60)
+
+
+def _live_hit(ticker: str, live: Tuple[date, date]) -> Optional[List[Dict[str, Any]]]:
+    hit = _live_rows.get((ticker, *live))
+    if hit is not None and hit[0] > time.monotonic():
+        return hit[1]
+    return None
+
+
+def _remember_live(ticker: str, live: Tuple[date, date], rows: List[Dict[str, Any]], ttl: int) -> None:
+    for key in [k for k in _live_rows if k[1] != live[0]]:
+        del _live_rows[key]  # an older day's tail
+    _live_rows[(ticker, *live)] = (time.monotonic() + ttl, rows)
+
+
+async def _fetch_live(ticker: str, live: Optional[Tuple[date, date]]) -> List[Dict[str, Any]]:
+    """Rows for the unsettled tail (see _live_range); cached briefly, not persisted."""
+    if live is None:
+        return []
+    ttl = _live_ttl(live)
+    if ttl is None:
+        return []
+    hit = _live_hit(ticker, live)
+    if hit is not None:
+        return hit
+    a, b = live
+    results = await fetch_daily_aggs(ticker, f"{a:%Y-%m-%d}", f"{b:%Y-%m-%d}", adjusted=True)
+    rows = bars_daily.rows_from_aggs(ticker, results)
+    _remember_live(ticker, live, rows, ttl)
+    return rows
+
+
+# ---------- Fill strategies ----------
+
+
+async def _fill_aggs(
+    ticker: str,
+    span: bars_daily.Span,
+    gaps: List[Tuple[date, date]],
+    settled: date,
+    live: Optional[Tuple[date, date]],
+) -> List[Dict[str, Any]]:
+    """
+    Per-ticker range calls for one ticker's gaps, plus the unsettled tail;
+    persists the settled rows and returns all of them. A gap that ends at
+    `settled` is fetched through the tail in the same call, unless the tail
+    is already cached or not open yet.
+    """
+    ranges = list(gaps)
+    fold = None
+    if live is not None and ranges and ranges[-1][1] >= settled and _live_hit(ticker, live) is None:
+        ttl = _live_ttl(live)
+        if ttl is not None:
+            ranges[-1] = (ranges[-1][0], live[1])
+            fold, live = (live, ttl), None
+
+    fetched: List[Dict[str, Any]] = []
+    for a, b in ranges:
+        results = await fetch_daily_aggs(
+            ticker, f"{a:%Y-%m-%d}", f"{b:%Y-%m-%d}", adjusted=True
+        )
+        fetched.extend(bars_daily.rows_from_aggs(ticker, results))
+
+    # only settled bars are stored; coverage stops at `settled` so today's
+    # bar is fetched again next time
+    coverage = {ticker: _new_span(span, gaps, settled)} if gaps else {}
+    await run_in_threadpool(_store, [r for r in fetched if r["date"] <= settled], coverage)
+    if fold is not None:
+        _remember_live(ticker, fold[0], [r for r in fetched if r["date"] > settled], fold[1])
+    return fetched + await _fetch_live(ticker, live)
+
+
+async def _fill_grouped(
+    plan: FillPlan,
+    gaps: Gaps,
+    spans: Dict[str, bars_daily.Span],
+    settled: date,
+    sem: asyncio.Semaphore,
+    errors: Optional[Dict[str, str]],
+) -> Tuple[Dict[str, List[Dict[str, Any]]], List[str]]:
+    """
+    One grouped call per missing day, split back out to the requested tickers.
+
+    Grouped daily only lists US stocks, so a ticker that is in none of the
+    day payloads (index, crypto, OTC, typo) is not marked covered; it is
+    returned in the second list for the per-ticker aggs path instead.
+    """
+    wanted = {t for t, g in gaps.items() if g}
+
+    async def one_day(d: date):
+        async with sem:
+            return await fetch_grouped_daily(f"{d:%Y-%m-%d}")
+
+    results = await asyncio.gather(
+        *(one_day(d) for d in plan.days), return_exceptions=True
+    )
+
+    fetched: Dict[str, List[Dict[str, Any]]] = {t: [] for t in wanted}
+    failed: Dict[date, str] = {}
+    for d, res in zip(plan.days, results):
+        if isinstance(res, RuntimeError):
+            failed[d] = str(res)
+            continue
+        if isinstance(res, BaseException):
+            raise res
+        for t, row in bars_daily.rows_from_grouped(d, res, wanted).items():
+            fetched[t].append(row)
+
+    coverage: Dict[str, Tuple[date, date]] = {}
+    rows: List[Dict[str, Any]] = []
+    unseen: List[str] = []
+    for t in sorted(wanted):
+        missed = [
+            d for a, b in gaps[t] for d in trading_calendar.sessions(a, b) if d in failed
+        ]
+        if missed:
+            if errors is None:
+                raise RuntimeError(failed[missed[0]])
+            errors[t] = failed[missed[0]]
+            continue
+        if not fetched[t]:
+            unseen.append(t)
+            continue
+        rows.extend(fetched[t])
+        coverage[t] = _new_span(spans.get(t, (None, None)), gaps[t], settled)
+
+    await run_in_threadpool(_store, rows, coverage)
+    return fetched, unseen
+
+
+def _merge(
+    cached: List[Dict[str, Any]], fetched: List[Dict[str, Any]], start: date, end: date
+) -> List[Dict[str, Any]]:
+    by_date = {r["date"]: r for r in cached}
+    for r in fetched:
+        if start <= r["date"] <= end:
+            by_date[r["date"]] = r
+    return [by_date[d] for d in sorted(by_date)]
+
+
+# ---------- Public ----------
+
+def _chunks(items: List[str], n: int):
+    for i in range(0, len(items), n):
+        yield items[i:i + n]
+
+
+async def iter_daily_bars(
+    tickers: List[str],
+    start: date,
+    end: date,
+    errors: Optional[Dict[str, str]] = None,
+    chunk: Optional[int] = None,
+) -> AsyncIterator[Tuple[str, List[Dict[str, Any]]]]:
+    """
+    Yield (ticker, [bars_daily rows ascending]) for [start, end] as each ticker
+    is ready: tickers needing no upstream call (or filled by a grouped call)
+    first, read `chunk` at a time, then per-ticker fills in completion order.
+    Only one chunk of cached rows is held at once. Error handling is the same
+    as daily_bars_many.
+    """
+    chunk = chunk or _env_int("MARKETS_STREAM_CHUNK", 16)
+    settled = bars_daily.settled_through()
+
+    # tickers the store holds are read from it through `through` (its last
+    # day, fixed for this request); only the days after that can have gaps
+    store = bar_columns.get_store()
+    stored: set = set()
+    through: Optional[date] = None
+    last = await run_in_threadpool(store.last_day) if store is not None else None
+    if last is not None and start <= last:
+        through = min(end, settled, last)
+        if await run_in_threadpool(store.covers, start, through):
+            stored = set(await run_in_threadpool(store.holds, tickers))
+
+    def first_gap_day(t: str) -> date:
+        return through + timedelta(days=1) if t in stored else start
+
+    stop = min(end, settled)
+    need = [t for t in tickers if first_gap_day(t) <= stop]
+    spans = await run_in_threadpool(_read_spans, need) if need else {}
+    gaps: Gaps = {
+        t: bars_daily.missing_ranges(spans.get(t, (None, None)), first_gap_day(t), stop)
+        if first_gap_day(t) <= stop else []
+        for t in tickers
+    }
+    # the plan only covers settled days; the live tail is fetched per ticker
+    plan = plan_fill(gaps)
+    live = _live_range(settled, end)
+    sem = asyncio.Semaphore(_batch_concurrency())
+
+    fetched: Dict[str, List[Dict[str, Any]]] = {}
+    if plan.strategy == "grouped":
+        fetched, pending = await _fill_grouped(plan, gaps, spans, settled, sem, errors)
+    elif plan.strategy == "aggs":
+        pending = [t for t in tickers if gaps[t]]
+    else:
+        pending = []
+
+    async def tail(t: str) -> List[Dict[str, Any]]:
+        async with sem:
+            try:
+                return await _fetch_live(t, live)
+            except RuntimeError as e:
+                if errors is None:
+                    raise
+                errors[t] = str(e)
+                return []
+
+    waiting = set(pending)
+    ready = [t for t in tickers if t not in waiting]
+    for group in _chunks(ready, chunk):
+        cached = await run_in_threadpool(_read_cached, group, start, end, store, stored, through)
+        tails = await asyncio.gather(*(tail(t) for t in group))
+        for t, new in zip(group, tails):
+            yield t, _merge(cached.get(t, []), fetched.pop(t, []) + new, start, end)
+
+    if not pending:
+        return
+
+    async def one(t: str) -> Tuple[str, List[Dict[str, Any]]]:
+        async with sem:
+            try:
+                new = await _fill_aggs(t, spans.get(t, (None, None)), gaps[t], settled, live)
+            except RuntimeError as e:
+                if errors is None:
+                    raise
+                errors[t] = str(e)
+                new = []
+        cached = await run_in_threadpool(_read_cached, [t], start, end, store, stored, through)
+        return t, _merge(cached.get(t, []), new, start, end)
+
+    for fut in asyncio.as_completed([one(t) for t in pending]):
+        yield await fut
+
+
+async def daily_bars_many(
+    tickers: List[str],
+    start: date,
+    end: date,
+    errors: Optional[Dict[str, str]] = None,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    {ticker: [bars_daily rows ascending]} for [start, end].
+
+    If Polygon fails while filling a gap the RuntimeError is raised, unless an
+    `errors` dict is given: then the message is recorded there per ticker and
+    that ticker gets whatever was already cached.
+    """
+    out: Dict[str, List[Dict[str, Any]]] = {}
+    async for t, rows in iter_daily_bars(tickers, start, end, errors, chunk=max(1, len(tickers))):
+        out[t] = rows
+    return {t: out.get(t, []) for t in tickers}
+
+
+async def daily_bars(ticker: str, start: date, end: date) -> List[Dict[str, Any]]:
+    return (await daily_bars_many([ticker], start, end))[ticker]
@@ -1,9 +1,12 @@
 # app/services/polygon.py
 import os
-import httpx
 from typing import Any, Dict, List, Optional
 
-BASE = "https://api.polygon.io"
+from app.services.polygon_client import base_url, polygon_get
+from app.services.singleflight import SingleFlight
+
+# Identical concurrent range requests share one upstream call
+_flights = SingleFlight()
 
 
 def _get_key() -> str:
@@ -18,15 +21,33 @@ async def fetch_daily_aggs(
     start: str,
     end: str,
     adjusted: bool = True,
-    timeout_s: float = 30.0,
+    timeout_s: Optional[float] = None,
 ) -> List[Dict[str, Any]]:
     """
     Returns Polygon 'results' list of bars (raw) for 1D candles.
     start/end: YYYY-MM-DD
+    timeout_s: per-call override of the shared client's timeout.
+
+    Concurrent calls with the same (symbol, start, end, adjusted) are coalesced
+    and get the same list back, so treat it as read-only.
     """
+    symbol = symbol.upper()
+    return await _flights.do(
+        (symbol, start, end, adjusted),
+        lambda: _fetch_daily_aggs(symbol, start, end, adjusted, timeout_s),
+    )
+
+
+async def _fetch_daily_aggs(
+    symbol: str,
+    start: str,
+    end: str,
+    adjusted: bool,
+    timeout_s: Optional[float],
+) -> List[Dict[str, Any]]:
     api_key = _get_key()
 
-    url = f"{BASE}/v2/aggs/ticker/{symbol.upper()}/range/1/day/{start}/{end}"
+    url = f"{base_url()}/v2/aggs/ticker/{symbol}/range/1/day/{start}/{end}"
     params = {
         "adjusted": "true" if adjusted else "false",
         "sort": "asc",
@@ -34,11 +55,7 @@ async def fetch_daily_aggs(
         "apiKey": api_key,
     }
 
-    async with httpx.AsyncClient(timeout=timeout_s) as client:
-        resp = await client.get(url, params=params)
-
-    if resp.status_code != 200:
-        raise RuntimeError(f"Polygon error {resp.status_code}: {resp.text[:200]}")
+    resp = await polygon_get(url, params, timeout_s=timeout_s)
 
     data = resp.json()
     return data.get("results", [])
@@ -0,0 +1,358 @@
+# app/services/polygon_client.py
+"""
+One pooled httpx.AsyncClient shared by every Polygon call.
+
+The FastAPI app opens it in its lifespan hook (see app/main.py); scripts
+wrap their run in `async with polygon_session():`. If nothing opened it,
+`get_client()` lazily creates one so ad-hoc callers still work.
+
+Tuning (env, all optional):
+  POLYGON_BASE_URL             API root (default https://api.polygon.io); point it at
+                               Scripts/fake_polygon.py to run offline
+  POLYGON_TIMEOUT_S            read/write/pool timeout (default 30)
+  POLYGON_CONNECT_TIMEOUT_S    connect timeout (default 5)
+  POLYGON_MAX_CONNECTIONS      pool size (default 20)
+  POLYGON_MAX_KEEPALIVE        idle keep-alive connections (default 10)
+  POLYGON_KEEPALIVE_EXPIRY_S   idle connection lifetime (default 30)
+  POLYGON_HTTP2                "0" to force HTTP/1.1 (default: on if `h2` is installed)
+  POLYGON_MAX_CONCURRENCY      in-flight Polygon requests per process, all routes (default 10)
+
+Resilience (env, all optional):
+  POLYGON_RATE_PER_MIN         token-bucket rate shared by every caller (default 0 = unlimited)
+  POLYGON_RATE_BURST           bucket size (default: one minute's worth, min 1)
+  POLYGON_MAX_RETRIES          retries on 429 / 5xx / network errors (default 3)
+  POLYGON_BACKOFF_BASE_S       first backoff step, doubled per attempt, full jitter (default 0.5)
+  POLYGON_BACKOFF_MAX_S        backoff ceiling; Retry-After is honoured up to this (default 30)
+  POLYGON_BREAKER_THRESHOLD    consecutive failed calls before the circuit opens (default 5)
+  POLYGON_BREAKER_COOLDOWN_S   how long it stays open before one trial call (default 30)
+
+Recording (env, optional):
+  POLYGON_RECORD_DIR           save every 200 body under this dir, named by
+                               `fixture_name()`, for Scripts/fake_polygon.py to replay
+"""
+import asyncio
+import os
+import random
+import time
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+import httpx
+
+DEFAULT_BASE_URL = "https://api.polygon.io"
+
+
+class PolygonError(RuntimeError):
+    """Polygon answered with a non-200 (after retries) or could not be reached."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class PolygonUnavailable(PolygonError):
+    """Circuit is open: we are not calling Polygon right now."""
+
+    def __init__(self, retry_in: float):
+        super().__init__(f"Polygon unavailable (circuit open, retry in {retry_in:.0f}s)")
+        self.retry_in = retry_in
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def base_url() -> str:
+    return (os.getenv("POLYGON_BASE_URL") or DEFAULT_BASE_URL).rstrip("/")
+
+
+def _http2_enabled() -> bool:
+    if os.getenv("POLYGON_HTTP2", "1").strip().lower() in ("0", "false", "no"):
+        return False
+    try:
+        import h2  # noqa: F401  (httpx needs it for http2=True)
+    except ImportError:
+        return False
+    return True
+
+
+_client: Optional[httpx.AsyncClient] = None
+_upstream: Optional[asyncio.Semaphore] = None
+_bucket: Optional["TokenBucket"] = None
+
+
+def build_client() -> httpx.AsyncClient:
+    timeout_s = _env_float("POLYGON_TIMEOUT_S", 30.0)
+    timeout = httpx.Timeout(
+        timeout_s,
+        connect=_env_float("POLYGON_CONNECT_TIMEOUT_S", 5.0),
+    )
+    limits = httpx.Limits(
+        max_connections=_env_int("POLYGON_MAX_CONNECTIONS", 20),
+        max_keepalive_connections=_env_int("POLYGON_MAX_KEEPALIVE", 10),
+        keepalive_expiry=_env_float("POLYGON_KEEPALIVE_EXPIRY_S", 30.0),
+    )
+    return httpx.AsyncClient(timeout=timeout, limits=limits, http2=_http2_enabled())
+
+
+async def start_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = build_client()
+    return _client
+
+
+async def close_client() -> None:
+    global _client, _upstream, _bucket
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+    # asyncio primitives belong to the loop that is going away
+    _upstream = None
+    _bucket = None
+
+
+def upstream_limit() -> asyncio.Semaphore:
+    """Process-wide cap on concurrent Polygon requests, shared by every caller."""
+    global _upstream
+    if _upstream is None:
+        _upstream = asyncio.Semaphore(max(1, _env_int("POLYGON_MAX_CONCURRENCY", 10)))
+    return _upstream
+
+
+def get_client() -> httpx.AsyncClient:
+    """Return the shared client, creating it on first use."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = build_client()
+    return _client
+
+
+@asynccontextmanager
+async def polygon_session():
+    """Open the shared client for the duration of a script / app run."""
+    await start_client()
+    try:
+        yield get_client()
+    finally:
+        await close_client()
+
+
+# ---------- Rate limiting ----------
+
+class TokenBucket:
+    """Async token bucket: `rate` tokens/second, up to `capacity` banked."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def rate_limiter() -> Optional[TokenBucket]:
+    """Shared bucket, or None when POLYGON_RATE_PER_MIN is unset/0."""
+    global _bucket
+    per_min = _env_float("POLYGON_RATE_PER_MIN", 0.0)
+    if per_min <= 0:
+        return None
+    if _bucket is None:
+        burst = _env_float("POLYGON_RATE_BURST", per_min)
+        _bucket = TokenBucket(rate=per_min / 60.0, capacity=max(1.0, burst))
+    return _bucket
+
+
+# ---------- Circuit breaker ----------
+
+class CircuitBreaker:
+    """
+    closed -> (threshold consecutive failures) -> open -> (cooldown) -> half-open.
+    Half-open lets a single trial call through; success closes, failure re-opens.
+    Only the call that got the trial (before_call() returned True) releases it.
+    """
+
+    def __init__(self, threshold: int, cooldown_s: float):
+        self.threshold = threshold
+        self.cooldown_s = cooldown_s
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_in_flight = False
+
+    def retry_in(self) -> float:
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.opened_at + self.cooldown_s - time.monotonic())
+
+    def before_call(self) -> bool:
+        """Raise PolygonUnavailable while open; True if this call is the half-open trial."""
+        if self.opened_at is None:
+            return False
+        if self.retry_in() > 0 or self.trial_in_flight:
+            raise PolygonUnavailable(max(self.retry_in(), 1.0))
+        self.trial_in_flight = True
+        return True
+
+    def end_trial(self, trial: bool) -> None:
+        if trial:
+            self.trial_in_flight = False
+
+    def record_success(self, trial: bool = False) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self.end_trial(trial)
+
+    def record_failure(self, trial: bool = False) -> None:
+        self.failures += 1
+        self.end_trial(trial)
+        # the cooldown restarts only on opening or a failed trial; calls that
+        # were already in flight when it opened must not keep pushing it back
+        if trial or (self.opened_at is None and self.failures >= self.threshold):
+            self.opened_at = time.monotonic()
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None and self.retry_in() > 0
+
+
+breaker = CircuitBreaker(
+    threshold=max(1, _env_int("POLYGON_BREAKER_THRESHOLD", 5)),
+    cooldown_s=_env_float("POLYGON_BREAKER_COOLDOWN_S", 30.0),
+)
+
+
+# ---------- Fixtures ----------
+
+def fixture_name(path: str, params: Dict[str, Any]) -> str:
+    """
+    File name a response is recorded / replayed under, e.g.
+    v2__aggs__grouped__locale__us__market__stocks__2024-03-01.json.
+    Only `adjusted` is part of the name; the api key and paging params are not.
+    """
+    name = path.strip("/").replace("/", "__")
+    if str(params.get("adjusted", "true")).lower() == "false":
+        name += "__unadjusted"
+    return name + ".json"
+
+
+def _record(url: str, params: Dict[str, Any], resp: httpx.Response) -> None:
+    root = os.getenv("POLYGON_RECORD_DIR")
+    if not root:
+        return
+    try:
+        os.makedirs(root, exist_ok=True)
+        with open(os.path.join(root, fixture_name(resp.request.url.path, params)), "wb") as fh:
+            fh.write(resp.content)
+    except OSError as e:
+        print("Polygon fixture not recorded:", e)
+
+
+# ---------- Requests ----------
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+def _retry_after_s(resp: httpx.Response) -> Optional[float]:
+    raw = resp.headers.get("Retry-After")
+    if not raw:
+        return None
+    try:
+        return max(0.0, float(raw))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(raw).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _backoff_s(attempt: int, retry_after: Optional[float]) -> float:
+    cap = _env_float("POLYGON_BACKOFF_MAX_S", 30.0)
+    base = _env_float("POLYGON_BACKOFF_BASE_S", 0.5)
+    jitter = random.uniform(0, min(cap, base * (2 ** attempt)))
+    if retry_after is not None:
+        return min(cap, retry_after) + jitter * 0.1
+    return jitter
+
+
+async def _send(url: str, params: Dict[str, Any], timeout_s: Optional[float]) -> httpx.Response:
+    bucket = rate_limiter()
+    if bucket is not None:
+        await bucket.acquire()
+    client = get_client()
+    async with upstream_limit():
+        if timeout_s is None:
+            return await client.get(url, params=params)
+        return await client.get(url, params=params, timeout=timeout_s)
+
+
+async def polygon_get(
+    url: str,
+    params: Dict[str, Any],
+    timeout_s: Optional[float] = None,
+) -> httpx.Response:
+    """
+    GET through the shared pool and return the 200 response.
+
+    429/5xx and network errors are retried with jittered exponential backoff
+    (honouring Retry-After). Anything else non-200, or running out of retries,
+    raises PolygonError; an open circuit raises PolygonUnavailable right away.
+    `timeout_s` overrides the default per call.
+    """
+    trial = breaker.before_call()
+    retries = max(0, _env_int("POLYGON_MAX_RETRIES", 3))
+
+    attempt = 0
+    try:
+        while True:
+            retry_after: Optional[float] = None
+            try:
+                resp = await _send(url, params, timeout_s)
+            except httpx.TransportError as e:
+                err = PolygonError(f"Polygon request failed: {e!r}")
+            else:
+                if resp.status_code == 200:
+                    breaker.record_success(trial)
+                    _record(url, params, resp)
+                    return resp
+                err = PolygonError(
+                    f"Polygon error {resp.status_code}: {resp.text[:200]}",
+                    status_code=resp.status_code,
+                )
+                if resp.status_code not in RETRY_STATUS:
+                    # Our request is wrong (bad ticker, auth, ...); upstream is fine.
+                    breaker.record_success(trial)
+                    raise err
+                retry_after = _retry_after_s(resp)
+
+            if attempt >= retries:
+                breaker.record_failure(trial)
+                raise err
+            await asyncio.sleep(_backoff_s(attempt, retry_after))
+            attempt += 1
+    finally:
+        # a cancelled half-open trial must not wedge the breaker; calls that
+        # started before it opened leave another call's trial alone
+        breaker.end_trial(trial)
@@ -1,8 +1,11 @@
 import os
-import httpx
 from typing import Any, Dict, List
 
-BASE = "https://api.polygon.io"
+from app.services.polygon_client import base_url, polygon_get
+from app.services.singleflight import SingleFlight
+
+# Concurrent requests for the same market day share one upstream call
+_flights = SingleFlight()
 
 def _get_key() -> str:
     key = os.getenv("POLYGON_API_KEY")
@@ -15,16 +18,20 @@ async def fetch_grouped_daily(date_str: str, adjusted: bool = True) -> List[Dict
     date_str: YYYY-MM-DD
     Returns Polygon grouped daily 'results' for US stocks for that date.
     Endpoint: /v2/aggs/grouped/locale/us/market/stocks/{date}
+    Coalesced like fetch_daily_aggs: the returned list is shared, don't mutate it.
     """
+    return await _flights.do(
+        (date_str, adjusted),
+        lambda: _fetch_grouped_daily(date_str, adjusted),
+    )
+
+async def _fetch_grouped_daily(date_str: str, adjusted: bool) -> List[Dict[str, Any]]:
     api_key = _get_key()
-    url = f"{BASE}/v2/aggs/grouped/locale/us/market/stocks/{date_str}"
+    url = f"{base_url()}/v2/aggs/grouped/locale/us/market/stocks/{date_str}"
     params = {"adjusted": "true" if adjusted else "false", "apiKey": api_key}
 
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        resp = await client.get(url, params=params)
-
-    if resp.status_code != 200:
-        raise RuntimeError(f"Polygon error {resp.status_code}: {resp.text[:200]}")
+    # Whole-market payloads are big; give them more time than the pool default.
+    resp = await polygon_get(url, params, timeout_s=60.0)
 
     data = resp.json()
     return data.get("results", []) or []
@@ -0,0 +1,79 @@
+# app/services/refdata.py
+"""
+Set-based get-or-create for the reference tables the upload routes key on:
+
+    sec_ids, created = security_ids(db, {"AAPL", "MSFT"})   # ticker -> securities.id
+    acct_ids, created = account_ids(db, {"Roth IRA"})        # name   -> accounts.id
+
+Each call is at most two statements however many names it gets: one
+`INSERT ... SELECT unnest ... ON CONFLICT DO NOTHING` for the whole set, then
+one lookup that returns the full map. Concurrent uploads creating the same
+name both end up with the one row (the loser's insert is a no-op).
+
+Ids never change once committed, so the maps are cached in-process across
+requests. Names this call had to insert are left out of the cache (the
+caller's transaction may still roll back); the insert drops their key from
+the cache and the next lookup after commit picks them up. `forget()` clears
+everything, for code that deletes securities or accounts.
+"""
+import threading
+from typing import Dict, Iterable, Tuple
+
+from sqlalchemy import text
+
+INSERT_SECURITIES = text("""
+    INSERT INTO securities (ticker, name)
+    SELECT t, NULL FROM unnest(CAST(:names AS text[])) AS t
+    ON CONFLICT (ticker) DO NOTHING
+    RETURNING ticker
+""")
+SELECT_SECURITIES = text("SELECT ticker, id FROM securities WHERE ticker = ANY(:names)")
+
+# needs the unique index from migration 009
+INSERT_ACCOUNTS = text("""
+    INSERT INTO accounts (name)
+    SELECT n FROM unnest(CAST(:names AS text[])) AS n
+    ON CONFLICT (name) DO NOTHING
+    RETURNING name
+""")
+SELECT_ACCOUNTS = text("SELECT name, id FROM accounts WHERE name = ANY(:names)")
+
+_lock = threading.Lock()
+_securities: Dict[str, object] = {}
+_accounts: Dict[str, object] = {}
+
+
+def _get_or_create(db, names: Iterable[str], insert, select, cache: Dict[str, object]) -> Tuple[Dict[str, object], int]:
+    wanted = {n for n in names if n}
+    with _lock:
+        ids = {n: cache[n] for n in wanted if n in cache}
+    missing = sorted(wanted - ids.keys())
+    if not missing:
+        return ids, 0
+
+    created = {r[0] for r in db.execute(insert, {"names": missing})}
+    found = {r[0]: r[1] for r in db.execute(select, {"names": missing})}
+    ids.update(found)
+    with _lock:
+        for n, i in found.items():
+            if n in created:
+                cache.pop(n, None)
+            else:
+                cache[n] = i
+    return ids, len(created)
+
+
+def security_ids(db, tickers: Iterable[str]) -> Tuple[Dict[str, object], int]:
+    """({ticker: securities.id} for every ticker, number created)."""
+    return _get_or_create(db, tickers, INSERT_SECURITIES, SELECT_SECURITIES, _securities)
+
+
+def account_ids(db, names: Iterable[str]) -> Tuple[Dict[str, object], int]:
+    """({name: accounts.id} for every non-blank name, number created)."""
+    return _get_or_create(db, names, INSERT_ACCOUNTS, SELECT_ACCOUNTS, _accounts)
+
+
+def forget() -> None:
+    with _lock:
+        _securities.clear()
+        _accounts.clear()
@@ -0,0 +1,36 @@
+# app/services/singleflight.py
+"""
+In-process request coalescing.
+
+Concurrent callers asking for the same key await one shared task instead of
+each starting their own upstream call. The task runs shielded, so a caller
+that gets cancelled (client went away) does not cancel it for the others.
+Once it finishes the key is forgotten; this is not a cache.
+"""
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    def __init__(self) -> None:
+        self._inflight: Dict[Hashable, "asyncio.Task"] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        task = self._inflight.get(key)
+        if task is None or task.done():
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t, k=key: self._forget(k, t))
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: "asyncio.Task") -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # nobody may be left awaiting a failed task; mark its error as seen
+        if not task.cancelled():
+            task.exception()
+
+    def inflight(self) -> int:
+        return len(self._inflight)
@@ -0,0 +1,91 @@
+# app/services/trading_calendar.py
+"""
+NYSE trading sessions, from the precomputed table in trading_calendar_data.py
+(regenerate it with `python -m Scripts.gen_trading_calendar`).
+
+Used wherever we would otherwise ask Polygon about a day it has no bar for:
+backfill day lists, read-through gap detection, the bar store's coverage
+check, and timeframe windows counted in sessions.
+
+Outside FIRST_YEAR..LAST_YEAR every weekday counts as a session, which is
+what the code did before this table existed.
+"""
+from bisect import bisect_left, bisect_right
+from datetime import date, timedelta
+from typing import List, Optional
+
+from app.services.trading_calendar_data import EARLY_CLOSES, FIRST_YEAR, HOLIDAYS, LAST_YEAR
+
+_FIRST = date(FIRST_YEAR, 1, 1)
+_LAST = date(LAST_YEAR, 12, 31)
+
+
+def _build() -> List[date]:
+    out: List[date] = []
+    d = _FIRST
+    while d <= _LAST:
+        if d.weekday() < 5 and d not in HOLIDAYS:
+            out.append(d)
+        d += timedelta(days=1)
+    return out
+
+
+# every session in the table, ascending (~250 a year)
+_SESSIONS = _build()
+
+
+def is_session(d: date) -> bool:
+    return d.weekday() < 5 and d not in HOLIDAYS
+
+
+def early_close(d: date) -> Optional[str]:
+    """New York close time ("13:00") if `d` is a shortened session, else None."""
+    return EARLY_CLOSES.get(d)
+
+
+def sessions(start: date, end: date) -> List[date]:
+    """Trading sessions in [start, end], ascending."""
+    if end < start:
+        return []
+    if _FIRST <= start and end <= _LAST:
+        return _SESSIONS[bisect_left(_SESSIONS, start):bisect_right(_SESSIONS, end)]
+    out: List[date] = []
+    d = start
+    while d <= end:
+        if is_session(d):
+            out.append(d)
+        d += timedelta(days=1)
+    return out
+
+
+def has_session(start: date, end: date) -> bool:
+    """True if [start, end] contains at least one trading session."""
+    if end < start:
+        return False
+    if _FIRST <= start and end <= _LAST:
+        return bisect_left(_SESSIONS, start) < bisect_right(_SESSIONS, end)
+    return bool(sessions(start, end))
+
+
+def previous_session(d: date) -> date:
+    """Last session strictly before `d`."""
+    d -= timedelta(days=1)
+    while not is_session(d):
+        d -= timedelta(days=1)
+    return d
+
+
+def sessions_back(end: date, n: int) -> date:
+    """
+    First day of the window made of the last `n` sessions up to and
+    including `end` (or the last session before it, if `end` is closed).
+    """
+    n = max(1, n)
+    if _FIRST <= end <= _LAST:
+        i = bisect_right(_SESSIONS, end)
+        if i - n >= 0:
+            return _SESSIONS[i - n]
+    d = end if is_session(end) else previous_session(end)
+    for _ in range(n - 1):
+        d = previous_session(d)
+    return d
@@ -0,0 +1,437 @@
+# app/services/trading_calendar_data.py
+"""
+NYSE holidays and early closes. GENERATED by Scripts/gen_trading_calendar.py,
+do not edit by hand; see app/services/trading_calendar.py for the API.
+"""
+from datetime import date
+
+FIRST_YEAR = 2000
+LAST_YEAR = 2035
+
+# weekday closures only; weekends are never sessions
+HOLIDAYS = {
+    date(2000, 1, 17): "Martin Luther King Jr. Day",
+    date(2000, 2, 21): "Washington's Birthday",
+    date(2000, 4, 21): "Good Friday",
+    date(2000, 5, 29): "Memorial Day",
+    date(2000, 7, 4): "Independence Day",
+    date(2000, 9, 4): "Labor Day",
+    date(2000, 11, 23): "Thanksgiving Day",
+    date(2000, 12, 25): "Christmas Day",
+    date(2001, 1, 1): "New Year's Day",
+    date(2001, 1, 15): "Martin Luther King Jr. Day",
+    date(2001, 2, 19): "Washington's Birthday",
+    date(2001, 4, 13): "Good Friday",
+    date(2001, 5, 28): "Memorial Day",
+    date(2001, 7, 4): "Independence Day",
+    date(2001, 9, 3): "Labor Day",
+    date(2001, 9, 11): "September 11",
+    date(2001, 9, 12): "September 11",
+    date(2001, 9, 13): "September 11",
+    date(2001, 9, 14): "September 11",
+    date(2001, 11, 22): "Thanksgiving Day",
+    date(2001, 12, 25): "Christmas Day",
+    date(2002, 1, 1): "New Year's Day",
+    date(2002, 1, 21): "Martin Luther King Jr. Day",
+    date(2002, 2, 18): "Washington's Birthday",
+    date(2002, 3, 29): "Good Friday",
+    date(2002, 5, 27): "Memorial Day",
+    date(2002, 7, 4): "Independence Day",
+    date(2002, 9, 2): "Labor Day",
+    date(2002, 11, 28): "Thanksgiving Day",
+    date(2002, 12, 25): "Christmas Day",
+    date(2003, 1, 1): "New Year's Day",
+    date(2003, 1, 20): "Martin Luther King Jr. Day",
+    date(2003, 2, 17): "Washington's Birthday",
+    date(2003, 4, 18): "Good Friday",
+    date(2003, 5, 26): "Memorial Day",
+    date(2003, 7, 4): "Independence Day",
+    date(2003, 9, 1): "Labor Day",
+    date(2003, 11, 27): "Thanksgiving Day",
+    date(2003, 12, 25): "Christmas Day",
+    date(2004, 1, 1): "New Year's Day",
+    date(2004, 1, 19): "Martin Luther King Jr. Day",
+    date(2004, 2, 16): "Washington's Birthday",
+    date(2004, 4, 9): "Good Friday",
+    date(2004, 5, 31): "Memorial Day",
+    date(2004, 6, 11): "Reagan day of mourning",
+    date(2004, 7, 5): "Independence Day",
+    date(2004, 9, 6): "Labor Day",
+    date(2004, 11, 25): "Thanksgiving Day",
+    date(2004, 12, 24): "Christmas Day",
+    date(2005, 1, 17): "Martin Luther King Jr. Day",
+    date(2005, 2, 21): "Washington's Birthday",
+    date(2005, 3, 25): "Good Friday",
+    date(2005, 5, 30): "Memorial Day",
+    date(2005, 7, 4): "Independence Day",
+    date(2005, 9, 5): "Labor Day",
+    date(2005, 11, 24): "Thanksgiving Day",
+    date(2005, 12, 26): "Christmas Day",
+    date(2006, 1, 2): "New Year's Day",
+    date(2006, 1, 16): "Martin Luther King Jr. Day",
+    date(2006, 2, 20): "Washington's Birthday",
+    date(2006, 4, 14): "Good Friday",
+    date(2006, 5, 29): "Memorial Day",
+    date(2006, 7, 4): "Independence Day",
+    date(2006, 9, 4): "Labor Day",
+    date(2006, 11, 23): "Thanksgiving Day",
+    date(2006, 12, 25): "Christmas Day",
+    date(2007, 1, 1): "New Year's Day",
+    date(2007, 1, 2): "Ford day of mourning",
+    date(2007, 1, 15): "Martin Luther King Jr. Day",
+    date(2007, 2, 19): "Washington's Birthday",
+    date(2007, 4, 6): "Good Friday",
+    date(2007, 5, 28): "Memorial Day",
+    date(2007, 7, 4): "Independence Day",
+    date(2007, 9, 3): "Labor Day",
+    date(2007, 11, 22): "Thanksgiving Day",
+    date(2007, 12, 25): "Christmas Day",
+    date(2008, 1, 1): "New Year's Day",
+    date(2008, 1, 21): "Martin Luther King Jr. Day",
+    date(2008, 2, 18): "Washington's Birthday",
+    date(2008, 3, 21): "Good Friday",
+    date(2008, 5, 26): "Memorial Day",
+    date(2008, 7, 4): "Independence Day",
+    date(2008, 9, 1): "Labor Day",
+    date(2008, 11, 27): "Thanksgiving Day",
+    date(2008, 12, 25): "Christmas Day",
+    date(2009, 1, 1): "New Year's Day",
+    date(2009, 1, 19): "Martin Luther King Jr. Day",
+    date(2009, 2, 16): "Washington's Birthday",
+    date(2009, 4, 10): "Good Friday",
+    date(2009, 5, 25): "Memorial Day",
+    date(2009, 7, 3): "Independence Day",
+    date(2009, 9, 7): "Labor Day",
+    date(2009, 11, 26): "Thanksgiving Day",
+    date(2009, 12, 25): "Christmas Day",
+    date(2010, 1, 1): "New Year's Day",
+    date(2010, 1, 18): "Martin Luther King Jr. Day",
+    date(2010, 2, 15): "Washington's Birthday",
+    date(2010, 4, 2): "Good Friday",
+    date(2010, 5, 31): "Memorial Day",
+    date(2010, 7, 5): "Independence Day",
+    date(2010, 9, 6): "Labor Day",
+    date(2010, 11, 25): "Thanksgiving Day",
+    date(2010, 12, 24): "Christmas Day",
+    date(2011, 1, 17): "Martin Luther King Jr. Day",
+    date(2011, 2, 21): "Washington's Birthday",
+    date(2011, 4, 22): "Good Friday",
+    date(2011, 5, 30): "Memorial Day",
+    date(2011, 7, 4): "Independence Day",
+    date(2011, 9, 5): "Labor Day",
+    date(2011, 11, 24): "Thanksgiving Day",
+    date(2011, 12, 26): "Christmas Day",
+    date(2012, 1, 2): "New Year's Day",
+    date(2012, 1, 16): "Martin Luther King Jr. Day",
+    date(2012, 2, 20): "Washington's Birthday",
+    date(2012, 4, 6): "Good Friday",
+    date(2012, 5, 28): "Memorial Day",
+    date(2012, 7, 4): "Independence Day",
+    date(2012, 9, 3): "Labor Day",
+    date(2012, 10, 29): "Hurricane Sandy",
+    date(2012, 10, 30): "Hurricane Sandy",
+    date(2012, 11, 22): "Thanksgiving Day",
+    date(2012, 12, 25): "Christmas Day",
+    date(2013, 1, 1): "New Year's Day",
+    date(2013, 1, 21): "Martin Luther King Jr. Day",
+    date(2013, 2, 18): "Washington's Birthday",
+    date(2013, 3, 29): "Good Friday",
+    date(2013, 5, 27): "Memorial Day",
+    date(2013, 7, 4): "Independence Day",
+    date(2013, 9, 2): "Labor Day",
+    date(2013, 11, 28): "Thanksgiving Day",
+    date(2013, 12, 25): "Christmas Day",
+    date(2014, 1, 1): "New Year's Day",
+    date(2014, 1, 20): "Martin Luther King Jr. Day",
+    date(2014, 2, 17): "Washington's Birthday",
+    date(2014, 4, 18): "Good Friday",
+    date(2014, 5, 26): "Memorial Day",
+    date(2014, 7, 4): "Independence Day",
+    date(2014, 9, 1): "Labor Day",
+    date(2014, 11, 27): "Thanksgiving Day",
+    date(2014, 12, 25): "Christmas Day",
+    date(2015, 1, 1): "New Year's Day",
+    date(2015, 1, 19): "Martin Luther King Jr. Day",
+    date(2015, 2, 16): "Washington's Birthday",
+    date(2015, 4, 3): "Good Friday",
+    date(2015, 5, 25): "Memorial Day",
+    date(2015, 7, 3): "Independence Day",
+    date(2015, 9, 7): "Labor Day",
+    date(2015, 11, 26): "Thanksgiving Day",
+    date(2015, 12, 25): "Christmas Day",
+    date(2016, 1, 1): "New Year's Day",
+    date(2016, 1, 18): "Martin Luther King Jr. Day",
+    date(2016, 2, 15): "Washington's Birthday",
+    date(2016, 3, 25): "Good Friday",
+    date(2016, 5, 30): "Memorial Day",
+    date(2016, 7, 4): "Independence Day",
+    date(2016, 9, 5): "Labor Day",
+    date(2016, 11, 24): "Thanksgiving Day",
+    date(2016, 12, 26): "Christmas Day",
+    date(2017, 1, 2): "New Year's Day",
+    date(2017, 1, 16): "Martin Luther King Jr. Day",
+    date(2017, 2, 20): "Washington's Birthday",
+    date(2017, 4, 14): "Good Friday",
+    date(2017, 5, 29): "Memorial Day",
+    date(2017, 7, 4): "Independence Day",
+    date(2017, 9, 4): "Labor Day",
+    date(2017, 11, 23): "Thanksgiving Day",
+    date(2017, 12, 25): "Christmas Day",
+    date(2018, 1, 1): "New Year's Day",
+    date(2018, 1, 15): "Martin Luther King Jr. Day",
+    date(2018, 2, 19): "Washington's Birthday",
+    date(2018, 3, 30): "Good Friday",
+    date(2018, 5, 28): "Memorial Day",
+    date(2018, 7, 4): "Independence Day",
+    date(2018, 9, 3): "Labor Day",
+    date(2018, 11, 22): "Thanksgiving Day",
+    date(2018, 12, 5): "G.H.W. Bush day of mourning",
+    date(2018, 12, 25): "Christmas Day",
+    date(2019, 1, 1): "New Year's Day",
+    date(2019, 1, 21): "Martin Luther King Jr. Day",
+    date(2019, 2, 18): "Washington's Birthday",
+    date(2019, 4, 19): "Good Friday",
+    date(2019, 5, 27): "Memorial Day",
+    date(2019, 7, 4): "Independence Day",
+    date(2019, 9, 2): "Labor Day",
+    date(2019, 11, 28): "Thanksgiving Day",
+    date(2019, 12, 25): "Christmas Day",
+    date(2020, 1, 1): "New Year's Day",
+    date(2020, 1, 20): "Martin Luther King Jr. Day",
+    date(2020, 2, 17): "Washington's Birthday",
+    date(2020, 4, 10): "Good Friday",
+    date(2020, 5, 25): "Memorial Day",
+    date(2020, 7, 3): "Independence Day",
+    date(2020, 9, 7): "Labor Day",
+    date(2020, 11, 26): "Thanksgiving Day",
+    date(2020, 12, 25): "Christmas Day",
+    date(2021, 1, 1): "New Year's Day",
+    date(2021, 1, 18): "Martin Luther King Jr. Day",
+    date(2021, 2, 15): "Washington's Birthday",
+    date(2021, 4, 2): "Good Friday",
+    date(2021, 5, 31): "Memorial Day",
+    date(2021, 7, 5): "Independence Day",
+    date(2021, 9, 6): "Labor Day",
+    date(2021, 11, 25): "Thanksgiving Day",
+    date(2021, 12, 24): "Christmas Day",
+    date(2022, 1, 17): "Martin Luther King Jr. Day",
+    date(2022, 2, 21): "Washington's Birthday",
+    date(2022, 4, 15): "Good Friday",
+    date(2022, 5, 30): "Memorial Day",
+    date(2022, 6, 20): "Juneteenth",
+    date(2022, 7, 4): "Independence Day",
+    date(2022, 9, 5): "Labor Day",
+    date(2022, 11, 24): "Thanksgiving Day",
+    date(2022, 12, 26): "Christmas Day",
+    date(2023, 1, 2): "New Year's Day",
+    date(2023, 1, 16): "Martin Luther King Jr. Day",
+    date(2023, 2, 20): "Washington's Birthday",
+    date(2023, 4, 7): "Good Friday",
+    date(2023, 5, 29): "Memorial Day",
+    date(2023, 6, 19): "Juneteenth",
+    date(2023, 7, 4): "Independence Day",
+    date(2023, 9, 4): "Labor Day",
+    date(2023, 11, 23): "Thanksgiving Day",
+    date(2023, 12, 25): "Christmas Day",
+    date(2024, 1, 1): "New Year's Day",
+    date(2024, 1, 15): "Martin Luther King Jr. Day",
+    date(2024, 2, 19): "Washington's Birthday",
+    date(2024, 3, 29): "Good Friday",
+    date(2024, 5, 27): "Memorial Day",
+    date(2024, 6, 19): "Juneteenth",
+    date(2024, 7, 4): "Independence Day",
+    date(2024, 9, 2): "Labor Day",
+    date(2024, 11, 28): "Thanksgiving Day",
+    date(2024, 12, 25): "Christmas Day",
+    date(2025, 1, 1): "New Year's Day",
+    date(2025, 1, 9): "Carter day of mourning",
+    date(2025, 1, 20): "Martin Luther King Jr. Day",
+    date(2025, 2, 17): "Washington's Birthday",
+    date(2025, 4, 18): "Good Friday",
+    date(2025, 5, 26): "Memorial Day",
+    date(2025, 6, 19): "Juneteenth",
+    date(2025, 7, 4): "Independence Day",
+    date(2025, 9, 1): "Labor Day",
+    date(2025, 11, 27): "Thanksgiving Day",
+    date(2025, 12, 25): "Christmas Day",
+    date(2026, 1, 1): "New Year's Day",
+    date(2026, 1, 19): "Martin Luther King Jr. Day",
+    date(2026, 2, 16): "Washington's Birthday",
+    date(2026, 4, 3): "Good Friday",
+    date(2026, 5, 25): "Memorial Day",
+    date(2026, 6, 19): "Juneteenth",
+    date(2026, 7, 3): "Independence Day",
+    date(2026, 9, 7): "Labor Day",
+    date(2026, 11, 26): "Thanksgiving Day",
+    date(2026, 12, 25): "Christmas Day",
+    date(2027, 1, 1): "New Year's Day",
+    date(2027, 1, 18): "Martin Luther King Jr. Day",
+    date(2027, 2, 15): "Washington's Birthday",
+    date(2027, 3, 26): "Good Friday",
+    date(2027, 5, 31): "Memorial Day",
+    date(2027, 6, 18): "Juneteenth",
+    date(2027, 7, 5): "Independence Day",
+    date(2027, 9, 6): "Labor Day",
+    date(2027, 11, 25): "Thanksgiving Day",
+    date(2027, 12, 24): "Christmas Day",
+    date(2028, 1, 17): "Martin Luther King Jr. Day",
+    date(2028, 2, 21): "Washington's Birthday",
+    date(2028, 4, 14): "Good Friday",
+    date(2028, 5, 29): "Memorial Day",
+    date(2028, 6, 19): "Juneteenth",
+    date(2028, 7, 4): "Independence Day",
+    date(2028, 9, 4): "Labor Day",
+    date(2028, 11, 23): "Thanksgiving Day",
+    date(2028, 12, 25): "Christmas Day",
+    date(2029, 1, 1): "New Year's Day",
+    date(2029, 1, 15): "Martin Luther King Jr. Day",
+    date(2029, 2, 19): "Washington's Birthday",
+    date(2029, 3, 30): "Good Friday",
+    date(2029, 5, 28): "Memorial Day",
+    date(2029, 6, 19): "Juneteenth",
+    date(2029, 7, 4): "Independence Day",
+    date(2029, 9, 3): "Labor Day",
+    date(2029, 11, 22): "Thanksgiving Day",
+    date(2029, 12, 25): "Christmas Day",
+    date(2030, 1, 1): "New Year's Day",
+    date(2030, 1, 21): "Martin Luther King Jr. Day",
+    date(2030, 2, 18): "Washington's Birthday",
+    date(2030, 4, 19): "Good Friday",
+    date(2030, 5, 27): "Memorial Day",
+    date(2030, 6, 19): "Juneteenth",
+    date(2030, 7, 4): "Independence Day",
+    date(2030, 9, 2): "Labor Day",
+    date(2030, 11, 28): "Thanksgiving Day",
+    date(2030, 12, 25): "Christmas Day",
+    date(2031, 1, 1): "New Year's Day",
+    date(2031, 1, 20): "Martin Luther King Jr. Day",
+    date(2031, 2, 17): "Washington's Birthday",
+    date(2031, 4, 11): "Good Friday",
+    date(2031, 5, 26): "Memorial Day",
+    date(2031, 6, 19): "Juneteenth",
+    date(2031, 7, 4): "Independence Day",
+    date(2031, 9, 1): "Labor Day",
+    date(2031, 11, 27): "Thanksgiving Day",
+    date(2031, 12, 25): "Christmas Day",
+    date(2032, 1, 1): "New Year's Day",
+    date(2032, 1, 19): "Martin Luther King Jr. Day",
+    date(2032, 2, 16): "Washington's Birthday",
+    date(2032, 3, 26): "Good Friday",
+    date(2032, 5, 31): "Memorial Day",
+    date(2032, 6, 18): "Juneteenth",
+    date(2032, 7, 5): "Independence Day",
+    date(2032, 9, 6): "Labor Day",
+    date(2032, 11, 25): "Thanksgiving Day",
+    date(2032, 12, 24): "Christmas Day",
+    date(2033, 1, 17): "Martin Luther King Jr. Day",
+    date(2033, 2, 21): "Washington's Birthday",
+    date(2033, 4, 15): "Good Friday",
+    date(2033, 5, 30): "Memorial Day",
+    date(2033, 6, 20): "Juneteenth",
+    date(2033, 7, 4): "Independence Day",
+    date(2033, 9, 5): "Labor Day",
+    date(2033, 11, 24): "Thanksgiving Day",
+    date(2033, 12, 26): "Christmas Day",
+    date(2034, 1, 2): "New Year's Day",
+    date(2034, 1, 16): "Martin Luther King Jr. Day",
+    date(2034, 2, 20): "Washington's Birthday",
+    date(2034, 4, 7): "Good Friday",
+    date(2034, 5, 29): "Memorial Day",
+    date(2034, 6, 19): "Juneteenth",
+    date(2034, 7, 4): "Independence Day",
+    date(2034, 9, 4): "Labor Day",
+    date(2034, 11, 23): "Thanksgiving Day",
+    date(2034, 12, 25): "Christmas Day",
+    date(2035, 1, 1): "New Year's Day",
+    date(2035, 1, 15): "Martin Luther King Jr. Day",
+    date(2035, 2, 19): "Washington's Birthday",
+    date(2035, 3, 23): "Good Friday",
+    date(2035, 5, 28): "Memorial Day",
+    date(2035, 6, 19): "Juneteenth",
+    date(2035, 7, 4): "Independence Day",
+    date(2035, 9, 3): "Labor Day",
+    date(2035, 11, 22): "Thanksgiving Day",
+    date(2035, 12, 25): "Christmas Day",
+}
+
+# local (New York) close time on shortened sessions
+EARLY_CLOSES = {
+    date(2000, 7, 3): "13:00",
+    date(2000, 11, 24): "13:00",
+    date(2001, 7, 3): "13:00",
+    date(2001, 11, 23): "13:00",
+    date(2001, 12, 24): "13:00",
+    date(2002, 7, 3): "13:00",
+    date(2002, 11, 29): "13:00",
+    date(2002, 12, 24): "13:00",
+    date(2003, 7, 3): "13:00",
+    date(2003, 11, 28): "13:00",
+    date(2003, 12, 24): "13:00",
+    date(2004, 11, 26): "13:00",
+    date(2005, 11, 25): "13:00",
+    date(2006, 7, 3): "13:00",
+    date(2006, 11, 24): "13:00",
+    date(2007, 7, 3): "13:00",
+    date(2007, 11, 23): "13:00",
+    date(2007, 12, 24): "13:00",
+    date(2008, 7, 3): "13:00",
+    date(2008, 11, 28): "13:00",
+    date(2008, 12, 24): "13:00",
+    date(2009, 11, 27): "13:00",
+    date(2009, 12, 24): "13:00",
+    date(2010, 11, 26): "13:00",
+    date(2011, 11, 25): "13:00",
+    date(2012, 7, 3): "13:00",
+    date(2012, 11, 23): "13:00",
+    date(2012, 12, 24): "13:00",
+    date(2013, 7, 3): "13:00",
+    date(2013, 11, 29): "13:00",
+    date(2013, 12, 24): "13:00",
+    date(2014, 7, 3): "13:00",
+    date(2014, 11, 28): "13:00",
+    date(2014, 12, 24): "13:00",
+    date(2015, 11, 27): "13:00",
+    date(2015, 12, 24): "13:00",
+    date(2016, 11, 25): "13:00",
+    date(2017, 7, 3): "13:00",
+    date(2017, 11, 24): "13:00",
+    date(2018, 7, 3): "13:00",
+    date(2018, 11, 23): "13:00",
+    date(2018, 12, 24): "13:00",
+    date(2019, 7, 3): "13:00",
+    date(2019, 11, 29): "13:00",
+    date(2019, 12, 24): "13:00",
+    date(2020, 11, 27): "13:00",
+    date(2020, 12, 24): "13:00",
+    date(2021, 11, 26): "13:00",
+    date(2022, 11, 25): "13:00",
+    date(2023, 7, 3): "13:00",
+    date(2023, 11, 24): "13:00",
+    date(2024, 7, 3): "13:00",
+    date(2024, 11, 29): "13:00",
+    date(2024, 12, 24): "13:00",
+    date(2025, 7, 3): "13:00",
+    date(2025, 11, 28): "13:00",
+    date(2025, 12, 24): "13:00",
+    date(2026, 11, 27): "13:00",
+    date(2026, 12, 24): "13:00",
+    date(2027, 11, 26): "13:00",
+    date(2028, 7, 3): "13:00",
+    date(2028, 11, 24): "13:00",
+    date(2029, 7, 3): "13:00",
+    date(2029, 11, 23): "13:00",
+    date(2029, 12, 24): "13:00",
+    date(2030, 7, 3): "13:00",
+    date(2030, 11, 29): "13:00",
+    date(2030, 12, 24): "13:00",
+    date(2031, 7, 3): "13:00",
+    date(2031, 11, 28): "13:00",
+    date(2031, 12, 24): "13:00",
+    date(2032, 11, 26): "13:00",
+    date(2033, 11, 25): "13:00",
+    date(2034, 7, 3): "13:00",
+    date(2034, 11, 24): "13:00",
+    date(2035, 7, 3): "13:00",
+    date(2035, 11, 23): "13:00",
+    date(2035, 12, 24): "13:00",
+}
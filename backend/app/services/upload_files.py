@@ -0,0 +1,94 @@
+# app/services/upload_files.py
+"""
+Content-hash bookkeeping for the upload routes (table: upload_files,
+migration 010).
+
+    digest, size = upload_stream.sha256(file.file)
+    prior = upload_files.claim(db, "positions", digest, snap)
+    if prior:                       # this exact file is already loaded
+        return already_ingested(prior)
+    ... replace the snapshot, load ...
+    upload_files.record(db, "positions", file.filename, digest, snap, size, rows, counts, t0)
+    db.commit()
+
+`claim` takes a transaction-scoped advisory lock on (kind, as_of), so two
+uploads of the same snapshot run one after the other and the second one
+sees the first one's row. Everything happens in the caller's transaction:
+a failed load leaves neither data nor an upload_files row behind.
+"""
+import json
+import time
+from datetime import date
+from typing import Any, Dict, Optional
+
+from sqlalchemy import text
+
+LOCK_SQL = text("SELECT pg_advisory_xact_lock(hashtext(:key))")
+
+FIND_SQL = text("""
+    SELECT id, filename, sha256, as_of, row_count, counts, duration_ms, ingested_at
+    FROM upload_files
+    WHERE kind = :kind
+      AND sha256 = :sha256
+      AND COALESCE(as_of, DATE '0001-01-01') = COALESCE(CAST(:as_of AS date), DATE '0001-01-01')
+""")
+
+FORGET_SQL = text("DELETE FROM upload_files WHERE kind = :kind AND as_of = :as_of")
+
+INSERT_SQL = text("""
+    INSERT INTO upload_files (kind, filename, sha256, as_of, byte_count, row_count, counts, duration_ms)
+    VALUES (:kind, :filename, :sha256, :as_of, :byte_count, :row_count, CAST(:counts AS jsonb), :duration_ms)
+    RETURNING id
+""")
+
+
+def claim(db, kind: str, sha256: str, as_of: Optional[date] = None) -> Optional[Dict[str, Any]]:
+    """
+    Lock the (kind, as_of) slot for this transaction and return the
+    upload_files row if this exact content is already loaded there.
+    """
+    key = f"upload_files:{kind}:{as_of.isoformat() if as_of else sha256}"
+    db.execute(LOCK_SQL, {"key": key})
+    row = db.execute(FIND_SQL, {"kind": kind, "sha256": sha256, "as_of": as_of}).mappings().first()
+    return dict(row) if row else None
+
+
+def forget(db, kind: str, as_of: date) -> None:
+    """Drop the bookkeeping for a snapshot that is about to be replaced."""
+    db.execute(FORGET_SQL, {"kind": kind, "as_of": as_of})
+
+
+def record(
+    db,
+    kind: str,
+    filename: Optional[str],
+    sha256: str,
+    as_of: Optional[date],
+    byte_count: int,
+    row_count: int,
+    counts: Dict[str, Any],
+    started: float,
+) -> int:
+    """Insert the upload_files row; `started` is a time.perf_counter() reading."""
+    return db.execute(INSERT_SQL, {
+        "kind": kind,
+        "filename": filename,
+        "sha256": sha256,
+        "as_of": as_of,
+        "byte_count": byte_count,
+        "row_count": row_count,
+        "counts": json.dumps(counts),
+        "duration_ms": int((time.perf_counter() - started) * 1000),
+    }).scalar_one()
+
+
+def already_ingested(prior: Dict[str, Any]) -> Dict[str, Any]:
+    """Response body for an identical re-upload."""
+    return {
+        "status": "already_ingested",
+        "upload_id": prior["id"],
+        "filename": prior["filename"],
+        "sha256": prior["sha256"],
+        "ingested_at": prior["ingested_at"].isoformat(),
+        **(prior["counts"] or {}),
+    }
@@ -0,0 +1,321 @@
+# app/services/upload_jobs.py
+"""
+Background processing for the upload routes (table: upload_jobs, migration 011).
+
+    job_id = await run_in_threadpool(upload_jobs.enqueue, "positions", file.file, file.filename, {...})
+    return JSONResponse({"job_id": job_id, ...}, status_code=202)
+
+    upload_jobs.register("positions", handler)   # handler(db, fileobj, job, progress) -> result dict
+
+The route copies the spooled upload to UPLOAD_SPOOL_DIR and queues a row;
+the request returns right away. Workers are asyncio tasks started from the
+app lifespan: each claims the oldest queued job (FOR UPDATE SKIP LOCKED, so
+several API processes can share the queue) and runs its handler in a
+thread with its own session. The handler owns its transaction; `progress`
+writes rows / bytes_done / skip_reasons on a separate short connection so
+the job status route (uploads.py, name "upload_job_status"; routes return it
+as `status_url`) can see them while the load is uncommitted.
+
+While a handler runs, its worker refreshes the job's heartbeat_at every
+UPLOAD_JOB_HEARTBEAT_S (migration 012). A 'running' job whose heartbeat is
+older than UPLOAD_JOB_STALE_S (its process died) is claimed again, up to
+UPLOAD_JOB_MAX_ATTEMPTS; a long ingest that is still alive is left alone. A handler that raises marks
+the job failed with the error and is not retried; the spooled file is kept
+for a look, and deleted once a job is done.
+
+Env:
+  UPLOAD_SPOOL_DIR          accepted files waiting for a worker   (default ./data/uploads)
+  UPLOAD_WORKERS            worker tasks per API process, 0 = enqueue only (default 2)
+  UPLOAD_JOB_POLL_S         idle poll interval                    (default 2)
+  UPLOAD_JOB_STALE_S        reclaim 'running' jobs with no heartbeat for this long (default 900)
+  UPLOAD_JOB_HEARTBEAT_S    heartbeat interval while a job runs   (default 30)
+  UPLOAD_JOB_MAX_ATTEMPTS   give up after this many claims        (default 3)
+Unparsable values fall back to the default. A heartbeat interval over half
+the stale window is lowered to a third of it, so a live job is never reclaimed.
+"""
+import asyncio
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from typing import Any, BinaryIO, Callable, Dict, List, Optional
+
+from sqlalchemy import text
+
+from app.db import SessionLocal
+
+SPOOL_DIR = os.getenv("UPLOAD_SPOOL_DIR", os.path.join(".", "data", "uploads"))
+
+
+def _env_int(name: str, default: int, lo: int = 1) -> int:
+    try:
+        return max(lo, int(os.getenv(name, str(default))))
+    except ValueError:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        v = float(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+    return v if v > 0 else default
+
+
+WORKERS = _env_int("UPLOAD_WORKERS", 2, lo=0)
+POLL_S = _env_float("UPLOAD_JOB_POLL_S", 2.0)
+STALE_S = _env_float("UPLOAD_JOB_STALE_S", 900.0)
+MAX_ATTEMPTS = _env_int("UPLOAD_JOB_MAX_ATTEMPTS", 3)
+HEARTBEAT_S = _env_float("UPLOAD_JOB_HEARTBEAT_S", 30.0)
+if HEARTBEAT_S * 2 > STALE_S:
+    # a live job must beat at least twice per stale window or another worker reclaims it
+    print(f"[upload_jobs] UPLOAD_JOB_HEARTBEAT_S={HEARTBEAT_S:g} too close to "
+          f"UPLOAD_JOB_STALE_S={STALE_S:g}; using {STALE_S / 3:g}")
+    HEARTBEAT_S = STALE_S / 3
+
+INSERT_SQL = text("""
+    INSERT INTO upload_jobs (kind, filename, path, params, bytes_total)
+    VALUES (:kind, :filename, :path, CAST(:params AS jsonb), :bytes_total)
+    RETURNING id
+""")
+
+CLAIM_SQL = text("""
+    UPDATE upload_jobs
+    SET status = 'running', started_at = now(), heartbeat_at = now(), attempts = attempts + 1
+    WHERE id = (
+        SELECT id FROM upload_jobs
+        WHERE status = 'queued'
+           OR (status = 'running'
+               AND COALESCE(heartbeat_at, started_at) < now() - make_interval(secs => :stale_s))
+        ORDER BY created_at
+        FOR UPDATE SKIP LOCKED
+        LIMIT 1
+    )
+    RETURNING id, kind, filename, path, params, bytes_total, attempts
+""")
+
+PROGRESS_SQL = text("""
+    UPDATE upload_jobs SET progress = CAST(:progress AS jsonb), heartbeat_at = now()
+    WHERE id = :id
+""")
+
+HEARTBEAT_SQL = text("UPDATE upload_jobs SET heartbeat_at = now() WHERE id = :id AND status = 'running'")
+
+FINISH_SQL = text("""
+    UPDATE upload_jobs
+    SET status = :status, result = CAST(:result AS jsonb), error = :error, finished_at = now()
+    WHERE id = :id
+""")
+
+SELECT_SQL = text("""
+    SELECT id, kind, filename, status, bytes_total, progress, result, error,
+           attempts, created_at, started_at, heartbeat_at, finished_at
+    FROM upload_jobs
+    WHERE id = CAST(:id AS uuid)
+""")
+
+Handler = Callable[[Any, BinaryIO, Dict[str, Any], "Progress"], Dict[str, Any]]
+_handlers: Dict[str, Handler] = {}
+
+
+def register(kind: str, handler: Handler) -> None:
+    _handlers[kind] = handler
+
+
+# ---------- Enqueue / status (sync; call through run_in_threadpool) ----------
+
+def _spool(fileobj: BinaryIO, filename: Optional[str]) -> tuple:
+    os.makedirs(SPOOL_DIR, exist_ok=True)
+    safe = re.sub(r"[^A-Za-z0-9._-]+", "_", os.path.basename(filename or "upload"))[-100:]
+    path = os.path.join(SPOOL_DIR, f"{uuid.uuid4().hex}_{safe}")
+    fileobj.seek(0)
+    with open(path, "wb") as out:
+        shutil.copyfileobj(fileobj, out, 1024 * 1024)
+    return path, os.path.getsize(path)
+
+
+def enqueue(kind: str, fileobj: BinaryIO, filename: Optional[str], params: Dict[str, Any]) -> str:
+    """Persist the upload and queue it; returns the job id."""
+    if kind not in _handlers:
+        raise ValueError(f"no upload handler registered for {kind!r}")
+    path, size = _spool(fileobj, filename)
+    try:
+        with SessionLocal() as db:
+            job_id = db.execute(INSERT_SQL, {
+                "kind": kind,
+                "filename": filename,
+                "path": path,
+                "params": json.dumps(params),
+                "bytes_total": size,
+            }).scalar_one()
+            db.commit()
+    except Exception:
+        os.remove(path)
+        raise
+    _wake()
+    return str(job_id)
+
+
+def get(job_id: str) -> Optional[Dict[str, Any]]:
+    with SessionLocal() as db:
+        row = db.execute(SELECT_SQL, {"id": job_id}).mappings().first()
+    if not row:
+        return None
+    job = dict(row)
+    progress = dict(job["progress"] or {})
+    if progress.get("files_total"):  # archives count files, not bytes
+        progress["pct"] = round(100 * progress.get("files_done", 0) / progress["files_total"], 1)
+    elif job["bytes_total"]:
+        progress["pct"] = round(100 * min(progress.get("bytes_done", 0), job["bytes_total"]) / job["bytes_total"], 1)
+    if job["status"] == "done":
+        progress["pct"] = 100.0
+    job["progress"] = progress
+    job["id"] = str(job["id"])
+    return job
+
+
+# ---------- Worker ----------
+
+class Progress:
+    """
+    Handed to handlers as `progress(rows=..., bytes_done=..., skip_reasons=...)`
+    (archives: files_done / files_total).
+    Writes at most every `every_s` seconds (and on flush()), on its own session.
+    """
+
+    def __init__(self, job_id, every_s: float = 0.5):
+        self.job_id = job_id
+        self.every_s = every_s
+        self.state: Dict[str, Any] = {}
+        self._last = 0.0
+
+    def __call__(self, **fields: Any) -> None:
+        self.state.update(fields)
+        if time.monotonic() - self._last >= self.every_s:
+            self.flush()
+
+    def flush(self) -> None:
+        self._last = time.monotonic()
+        with SessionLocal() as db:
+            db.execute(PROGRESS_SQL, {"id": self.job_id, "progress": json.dumps(self.state)})
+            db.commit()
+
+
+class Heartbeat:
+    """`with Heartbeat(job_id):` keeps heartbeat_at fresh from a side thread while the handler runs."""
+
+    def __init__(self, job_id, every_s: float = HEARTBEAT_S):
+        self.job_id = job_id
+        self.every_s = max(1.0, every_s)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"upload-job-{job_id}", daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.every_s):
+            try:
+                with SessionLocal() as db:
+                    db.execute(HEARTBEAT_SQL, {"id": self.job_id})
+                    db.commit()
+            except Exception as e:  # a missed beat is fine; STALE_S is many beats long
+                print(f"[upload_jobs] {self.job_id} heartbeat failed: {type(e).__name__}: {e}")
+
+    def __enter__(self) -> "Heartbeat":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+def _finish(job_id, status: str, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None) -> None:
+    with SessionLocal() as db:
+        db.execute(FINISH_SQL, {
+            "id": job_id,
+            "status": status,
+            "result": json.dumps(result) if result is not None else None,
+            "error": error,
+        })
+        db.commit()
+
+
+def run_one() -> bool:
+    """Claim and run the next job. False if the queue was empty."""
+    with SessionLocal() as db:
+        job = db.execute(CLAIM_SQL, {"stale_s": STALE_S}).mappings().first()
+        db.commit()
+    if not job:
+        return False
+    job = dict(job)
+
+    if job["attempts"] > MAX_ATTEMPTS:
+        _finish(job["id"], "failed", error=f"gave up after {MAX_ATTEMPTS} attempts")
+        return True
+    handler = _handlers.get(job["kind"])
+    if handler is None:
+        _finish(job["id"], "failed", error=f"no handler for {job['kind']!r}")
+        return True
+
+    progress = Progress(job["id"])
+    try:
+        with Heartbeat(job["id"]), SessionLocal() as db, open(job["path"], "rb") as fh:
+            result = handler(db, fh, job, progress)
+    except Exception as e:
+        # HTTPException-style errors carry the message the route used to return
+        detail = getattr(e, "detail", None) or f"{type(e).__name__}: {e}"
+        print(f"[upload_jobs] {job['id']} ({job['kind']}, {job['filename']}) failed: {detail}")
+        _finish(job["id"], "failed", error=str(detail))
+        return True
+
+    progress.flush()
+    _finish(job["id"], "done", result=result)
+    try:
+        os.remove(job["path"])
+    except OSError:
+        pass
+    return True
+
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_wakeup: Optional[asyncio.Event] = None
+_tasks: List[asyncio.Task] = []
+
+
+def _wake() -> None:
+    # enqueue runs in a threadpool; poke the workers of this process
+    if _loop is not None and _wakeup is not None:
+        _loop.call_soon_threadsafe(_wakeup.set)
+
+
+async def _worker() -> None:
+    while True:
+        try:
+            ran = await asyncio.to_thread(run_one)
+        except Exception as e:  # DB hiccup: back off and keep the worker alive
+            print(f"[upload_jobs] worker error: {type(e).__name__}: {e}")
+            ran = False
+        if ran:
+            continue
+        _wakeup.clear()
+        try:
+            await asyncio.wait_for(_wakeup.wait(), timeout=POLL_S)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def start_workers(n: int = WORKERS) -> None:
+    global _loop, _wakeup
+    _loop = asyncio.get_running_loop()
+    _wakeup = asyncio.Event()
+    _tasks.extend(asyncio.create_task(_worker()) for _ in range(max(0, n)))
+
+
+async def stop_workers() -> None:
+    """Stop claiming. A job mid-load finishes in its thread; if the process exits first it goes stale and is retried."""
+    for t in _tasks:
+        t.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+    _tasks.clear()
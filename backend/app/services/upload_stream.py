@@ -0,0 +1,80 @@
+# app/services/upload_stream.py
+"""
+Read uploaded CSVs a chunk at a time instead of `await file.read()` +
+one big decoded string:
+
+    digest, size = sha256(file.file)       # upload_files key, see upload_files.py
+    for batch in batches(csv.reader(iter_lines(file.file)), BATCH_ROWS):
+        write(batch)
+
+`iter_lines` pulls UPLOAD_CHUNK_BYTES at a time from the spooled upload
+(Starlette keeps small ones in memory, big ones on disk), decodes them with
+an incremental decoder, so a multi-byte character split across chunks is
+fine, and yields lines with their endings for `csv.reader`, which handles
+quoted fields spanning lines itself. Peak memory is one chunk plus one
+write batch, whatever the file size.
+
+Env:
+  UPLOAD_CHUNK_BYTES   bytes read per chunk    (default 65536)
+  UPLOAD_BATCH_ROWS    rows per batched write  (default 500)
+"""
+import codecs
+import hashlib
+import os
+from typing import BinaryIO, Iterable, Iterator, List, Tuple, TypeVar
+
+CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", "65536"))
+BATCH_ROWS = int(os.getenv("UPLOAD_BATCH_ROWS", "500"))
+
+T = TypeVar("T")
+
+
+def iter_lines(
+    fileobj: BinaryIO,
+    encoding: str = "utf-8",
+    errors: str = "strict",
+    chunk_bytes: int = CHUNK_BYTES,
+) -> Iterator[str]:
+    """Lines of a binary file object, decoded incrementally; endings kept."""
+    decoder = codecs.getincrementaldecoder(encoding)(errors=errors)
+    fileobj.seek(0)
+    tail = ""
+    while True:
+        chunk = fileobj.read(chunk_bytes)
+        text = tail + decoder.decode(chunk, final=not chunk)
+        if not chunk:
+            if text:
+                yield text
+            return
+        # split on "\n" only ("\r\n" stays whole); the piece after the last
+        # one is a partial line and waits for the next chunk
+        cut = text.rfind("\n") + 1
+        tail = text[cut:]
+        for line in text[:cut].split("\n")[:-1]:
+            yield line + "\n"
+
+
+def sha256(fileobj: BinaryIO, chunk_bytes: int = CHUNK_BYTES) -> Tuple[str, int]:
+    """(hex SHA-256, size in bytes) of the whole file, read a chunk at a time."""
+    h = hashlib.sha256()
+    size = 0
+    fileobj.seek(0)
+    while True:
+        chunk = fileobj.read(chunk_bytes)
+        if not chunk:
+            break
+        h.update(chunk)
+        size += len(chunk)
+    fileobj.seek(0)
+    return h.hexdigest(), size
+
+
+def batches(items: Iterable[T], size: int = BATCH_ROWS) -> Iterator[List[T]]:
+    batch: List[T] = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch